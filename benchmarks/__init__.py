@@ -0,0 +1 @@
+"""Offline benchmarks voor de Klikomanager integratie."""
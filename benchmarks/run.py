@@ -0,0 +1,278 @@
+"""Benchmark-harnas voor refresh, ingest, kalenderqueries en target-sync.
+
+Draait volledig offline tegen `benchmarks.standin` en schrijft de resultaten
+als JSON, zodat runs van verschillende commits te vergelijken zijn:
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --scenario 10y-36f --latency 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from aiohttp import ClientSession
+
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from custom_components.klikomanager.api import (
+    KlikomanagerClient,
+    KlikomanagerTokenManager,
+)
+from custom_components.klikomanager.const import SYNC_HORIZON
+from custom_components.klikomanager.ingest import build_index
+from custom_components.klikomanager.sync import async_create_events
+
+from .standin import KlikomanagerStandIn, synthetic_calendar
+
+# Naam → (dagen, fracties)
+SCENARIOS: dict[str, tuple[int, int]] = {
+    "4w-3f": (28, 3),
+    "1y-6f": (365, 6),
+    "5y-12f": (5 * 365, 12),
+    "10y-36f": (10 * 365, 36),
+}
+
+
+class _StandInClient(KlikomanagerClient):
+    """Client die over http met een eigen sessie de stand-in aanspreekt."""
+
+    scheme = "http"
+
+    def __init__(self, session: ClientSession, host: str) -> None:
+        super().__init__(None, host)  # type: ignore[arg-type]
+        self._session = session
+
+
+class _FakeServices:
+    """Nep-`hass.services` voor calendar.create_event met latency/fouten."""
+
+    def __init__(self, latency: float, failure_rate: float) -> None:
+        self._latency = latency
+        self._failure_rate = failure_rate
+        self._rng = random.Random(0)
+        self.calls = 0
+
+    async def async_call(self, domain: str, service: str, data: dict, **kwargs: Any) -> None:
+        self.calls += 1
+        await asyncio.sleep(self._latency)
+        if self._rng.random() < self._failure_rate:
+            raise HomeAssistantError("gesimuleerde fout")
+
+
+class _FakeHass:
+    def __init__(self, services: _FakeServices) -> None:
+        self.services = services
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    """Retourneer p50/p95/max in milliseconden."""
+    ordered = sorted(samples)
+    return {
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+async def _time_async(call: Callable[[], Awaitable[Any]], runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def bench_refresh(
+    calendar: dict[str, Any], *, latency: float, failure_rate: float, runs: int
+) -> dict[str, Any]:
+    """Meet login + fetch + ingest tegen de stand-in, koud en met gecachte token."""
+    stand_in = KlikomanagerStandIn(calendar, latency=latency, failure_rate=failure_rate)
+    port = await stand_in.async_start()
+    try:
+        async with ClientSession() as session:
+            client = _StandInClient(session, f"127.0.0.1:{port}")
+            token_manager = KlikomanagerTokenManager(
+                client,
+                card_number="000123",
+                password="bench",
+                client_name="bench",
+                app="bench",
+            )
+
+            async def refresh() -> None:
+                result = await token_manager.async_call(
+                    lambda token: client.async_get_waste_calendar(
+                        token=token, client_name="bench", app="bench"
+                    )
+                )
+                build_index(result["dates"], result["fractions"])
+
+            cold = await _time_async(refresh, 1)
+            warm = await _time_async(refresh, runs)
+    finally:
+        await stand_in.async_stop()
+
+    return {
+        "cold_ms": cold[0] * 1000,
+        **_percentiles(warm),
+        "requests": dict(stand_in.requests),
+    }
+
+
+def bench_ingest(calendar: dict[str, Any], runs: int) -> dict[str, Any]:
+    """Meet ingest-doorvoer en piekgeheugen van de index-opbouw."""
+    dates, fractions = calendar["dates"], calendar["fractions"]
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        index = build_index(dates, fractions)
+        samples.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    index = build_index(dates, fractions)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(samples)
+    return {
+        "pickups": len(index),
+        "pickups_per_s": len(index) / best if best else None,
+        **_percentiles(samples),
+        "peak_memory_bytes": peak,
+    }
+
+
+def bench_queries(calendar: dict[str, Any], queries: int) -> dict[str, Any]:
+    """Meet range-queries van een maand en next-event lookups op willekeurige momenten."""
+    index = build_index(calendar["dates"], calendar["fractions"])
+    if not index:
+        return {}
+    rng = random.Random(0)
+    first, last = index.starts[0], index.starts[-1]
+    span = (last - first).total_seconds()
+    moments = [first + timedelta(seconds=rng.uniform(0, span)) for _ in range(queries)]
+
+    started = time.perf_counter()
+    returned = sum(
+        len(index.events_between(moment, moment + timedelta(days=31)))
+        for moment in moments
+    )
+    range_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for moment in moments:
+        index.next_event(moment)
+    next_elapsed = time.perf_counter() - started
+
+    return {
+        "range_query_us": range_elapsed / queries * 1e6,
+        "range_query_events_avg": returned / queries,
+        "next_event_us": next_elapsed / queries * 1e6,
+    }
+
+
+async def bench_sync(
+    calendar: dict[str, Any], *, latency: float, failure_rate: float
+) -> dict[str, Any]:
+    """Meet de sync-doorvoer over de horizon tegen een nep-kalenderservice."""
+    index = build_index(calendar["dates"], calendar["fractions"])
+    now = dt_util.utcnow()
+    pickups = [index.items[pos] for pos in index.positions_between(now, now + SYNC_HORIZON)]
+    services = _FakeServices(latency, failure_rate)
+
+    result = await async_create_events(
+        _FakeHass(services),  # type: ignore[arg-type]
+        "calendar.bench",
+        pickups,
+        entry_id="bench",
+    )
+    return {
+        "events": len(pickups),
+        "created": result.created,
+        "failed": result.failed,
+        "service_calls": services.calls,
+        "elapsed_s": result.elapsed,
+        "events_per_s": result.created / result.elapsed if result.elapsed else None,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def async_main(args: argparse.Namespace) -> dict[str, Any]:
+    """Draai de gekozen scenario's en retourneer de resultaten."""
+    dt_util.set_default_time_zone(ZoneInfo("Europe/Amsterdam"))
+    scenarios = args.scenario or list(SCENARIOS)
+    results: dict[str, Any] = {}
+
+    for name in scenarios:
+        days, fractions = SCENARIOS[name]
+        calendar = synthetic_calendar(days=days, fractions=fractions)
+        results[name] = {
+            "refresh": await bench_refresh(
+                calendar,
+                latency=args.latency,
+                failure_rate=args.failure_rate,
+                runs=args.runs,
+            ),
+            "ingest": bench_ingest(calendar, args.runs),
+            "queries": bench_queries(calendar, args.queries),
+            "sync": await bench_sync(
+                calendar, latency=args.sync_latency, failure_rate=args.failure_rate
+            ),
+        }
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "timestamp": dt_util.utcnow().isoformat(),
+        "parameters": vars(args),
+        "results": results,
+    }
+
+
+def main() -> None:
+    """Parse argumenten, draai de benchmarks en schrijf JSON weg."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS))
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--sync-latency", type=float, default=0.01)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Schrijf JSON naar dit bestand i.p.v. stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(async_main(args))
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Lokale stand-in voor de Klikomanager API met synthetische kalenders.
+
+Gebruik los als server:
+
+    python -m benchmarks.standin --port 8765 --years 5 --fractions 24
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import date, timedelta
+import random
+import secrets
+from typing import Any
+
+from aiohttp import web
+
+API_LOGIN_PATH = "/MyKliko/loginWithPassword"
+API_WASTE_CALENDAR_PATH = "/MyKliko/getMyWasteCalendar"
+
+# Ophaalcycli in weken; fracties krijgen er op volgorde één toegewezen.
+_CYCLES_WEEKS = (1, 2, 2, 4, 4, 8)
+
+
+def synthetic_calendar(
+    *,
+    days: int,
+    fractions: int,
+    start: date | None = None,
+    holiday_shift_rate: float = 0.05,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """Genereer een getMyWasteCalendar-respons.
+
+    Elke fractie volgt een vaste cyclus op een vaste weekdag; een klein deel
+    van de ophaalmomenten schuift een dag op (zoals rond feestdagen).
+    """
+    rng = random.Random(seed)
+    start = start or date.today() - timedelta(days=days // 4)
+    dates: dict[str, list[list[int]]] = {}
+
+    for fraction_id in range(1, fractions + 1):
+        cycle = timedelta(weeks=_CYCLES_WEEKS[fraction_id % len(_CYCLES_WEEKS)])
+        day = start + timedelta(days=fraction_id % 5)
+        while day < start + timedelta(days=days):
+            pickup = day
+            if rng.random() < holiday_shift_rate:
+                pickup += timedelta(days=1)
+            dates.setdefault(pickup.isoformat(), []).append([fraction_id, 0])
+            day += cycle
+
+    return {
+        "success": True,
+        "dates": dict(sorted(dates.items())),
+        "fractions": [
+            {"id": fraction_id, "name": f"Fractie {fraction_id:02d}"}
+            for fraction_id in range(1, fractions + 1)
+        ],
+    }
+
+
+class KlikomanagerStandIn:
+    """aiohttp-applicatie die de twee gebruikte endpoints nabootst.
+
+    `latency` (seconden) wordt aan elke respons toegevoegd; met kans
+    `failure_rate` antwoordt de server met 503 en `Retry-After: 0`.
+    """
+
+    def __init__(
+        self,
+        calendar: dict[str, Any],
+        *,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        """Initialiseer de stand-in."""
+        self.calendar = calendar
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._tokens: set[str] = set()
+        self.requests: dict[str, int] = {API_LOGIN_PATH: 0, API_WASTE_CALENDAR_PATH: 0}
+        self.app = web.Application()
+        self.app.router.add_post(API_LOGIN_PATH, self._login)
+        self.app.router.add_post(API_WASTE_CALENDAR_PATH, self._waste_calendar)
+
+    async def _delay_or_fail(self) -> web.Response | None:
+        """Injecteer latency en eventueel een tijdelijke fout."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            return web.Response(status=503, headers={"Retry-After": "0"})
+        return None
+
+    async def _login(self, request: web.Request) -> web.Response:
+        self.requests[API_LOGIN_PATH] += 1
+        if (failure := await self._delay_or_fail()) is not None:
+            return failure
+        body = await request.json()
+        if not body.get("cardNumber") or not body.get("password"):
+            return web.json_response({"success": False})
+        token = secrets.token_hex(16)
+        self._tokens.add(token)
+        return web.json_response(
+            {
+                "success": True,
+                "token": token,
+                "config": {
+                    "cardDetails": {
+                        "address": {
+                            "street": "Teststraat",
+                            "streetNumber": str(body["cardNumber"])[-3:],
+                            "zipCode": "1234AB",
+                        }
+                    }
+                },
+            }
+        )
+
+    async def _waste_calendar(self, request: web.Request) -> web.Response:
+        self.requests[API_WASTE_CALENDAR_PATH] += 1
+        if (failure := await self._delay_or_fail()) is not None:
+            return failure
+        body = await request.json()
+        if body.get("token") not in self._tokens:
+            return web.json_response({"success": False})
+        return web.json_response(self.calendar)
+
+    async def async_start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start de server en retourneer de gebruikte poort."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        return self._runner.addresses[0][1]
+
+    async def async_stop(self) -> None:
+        """Stop de server."""
+        await self._runner.cleanup()
+
+
+def main() -> None:
+    """Start de stand-in als losse server."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--fractions", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stand_in = KlikomanagerStandIn(
+        synthetic_calendar(days=int(args.years * 365), fractions=args.fractions),
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+    )
+    web.run_app(stand_in.app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,11 @@
 
 from __future__ import annotations
 
-from datetime import timedelta, datetime, time
+from datetime import date, datetime, timedelta
 import logging
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
@@ -15,14 +15,43 @@ from homeassistant.helpers.update_coordinator import (
 from homeassistant.util import dt as dt_util
 
 from .api import (
-    async_login_with_password,
-    async_get_waste_calendar,
+    async_get_client,
+    count_retries,
     KlikomanagerApiError,
     KlikomanagerAuthError,
+    KlikomanagerTokenManager,
 )
+from .diff import diff_indexes
+from .fleet import KlikomanagerFleetCoordinator
+from .hub import KlikomanagerCalendarData, async_get_hub
+from .ics import KlikomanagerIcsView
+from .index import KlikomanagerEventIndex
+from .ingest import fingerprint_calendar
+from .services import async_setup_services
+from .scheduler import KlikomanagerRefreshScheduler
+from .stats import (
+    KlikomanagerRefreshStats,
+    PHASE_FETCH,
+    PHASE_INGEST,
+    PHASE_LOGIN,
+    PHASE_SYNC,
+    PHASE_FANOUT,
+    PHASE_TOTAL,
+)
+from .storage import (
+    KlikomanagerArchive,
+    KlikomanagerSnapshot,
+    KlikomanagerSyncedEvents,
+    async_remove_storage,
+)
+from .sync import KlikomanagerSyncResult, async_create_events, async_reconcile
 from .const import (
     DOMAIN,
+    EVENT_SCHEDULE_CHANGED,
+    FLEET_PLATFORMS,
     PLATFORMS,
+    CONF_ARCHIVE_RETENTION,
+    CONF_CARDS,
     CONF_CARD_NUMBER,
     CONF_PASSWORD,
     CONF_HOST,
@@ -30,6 +59,17 @@ from .const import (
     CONF_APP,
     CONF_TARGET_CALENDAR,
     CONF_SYNCED_EVENTS,
+    CONF_REFRESH_WINDOW_START,
+    CONF_REFRESH_WINDOW_END,
+    CONF_SYNC_MODE,
+    CONF_SYNC_RECURRING,
+    DATA_ICS_VIEW,
+    DATA_PENDING_LOGINS,
+    DEFAULT_REFRESH_WINDOW_START,
+    DEFAULT_REFRESH_WINDOW_END,
+    DEFAULT_SYNC_MODE,
+    SYNC_HORIZON,
+    SYNC_MODE_RECONCILE,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -38,6 +78,10 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up de Klikomanager integratie via YAML (niet gebruikt)."""
     # We ondersteunen alleen config entries (UI-configuratie).
+    ics_view = KlikomanagerIcsView(hass)
+    hass.data.setdefault(DOMAIN, {})[DATA_ICS_VIEW] = ics_view
+    hass.http.register_view(ics_view)
+    async_setup_services(hass)
     return True
 
 
@@ -45,12 +89,24 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Klikomanager vanuit een config entry."""
     hass.data.setdefault(DOMAIN, {})
 
+    if CONF_CARDS in entry.data:
+        return await _async_setup_fleet_entry(hass, entry)
+
     coordinator = KlikomanagerDataUpdateCoordinator(hass=hass, entry=entry)
+    warm_start = await coordinator.async_load_storage()
 
-    try:
-        await coordinator.async_config_entry_first_refresh()
-    except Exception as err:  # noqa: BLE001
-        raise ConfigEntryNotReady(f"Kon Klikomanager data niet ophalen: {err}") from err
+    # Hergebruik de login uit de config flow voor de eerste refresh.
+    pending_login = hass.data[DOMAIN].get(DATA_PENDING_LOGINS, {}).pop(
+        entry.unique_id, None
+    )
+    if pending_login is not None:
+        coordinator.token_manager.seed(pending_login)
+
+    if not warm_start:
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except Exception as err:  # noqa: BLE001
+            raise ConfigEntryNotReady(f"Kon Klikomanager data niet ophalen: {err}") from err
 
     hass.data[DOMAIN][entry.entry_id] = {
         "coordinator": coordinator,
@@ -58,20 +114,60 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    if warm_start:
+        # Entities draaien al op de snapshot; ververs op de achtergrond.
+        entry.async_create_background_task(
+            hass,
+            coordinator.async_refresh(),
+            f"{DOMAIN} refresh {entry.entry_id}",
+        )
+
+    return True
+
+
+async def _async_setup_fleet_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Set up een vloot-entry; entities starten altijd direct vanuit de opslag."""
+    coordinator = KlikomanagerFleetCoordinator(hass=hass, entry=entry)
+    await coordinator.async_load_storage()
+
+    hass.data[DOMAIN][entry.entry_id] = {
+        "coordinator": coordinator,
+    }
+
+    await hass.config_entries.async_forward_entry_setups(entry, FLEET_PLATFORMS)
+
+    # Ophalen gebeurt in batches op de achtergrond, ook zonder opslag.
+    entry.async_create_background_task(
+        hass,
+        coordinator.async_refresh(),
+        f"{DOMAIN} refresh {entry.entry_id}",
+    )
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Verwijder een config entry."""
-    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    fleet = CONF_CARDS in entry.data
+    unload_ok = await hass.config_entries.async_unload_platforms(
+        entry, FLEET_PLATFORMS if fleet else PLATFORMS
+    )
 
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id, None)
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id, None)
+        if entry_data is not None and not fleet:
+            coordinator = entry_data["coordinator"]
+            coordinator.hub.async_remove(coordinator)
+        hass.data[DOMAIN][DATA_ICS_VIEW].forget(entry.entry_id)
 
     return unload_ok
 
 
-class KlikomanagerDataUpdateCoordinator(DataUpdateCoordinator[list]):
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Ruim de opgeslagen bestanden van een verwijderde config entry op."""
+    await async_remove_storage(hass, entry.entry_id)
+
+
+class KlikomanagerDataUpdateCoordinator(DataUpdateCoordinator[KlikomanagerEventIndex]):
     """Coordinator die de data van Klikomanager ophaalt."""
 
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
@@ -80,173 +176,338 @@ class KlikomanagerDataUpdateCoordinator(DataUpdateCoordinator[list]):
             hass,
             _LOGGER,
             name="Klikomanager afvalkalender",
-            # Eenmaal per dag verversen is voldoende voor een afvalkalender.
+            # Eenmaal per dag verversen is voldoende voor een afvalkalender;
+            # na elke refresh bepaalt de scheduler het volgende moment.
             update_interval=timedelta(days=1),
+            # Alleen listeners informeren als de data echt veranderd is.
+            always_update=False,
         )
         self.entry = entry
+        data = entry.data
+        self.client = async_get_client(hass, data[CONF_HOST])
+        # Entries met dezelfde kalender delen via de hub fetch en index.
+        self.hub = async_get_hub(hass, data[CONF_HOST])
+        self.token_manager = KlikomanagerTokenManager(
+            self.client,
+            card_number=data[CONF_CARD_NUMBER],
+            password=data[CONF_PASSWORD],
+            client_name=data[CONF_CLIENT_NAME],
+            app=data[CONF_APP],
+        )
         # Houd bij welke events we al naar een externe kalender hebben geschreven.
-        synced_from_options = entry.options.get(CONF_SYNCED_EVENTS, [])
-        self._synced_event_keys: set[tuple[str, int]] = {
-            (str_key.split("|")[0], int(str_key.split("|")[1]))
-            for str_key in synced_from_options
-            if "|" in str_key
-        }
+        self._synced_events = KlikomanagerSyncedEvents(hass, entry.entry_id)
+        self._snapshot = KlikomanagerSnapshot(hass, entry.entry_id)
+        # Voorbije ophaalmomenten, voor historie buiten het API-venster.
+        self.archive = KlikomanagerArchive(hass, entry.entry_id)
+        # Moment waarop de huidige data voor het laatst bij Klikomanager is opgehaald.
+        self.last_fetched: datetime | None = None
+        # Fingerprint van de laatst verwerkte kalenderrespons.
+        self._fingerprint: str | None = None
+        # Einde van de sync-horizon bij de laatste sync-pass.
+        self._synced_until: datetime | None = None
+        self._scheduler = KlikomanagerRefreshScheduler(entry.entry_id)
+        self.stats = KlikomanagerRefreshStats()
+
+    async def async_load_storage(self) -> bool:
+        """Laad de persistente state en migreer de oude synced_events-option.
+
+        Retourneert True als er een snapshot is geladen waarmee de entities
+        direct kunnen starten.
+        """
+        legacy_keys = self.entry.options.get(CONF_SYNCED_EVENTS, [])
+        await self._synced_events.async_load(legacy_keys)
+        # Pas na een geslaagde save van de gemigreerde keys de option weghalen.
+        if CONF_SYNCED_EVENTS in self.entry.options:
+            self.hass.config_entries.async_update_entry(
+                self.entry,
+                options={
+                    key: value
+                    for key, value in self.entry.options.items()
+                    if key != CONF_SYNCED_EVENTS
+                },
+            )
+
+        await self.archive.async_load()
+
+        snapshot = await self._snapshot.async_load()
+        if not snapshot:
+            return False
+
+        try:
+            index = await self.hub.async_get_index(
+                snapshot.get("fingerprint") or self.entry.entry_id,
+                snapshot["dates"],
+                snapshot["fractions"],
+            )
+            fetched_at = dt_util.parse_datetime(snapshot["fetched_at"])
+        except (KeyError, TypeError, ValueError) as err:
+            _LOGGER.warning("Ongeldige Klikomanager-snapshot genegeerd: %s", err)
+            return False
+
+        self.data = index
+        self._fingerprint = snapshot.get("fingerprint")
+        self.last_fetched = fetched_at
+        return True
+
+    async def _async_update_data(self) -> KlikomanagerEventIndex:
+        """Ververs de data en plan de volgende refresh."""
+        with count_retries() as retries:
+            try:
+                with self.stats.measure(PHASE_TOTAL):
+                    index = await self._async_fetch_calendar()
+            except UpdateFailed:
+                self.update_interval = self._scheduler.interval_after_failure()
+                raise
+            finally:
+                self.stats.retries.append(retries[0])
+                self.stats.async_refresh_done()
+
+        self._async_archive(index)
+        self.update_interval = self._interval_after_success(index)
+        return index
+
+    @callback
+    def _async_archive(self, index: KlikomanagerEventIndex) -> None:
+        """Archiveer de voorbije ophaalmomenten van de oude en nieuwe data.
+
+        De oude data gaat eerst mee, zodat dagen die de API net uit het
+        venster heeft gehaald niet verloren gaan.
+        """
+        yesterday = dt_util.now().date() - timedelta(days=1)
+        retention = self.entry.options.get(CONF_ARCHIVE_RETENTION, 0)
+        sources = [index] if self.data in (None, index) else [self.data, index]
+        for source in sources:
+            self.archive.async_add(
+                source.pickups_between_days(date.min, yesterday), retention
+            )
+
+    def _interval_after_success(
+        self, index: KlikomanagerEventIndex
+    ) -> timedelta | None:
+        """Bepaal het volgende refreshmoment; volgers halen niet zelf op."""
+        if not self.hub.is_leader(self):
+            return None
+
+        options = self.entry.options
+        return self._scheduler.interval_after_success(
+            index,
+            options.get(CONF_REFRESH_WINDOW_START, DEFAULT_REFRESH_WINDOW_START),
+            options.get(CONF_REFRESH_WINDOW_END, DEFAULT_REFRESH_WINDOW_END),
+        )
 
-    async def _async_update_data(self) -> list:
-        """Haal de laatste afvalkalender-data op van Klikomanager.
+    @callback
+    def async_promote(self) -> None:
+        """Neem het geplande ophalen over van een afgemelde leader."""
+        if self.data is None:
+            self.hass.async_create_task(self.async_request_refresh())
+            return
+        self.update_interval = self._interval_after_success(self.data)
+        self._schedule_refresh()
+
+    async def _async_fetch_calendar(self) -> KlikomanagerEventIndex:
+        """Haal de laatste afvalkalender-data op, of deel die van de hub.
 
         Werkwijze:
-        - log in met kaartnummer + wachtwoord → short-lived token
-        - haal vervolgens de waste calendar op met die token
-        - zet de data om naar een lijst met calendar-events
+        - entries met dezelfde kalender delen via de hub één fetch; een volger
+          krijgt het resultaat van zijn leader zonder zelf in te loggen
+        - is de respons ongewijzigd, hergebruik dan de vorige events
         - schrijf optioneel events weg naar een externe kalender
         """
+        try:
+            shared = await self.hub.async_fetch(self, self._async_fetch_remote)
+        except (KlikomanagerApiError, KlikomanagerAuthError) as err:
+            raise UpdateFailed(f"Fout bij communiceren met Klikomanager: {err}") from err
+        except Exception as err:  # noqa: BLE001
+            raise UpdateFailed(f"Onbekende fout bij ophalen Klikomanager-data: {err}") from err
+
+        try:
+            if shared.fingerprint == self._fingerprint and self.data is not None:
+                # Ongewijzigd: zelfde object teruggeven zodat er geen
+                # listener-update volgt, en alleen synchroniseren als de
+                # horizon nieuwe events heeft binnengehaald.
+                _LOGGER.debug("Klikomanager-kalender ongewijzigd, geen rebuild")
+                self.stats.unchanged_refreshes += 1
+                self.stats.event_counts.append(len(self.data))
+                if self._horizon_admits_new_events(self.data):
+                    with self.stats.measure(PHASE_SYNC):
+                        await self._async_sync_to_target_calendar(self.data)
+                self.last_fetched = shared.fetched_at
+                self._snapshot.async_update(
+                    fetched_at=self.last_fetched, fingerprint=shared.fingerprint
+                )
+                return self.data
+
+            index = shared.index
+            self.stats.event_counts.append(len(index))
+            if self.data is not None:
+                self._async_fire_schedule_changed(self.data, index)
+
+            # Schrijf optioneel events weg naar een gekozen kalender-entity
+            with self.stats.measure(PHASE_SYNC):
+                await self._async_sync_to_target_calendar(index)
+
+            self._fingerprint = shared.fingerprint
+            self.last_fetched = shared.fetched_at
+            self._snapshot.async_update(
+                fetched_at=self.last_fetched,
+                fingerprint=shared.fingerprint,
+                dates=shared.dates,
+                fractions=shared.fractions,
+            )
+            return index
+
+        except Exception as err:  # noqa: BLE001
+            raise UpdateFailed(f"Onbekende fout bij verwerken Klikomanager-data: {err}") from err
+
+    async def _async_fetch_remote(self) -> KlikomanagerCalendarData:
+        """Haal de afvalkalender op bij Klikomanager met de eigen kaart.
+
+        De token manager logt alleen in als er geen geldige token in het
+        geheugen staat; bij een geweigerde token wordt eenmalig opnieuw
+        ingelogd. De index wordt via de hub per fingerprint gedeeld.
+        """
         data = self.entry.data
-        card_number: str = data[CONF_CARD_NUMBER]
-        password: str = data[CONF_PASSWORD]
-        host: str = data[CONF_HOST]
         client_name: str = data[CONF_CLIENT_NAME]
         app: str = data[CONF_APP]
 
-        try:
-            # 1. Login om een verse token te krijgen
-            login_result = await async_login_with_password(
-                self.hass,
-                host=host,
-                card_number=card_number,
-                password=password,
-                client_name=client_name,
-                app=app,
+        if not self.token_manager.token_valid:
+            with self.stats.measure(PHASE_LOGIN):
+                await self.token_manager.async_get_token()
+
+        # Haal de afvalkalender op
+        with self.stats.measure(PHASE_FETCH):
+            calendar_result = await self.token_manager.async_call(
+                lambda token: self.client.async_get_waste_calendar(
+                    token=token,
+                    client_name=client_name,
+                    app=app,
+                    response_sizes=self.stats.response_sizes,
+                )
             )
-            token: str = login_result["token"]
 
-            # 2. Haal de afvalkalender op
-            calendar_result = await async_get_waste_calendar(
-                self.hass,
-                host=host,
-                token=token,
-                client_name=client_name,
-                app=app,
-            )
+        dates = calendar_result.get("dates", {}) or {}
+        fractions = calendar_result.get("fractions", []) or []
 
-            dates = calendar_result.get("dates", {}) or {}
-            fractions = calendar_result.get("fractions", []) or []
-
-            fraction_name_by_id: dict[int, str] = {
-                int(f["id"]): str(f.get("name") or f["id"]) for f in fractions
-            }
-
-            events: list[dict] = []
-
-            for date_str, entries in dates.items():
-                # date_str is "YYYY-MM-DD"
-                try:
-                    day = datetime.fromisoformat(date_str).date()
-                except ValueError:
-                    _LOGGER.warning("Ongeldige datum in Klikomanager-data: %s", date_str)
-                    continue
-
-                start_dt = datetime.combine(day, time(6, 0))
-                end_dt = datetime.combine(day, time(9, 0))
-
-                for entry in entries:
-                    # entry is [fractionId, 0]
-                    if not entry:
-                        continue
-                    fraction_id = int(entry[0])
-                    fraction_name = fraction_name_by_id.get(
-                        fraction_id, f"Fractie {fraction_id}"
-                    )
-
-                    events.append(
-                        {
-                            "summary": fraction_name,
-                            "start": start_dt,
-                            "end": end_dt,
-                            "fraction_id": fraction_id,
-                            "fraction_name": fraction_name,
-                        }
-                    )
+        fingerprint = fingerprint_calendar(dates, fractions)
+        with self.stats.measure(PHASE_INGEST):
+            index = await self.hub.async_get_index(fingerprint, dates, fractions)
 
-            # Schrijf optioneel events weg naar een gekozen kalender-entity
-            await self._async_sync_to_target_calendar(events)
+        return KlikomanagerCalendarData(
+            fingerprint=fingerprint,
+            dates=dates,
+            fractions=fractions,
+            index=index,
+            fetched_at=dt_util.utcnow(),
+        )
+
+    @callback
+    def _async_fire_schedule_changed(
+        self, old: KlikomanagerEventIndex, new: KlikomanagerEventIndex
+    ) -> None:
+        """Vuur één bus-event met de verschillen tussen de oude en nieuwe data."""
+        diff = diff_indexes(old, new, dt_util.now().date())
+        if not diff:
+            return
+        _LOGGER.debug(
+            "Klikomanager-schema gewijzigd: %s erbij, %s weg, %s verplaatst",
+            len(diff.added),
+            len(diff.removed),
+            len(diff.moved),
+        )
+        self.hass.bus.async_fire(
+            EVENT_SCHEDULE_CHANGED,
+            {
+                "entry_id": self.entry.entry_id,
+                "title": self.entry.title,
+                **diff.as_event_data(),
+            },
+        )
 
-            return events
+    @callback
+    def async_update_listeners(self) -> None:
+        """Informeer de listeners en meet hoe lang die fan-out duurt."""
+        with self.stats.measure(PHASE_FANOUT):
+            super().async_update_listeners()
 
-        except (KlikomanagerApiError, KlikomanagerAuthError) as err:
-            raise UpdateFailed(f"Fout bij communiceren met Klikomanager: {err}") from err
-        except Exception as err:  # noqa: BLE001
-            raise UpdateFailed(f"Onbekende fout bij ophalen Klikomanager-data: {err}") from err
+    def _horizon_admits_new_events(self, index: KlikomanagerEventIndex) -> bool:
+        """Geef aan of er sinds de vorige sync events binnen de horizon vallen."""
+        if self._synced_until is None:
+            return True
+
+        horizon = dt_util.utcnow() + SYNC_HORIZON
+        return index.has_start_between(self._synced_until, horizon)
 
-    async def _async_sync_to_target_calendar(self, events: list[dict]) -> None:
+    async def _async_sync_to_target_calendar(
+        self, index: KlikomanagerEventIndex
+    ) -> None:
         """Schrijf events weg naar een externe kalender indien geconfigureerd.
 
-        We beperken dubbele creaties binnen dezelfde HA-runtime met een interne set.
+        In de append-modus worden alleen events meegenomen die nog niet eerder
+        bevestigd zijn aangemaakt; in de reconcile-modus wordt de target
+        uitgelezen en alleen het verschil geschreven. Keys worden pas na een
+        geslaagde schrijfactie vastgelegd.
         """
         target_calendar: str | None = self.entry.options.get(CONF_TARGET_CALENDAR) or self.entry.data.get(CONF_TARGET_CALENDAR)
         if not target_calendar:
             return
 
-        if not events:
+        if not index:
             return
 
         now = dt_util.utcnow()
-        horizon = now + timedelta(days=60)
-
-        new_keys: set[tuple[str, int]] = set()
-
-        for ev in events:
-            start: datetime = dt_util.as_utc(ev["start"])
-            end: datetime = dt_util.as_utc(ev["end"])
-
-            # Alleen toekomstige events binnen een horizon synchroniseren
-            if end < now or start > horizon:
-                continue
+        horizon = now + SYNC_HORIZON
+        self._synced_until = horizon
 
-            key = (start.date().isoformat(), int(ev["fraction_id"]))
-            if key in self._synced_event_keys:
-                continue
-            self._synced_event_keys.add(key)
-            new_keys.add(key)
+        # Alleen toekomstige events binnen een horizon synchroniseren
+        in_horizon = [index.items[pos] for pos in index.positions_between(now, horizon)]
+        sync_mode = self.entry.options.get(CONF_SYNC_MODE, DEFAULT_SYNC_MODE)
 
-            summary = ev["summary"]
-            description = f"Klikomanager: {ev['fraction_name']}"
-
-            start_local = dt_util.as_local(start).isoformat()
-            end_local = dt_util.as_local(end).isoformat()
-
-            _LOGGER.debug(
-                "Maak event in %s voor %s (%s)",
+        result: KlikomanagerSyncResult | None = None
+        if sync_mode == SYNC_MODE_RECONCILE:
+            result = await async_reconcile(
+                self.hass,
                 target_calendar,
-                start_local,
-                summary,
+                in_horizon,
+                entry_id=self.entry.entry_id,
+                start=now,
+                end=horizon,
             )
 
-            await self.hass.services.async_call(
-                "calendar",
-                "create_event",
-                {
-                    "entity_id": target_calendar,
-                    "summary": summary,
-                    "description": description,
-                    "start_date_time": start_local,
-                    "end_date_time": end_local,
-                },
-                blocking=False,
+        if result is None:
+            pending = [
+                pickup
+                for pickup in in_horizon
+                if pickup.key not in self._synced_events
+            ]
+            if not pending:
+                return
+            result = await async_create_events(
+                self.hass,
+                target_calendar,
+                pending,
+                entry_id=self.entry.entry_id,
+                skipped=len(in_horizon) - len(pending),
+                recurring=self.entry.options.get(CONF_SYNC_RECURRING, False),
             )
 
-        # Bewaar de nieuwe keys in de config entry options zodat we na een
-        # herstart geen dubbele events meer aanmaken.
-        if new_keys:
-            all_keys = {*(self._synced_event_keys)}
-            keys_as_str = sorted(f"{d}|{fid}" for (d, fid) in all_keys)
-            new_options = {
-                **self.entry.options,
-                CONF_SYNCED_EVENTS: keys_as_str,
-            }
-            self.hass.config_entries.async_update_entry(
-                self.entry,
-                options=new_options,
-            )
+        _LOGGER.info(
+            "Sync naar %s: %s aangemaakt, %s bijgewerkt, %s verwijderd, "
+            "%s overgeslagen, %s mislukt (%.1f s)",
+            target_calendar,
+            result.created,
+            result.updated,
+            result.deleted,
+            result.skipped,
+            result.failed,
+            result.elapsed,
+        )
 
+        # Bewaar de nieuwe keys zodat we na een herstart geen dubbele events
+        # meer aanmaken, ook als een deel van de acties mislukt is.
+        if result.created_keys:
+            self._synced_events.async_add(result.created_keys)
+        if result.failed:
+            # Probeer de mislukte acties bij de volgende refresh opnieuw, ook
+            # als de kalender dan ongewijzigd is.
+            self._synced_until = None
 
@@ -2,18 +2,59 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Iterator, MutableSequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
 import logging
-from typing import Any
+import random
+import time
+from typing import Any, Awaitable, Callable, TypeVar
 
-from aiohttp import ClientError
+from aiohttp import ClientError, ClientResponse, ClientSession, ClientTimeout
 
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.util import dt as dt_util
+from homeassistant.util.json import json_loads
 
-from .const import API_LOGIN_PATH, API_WASTE_CALENDAR_PATH
+from .const import (
+    API_CONNECT_TIMEOUT,
+    API_LOGIN_PATH,
+    API_MAX_ATTEMPTS,
+    API_RATE_BURST,
+    API_RATE_LIMIT,
+    API_READ_TIMEOUT,
+    API_RETRY_AFTER_MAX,
+    API_RETRY_DELAY,
+    API_WASTE_CALENDAR_PATH,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_OPEN_TIME,
+    DATA_CLIENTS,
+    DOMAIN,
+    TOKEN_LIFETIME,
+    TOKEN_REFRESH_MARGIN,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
+# Gescheiden connect- en read-time-outs, ook op een gedeelde sessie.
+_TIMEOUT = ClientTimeout(
+    total=None, connect=API_CONNECT_TIMEOUT, sock_read=API_READ_TIMEOUT
+)
+
+# Statuscodes waarbij een nieuwe poging zinvol is.
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Teller van de refresh die de aanvraag doet; de client wordt gedeeld per
+# host, dus zijn eigen teller bevat ook retries van andere entries.
+_RETRY_COUNTER: ContextVar[list[int] | None] = ContextVar(
+    "klikomanager_retry_counter", default=None
+)
+
 
 class KlikomanagerApiError(Exception):
     """Algemene fout bij communiceren met Klikomanager."""
@@ -23,89 +64,419 @@ class KlikomanagerAuthError(KlikomanagerApiError):
     """Authenticatiefout bij Klikomanager."""
 
 
-async def async_login_with_password(
-    hass: HomeAssistant,
-    *,
-    host: str,
-    card_number: str,
-    password: str,
-    client_name: str,
-    app: str,
-) -> dict[str, Any]:
-    """Voer een loginWithPassword-call uit en retourneer de JSON-respons.
-
-    Verwacht een structuur zoals vastgelegd in de Tempfile:
-    - token onder `token`
-    - configuratie onder `config`
+class KlikomanagerCircuitOpenError(KlikomanagerApiError):
+    """Klikomanager is recent herhaaldelijk onbereikbaar geweest."""
+
+
+class _RetryableError(KlikomanagerApiError):
+    """Tijdelijke fout; `retry_after` is de door de server gevraagde wachttijd."""
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class KlikomanagerCircuitBreaker:
+    """Circuit breaker per host.
+
+    Na een aantal opeenvolgende mislukte aanvragen gaat het circuit open en
+    falen nieuwe aanvragen direct, zodat de coordinator de gecachte data
+    blijft tonen in plaats van steeds op time-outs te wachten.
     """
-    session = async_get_clientsession(hass)
-    url = f"https://{host}{API_LOGIN_PATH}"
 
-    payload = {
-        "cardNumber": card_number,
-        "password": password,
-        "clientName": client_name,
-        "app": app,
-        "deviceId": "",
-    }
+    def __init__(self) -> None:
+        """Initialiseer de circuit breaker."""
+        self._failures = 0
+        self._open_until = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        """Geef aan of aanvragen op dit moment geweigerd worden."""
+        return (
+            self._failures >= CIRCUIT_FAILURE_THRESHOLD
+            and time.monotonic() < self._open_until
+        )
+
+    def before_request(self) -> None:
+        """Controleer of een aanvraag door mag; zo niet, faal direct."""
+        if self.is_open:
+            raise KlikomanagerCircuitOpenError(
+                "Klikomanager is tijdelijk onbereikbaar, aanvraag overgeslagen"
+            )
+
+    def record_success(self) -> None:
+        """Registreer een geslaagde aanvraag en sluit het circuit."""
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        """Registreer een mislukte aanvraag en open het circuit zo nodig.
+
+        Na de open-periode mag er weer een aanvraag door; mislukt die, dan
+        gaat het circuit direct opnieuw open.
+        """
+        self._failures += 1
+        if self._failures >= CIRCUIT_FAILURE_THRESHOLD:
+            self._open_until = time.monotonic() + CIRCUIT_OPEN_TIME.total_seconds()
+
+
+class KlikomanagerRateLimiter:
+    """Token bucket per host.
+
+    Er mogen gemiddeld `rate` aanvragen per seconde naar de host, met een
+    burst van `capacity`; aanvragen daarboven wachten tot er weer ruimte is.
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        """Initialiseer de token bucket."""
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    async def async_acquire(self) -> None:
+        """Wacht tot er een aanvraag naar de host mag."""
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self._capacity, self._tokens + (now - self._updated) * self._rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class KlikomanagerClient:
+    """HTTP-client voor één Klikomanager-host.
+
+    De client heeft een eigen sessie (met keep-alive verbindingen en
+    gecomprimeerde responses) en gescheiden connect- en read-time-outs.
+    Tijdelijke fouten worden met jitter opnieuw geprobeerd, waarbij een
+    `Retry-After` van 429/503-responses gerespecteerd wordt.
+    """
+
+    scheme = "https"
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        host: str,
+        *,
+        max_attempts: int = API_MAX_ATTEMPTS,
+        session: ClientSession | None = None,
+    ) -> None:
+        """Initialiseer de client.
+
+        Een wegwerpclient (bijv. voor de config flow) kan met één poging en
+        de gedeelde sessie van Home Assistant werken.
+        """
+        self._hass = hass
+        self.host = host
+        self._max_attempts = max_attempts
+        self._session = session
+        self.circuit_breaker = KlikomanagerCircuitBreaker()
+        self.rate_limiter = KlikomanagerRateLimiter(API_RATE_LIMIT, API_RATE_BURST)
+        # Teller voor diagnostics: totaal aantal retries op deze host.
+        self.retries = 0
+
+    @property
+    def session(self) -> ClientSession:
+        """Retourneer (en maak zo nodig) de sessie voor deze host."""
+        if self._session is None:
+            self._session = async_create_clientsession(self._hass, timeout=_TIMEOUT)
+        return self._session
+
+    async def async_login_with_password(
+        self,
+        *,
+        card_number: str,
+        password: str,
+        client_name: str,
+        app: str,
+    ) -> dict[str, Any]:
+        """Voer een loginWithPassword-call uit en retourneer de JSON-respons.
+
+        Verwacht een structuur zoals vastgelegd in de Tempfile:
+        - token onder `token`
+        - configuratie onder `config`
+        """
+        payload = {
+            "cardNumber": card_number,
+            "password": password,
+            "clientName": client_name,
+            "app": app,
+            "deviceId": "",
+        }
+
+        data = await self._async_post(API_LOGIN_PATH, payload)
+
+        if not data.get("success"):
+            # Geen succesvolle login
+            raise KlikomanagerAuthError(
+                "Login bij Klikomanager mislukt (success = false)"
+            )
+
+        if "token" not in data:
+            raise KlikomanagerApiError("Respons van Klikomanager bevat geen token")
 
+        # Log geen token/wachtwoord!
+        _LOGGER.debug(
+            "Succesvol ingelogd bij Klikomanager voor kaartnummer eindigend op %s",
+            str(card_number)[-4:],
+        )
+
+        return data
+
+    async def async_get_waste_calendar(
+        self,
+        *,
+        token: str,
+        client_name: str,
+        app: str,
+        response_sizes: MutableSequence[int] | None = None,
+    ) -> dict[str, Any]:
+        """Haal de afvalkalender op via getMyWasteCalendar.
+
+        De grootte van de respons wordt aan `response_sizes` toegevoegd; de
+        client wordt gedeeld, dus de aanroeper houdt die zelf bij.
+        """
+        payload = {
+            "token": token,
+            "clientName": client_name,
+            "app": app,
+            "deviceId": "",
+        }
+
+        data = await self._async_post(
+            API_WASTE_CALENDAR_PATH, payload, response_sizes
+        )
+
+        if data.get("success") is False:
+            # De server weigert de token (verlopen of ongeldig)
+            raise KlikomanagerAuthError(
+                "Klikomanager weigerde de token voor de afvalkalender"
+            )
+
+        if "dates" not in data or "fractions" not in data:
+            raise KlikomanagerApiError(
+                "Respons van Klikomanager bevat geen geldige kalenderdata"
+            )
+
+        return data
+
+    async def _async_post(
+        self,
+        path: str,
+        payload: dict[str, Any],
+        response_sizes: MutableSequence[int] | None = None,
+    ) -> dict[str, Any]:
+        """POST naar de host met retries en circuit breaker."""
+        self.circuit_breaker.before_request()
+
+        for attempt in range(1, self._max_attempts + 1):
+            await self.rate_limiter.async_acquire()
+            try:
+                data = await self._async_post_once(path, payload, response_sizes)
+            except KlikomanagerAuthError:
+                # De host werkt; alleen de credentials/token zijn fout.
+                self.circuit_breaker.record_success()
+                raise
+            except _RetryableError as err:
+                delay = _retry_delay(attempt, err.retry_after)
+                if attempt == self._max_attempts or delay is None:
+                    self.circuit_breaker.record_failure()
+                    raise KlikomanagerApiError(str(err)) from err
+                _LOGGER.debug(
+                    "Klikomanager-aanvraag %s mislukt (%s), nieuwe poging over %.1f s",
+                    path,
+                    err,
+                    delay,
+                )
+                self.retries += 1
+                if (counter := _RETRY_COUNTER.get()) is not None:
+                    counter[0] += 1
+                await asyncio.sleep(delay)
+            except KlikomanagerApiError:
+                self.circuit_breaker.record_failure()
+                raise
+            else:
+                self.circuit_breaker.record_success()
+                return data
+
+        raise KlikomanagerApiError("Klikomanager-aanvraag mislukt")  # pragma: no cover
+
+    async def _async_post_once(
+        self,
+        path: str,
+        payload: dict[str, Any],
+        response_sizes: MutableSequence[int] | None,
+    ) -> dict[str, Any]:
+        """Voer één POST uit en valideer status en body."""
+        url = f"{self.scheme}://{self.host}{path}"
+        try:
+            async with self.session.post(
+                url,
+                json=payload,
+                headers={"Accept-Encoding": "gzip, deflate"},
+                timeout=_TIMEOUT,
+            ) as resp:
+                if resp.status in (401, 403):
+                    raise KlikomanagerAuthError(
+                        f"Klikomanager weigerde de aanvraag (HTTP {resp.status})"
+                    )
+                if resp.status in _RETRY_STATUSES:
+                    raise _RetryableError(
+                        f"Klikomanager antwoordde met HTTP {resp.status}",
+                        _parse_retry_after(resp),
+                    )
+                if resp.status >= 400:
+                    raise KlikomanagerApiError(
+                        f"Klikomanager antwoordde met HTTP {resp.status}"
+                    )
+                body = await resp.read()
+                if response_sizes is not None:
+                    response_sizes.append(len(body))
+                try:
+                    data = json_loads(body)
+                except ValueError as err:
+                    raise KlikomanagerApiError(
+                        "Respons van Klikomanager is geen geldige JSON"
+                    ) from err
+        except (ClientError, asyncio.TimeoutError) as err:
+            raise _RetryableError(
+                f"Kon geen verbinding maken met Klikomanager: {err!r}"
+            ) from err
+
+        if not isinstance(data, dict):
+            raise KlikomanagerApiError("Respons van Klikomanager is geen object")
+        return data
+
+
+def async_get_client(hass: HomeAssistant, host: str) -> KlikomanagerClient:
+    """Retourneer de gedeelde client voor `host`."""
+    clients: dict[str, KlikomanagerClient] = hass.data.setdefault(
+        DOMAIN, {}
+    ).setdefault(DATA_CLIENTS, {})
+    if (client := clients.get(host)) is None:
+        client = clients[host] = KlikomanagerClient(hass, host)
+    return client
+
+
+@contextmanager
+def count_retries() -> Iterator[list[int]]:
+    """Tel de retries van de aanvragen die binnen dit blok gedaan worden.
+
+    Ook taken die binnen het blok gestart worden tellen mee. Het aantal staat
+    na afloop in het eerste element van de lijst.
+    """
+    counter = [0]
+    token = _RETRY_COUNTER.set(counter)
     try:
-        async with session.post(url, json=payload, timeout=15) as resp:
-            data: dict[str, Any] = await resp.json()
-    except ClientError as err:
-        raise KlikomanagerApiError(
-            f"Kon geen verbinding maken met Klikomanager: {err}"
-        ) from err
-
-    if not data.get("success"):
-        # Geen succesvolle login
-        raise KlikomanagerAuthError("Login bij Klikomanager mislukt (success = false)")
-
-    if "token" not in data:
-        raise KlikomanagerApiError("Respons van Klikomanager bevat geen token")
-
-    # Log geen token/wachtwoord!
-    _LOGGER.debug(
-        "Succesvol ingelogd bij Klikomanager voor kaartnummer eindigend op %s",
-        str(card_number)[-4:],
-    )
-
-    return data
-
-
-async def async_get_waste_calendar(
-    hass: HomeAssistant,
-    *,
-    host: str,
-    token: str,
-    client_name: str,
-    app: str,
-) -> dict[str, Any]:
-    """Haal de afvalkalender op via getMyWasteCalendar."""
-    session = async_get_clientsession(hass)
-    url = f"https://{host}{API_WASTE_CALENDAR_PATH}"
-
-    payload = {
-        "token": token,
-        "clientName": client_name,
-        "app": app,
-        "deviceId": "",
-    }
+        yield counter
+    finally:
+        _RETRY_COUNTER.reset(token)
 
+
+def _parse_retry_after(resp: ClientResponse) -> float | None:
+    """Lees een Retry-After-header (seconden of HTTP-datum) uit."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
     try:
-        async with session.post(url, json=payload, timeout=15) as resp:
-            data: dict[str, Any] = await resp.json()
-    except ClientError as err:
-        raise KlikomanagerApiError(
-            f"Kon geen verbinding maken met Klikomanager (waste calendar): {err}"
-        ) from err
-
-    if "dates" not in data or "fractions" not in data:
-        raise KlikomanagerApiError(
-            "Respons van Klikomanager bevat geen geldige kalenderdata"
-        )
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - dt_util.utcnow()).total_seconds())
+
 
-    return data
+def _retry_delay(attempt: int, retry_after: float | None) -> float | None:
+    """Bepaal de wachttijd voor de volgende poging; None betekent opgeven."""
+    if retry_after is not None:
+        return retry_after if retry_after <= API_RETRY_AFTER_MAX else None
+    return API_RETRY_DELAY * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
 
 
+class KlikomanagerTokenManager:
+    """Beheer de short-lived token van een Klikomanager-kaart.
+
+    De token wordt in het geheugen bewaard en hergebruikt tot
+    TOKEN_REFRESH_MARGIN vóór het einde van de aangenomen TOKEN_LIFETIME;
+    daarna logt de volgende aanvraag eerst opnieuw in. Weigert de server de
+    token eerder, dan wordt (eenmalig) opnieuw ingelogd en de call herhaald.
+    """
 
+    def __init__(
+        self,
+        client: KlikomanagerClient,
+        *,
+        card_number: str,
+        password: str,
+        client_name: str,
+        app: str,
+    ) -> None:
+        """Initialiseer de token manager."""
+        self._client = client
+        self._card_number = card_number
+        self._password = password
+        self._client_name = client_name
+        self._app = app
+        self._token: str | None = None
+        # Monotone tijd waarna de token als verlopen geldt.
+        self._expires_at = 0.0
+        # Voorkom dat gelijktijdige aanvragen elk een eigen login doen.
+        self._lock = asyncio.Lock()
+        self.login_result: dict[str, Any] | None = None
+
+    @property
+    def token_valid(self) -> bool:
+        """Geef aan of er een token is die niet geweigerd is en niet bijna verloopt."""
+        return self._token is not None and time.monotonic() < self._expires_at
+
+    def seed(self, login_result: dict[str, Any]) -> None:
+        """Neem een login-respons van zojuist over (bijv. uit de config flow)."""
+        self._store(login_result)
+
+    def invalidate(self) -> None:
+        """Vergeet de huidige token zodat de volgende aanvraag opnieuw inlogt."""
+        self._token = None
+
+    async def async_get_token(self) -> str:
+        """Retourneer een geldige token en log zo nodig opnieuw in."""
+        async with self._lock:
+            if self.token_valid:
+                assert self._token is not None
+                return self._token
+
+            login_result = await self._client.async_login_with_password(
+                card_number=self._card_number,
+                password=self._password,
+                client_name=self._client_name,
+                app=self._app,
+            )
+            self._store(login_result)
+            return login_result["token"]
+
+    async def async_call(self, call: Callable[[str], Awaitable[_T]]) -> _T:
+        """Voer een call uit met de token en log eenmalig opnieuw in bij weigering."""
+        token = await self.async_get_token()
+        try:
+            return await call(token)
+        except KlikomanagerAuthError:
+            _LOGGER.debug("Token geweigerd door Klikomanager, opnieuw inloggen")
+            if self._token == token:
+                self.invalidate()
+            token = await self.async_get_token()
+            return await call(token)
+
+    def _store(self, login_result: dict[str, Any]) -> None:
+        """Bewaar de token van een login-respons en bepaal wanneer hij verloopt."""
+        self.login_result = login_result
+        self._token = login_result["token"]
+        self._expires_at = (
+            time.monotonic() + (TOKEN_LIFETIME - TOKEN_REFRESH_MARGIN).total_seconds()
+        )
@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timedelta
+import hashlib
 from typing import Any
 
 from homeassistant.components.calendar import (
@@ -10,12 +11,22 @@ from homeassistant.components.calendar import (
     CalendarEvent,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_point_in_utc_time
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN, DEFAULT_NAME
+from .const import (
+    CONF_CARDS,
+    CONF_FRACTION_CALENDARS,
+    DOMAIN,
+    DEFAULT_NAME,
+    STALE_AFTER,
+)
+from .fleet import KlikomanagerFleetCoordinator
+from .index import KlikomanagerEventIndex
+from .storage import KlikomanagerArchive
 from . import KlikomanagerDataUpdateCoordinator
 
 
@@ -26,6 +37,10 @@ async def async_setup_entry(
 ) -> None:
     """Set up de calendar-entity vanuit een config entry."""
     data = hass.data[DOMAIN][entry.entry_id]
+    if CONF_CARDS in entry.data:
+        _async_setup_fleet_entities(data["coordinator"], entry, async_add_entities)
+        return
+
     coordinator: KlikomanagerDataUpdateCoordinator = data["coordinator"]
 
     async_add_entities(
@@ -37,11 +52,79 @@ async def async_setup_entry(
         ]
     )
 
+    fraction_calendars = entry.options.get(CONF_FRACTION_CALENDARS, False)
+
+    async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Herlaad de entry als de fractiekalenders aan- of uitgezet worden."""
+        if entry.options.get(CONF_FRACTION_CALENDARS, False) != fraction_calendars:
+            await hass.config_entries.async_reload(entry.entry_id)
+
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
+    if fraction_calendars:
+        _async_setup_fraction_entities(coordinator, entry, async_add_entities)
+
+
+@callback
+def _async_setup_fraction_entities(
+    coordinator: KlikomanagerDataUpdateCoordinator,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Eén calendar-entity per fractie; nieuwe fracties krijgen alsnog een entity."""
+    known_fractions: set[int] = set()
+
+    @callback
+    def _async_add_fraction_entities() -> None:
+        index = coordinator.data
+        if not index:
+            return
+        new_fractions = [
+            fraction_id
+            for fraction_id in index.fractions
+            if fraction_id not in known_fractions
+        ]
+        if not new_fractions:
+            return
+        known_fractions.update(new_fractions)
+        async_add_entities(
+            KlikomanagerFractionCalendarEntity(coordinator, entry, fraction_id)
+            for fraction_id in new_fractions
+        )
+
+    _async_add_fraction_entities()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_fraction_entities))
+
+
+@callback
+def _async_setup_fleet_entities(
+    coordinator: KlikomanagerFleetCoordinator,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Eén calendar-entity per adres; nieuwe adressen krijgen alsnog een entity."""
+    known_keys: set[str] = set()
+
+    @callback
+    def _async_add_address_entities() -> None:
+        new_keys = [key for key in coordinator.data or {} if key not in known_keys]
+        if not new_keys:
+            return
+        known_keys.update(new_keys)
+        async_add_entities(
+            KlikomanagerFleetCalendarEntity(coordinator, entry, key)
+            for key in new_keys
+        )
+
+    _async_add_address_entities()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_address_entities))
+
 
 class KlikomanagerCalendarEntity(CoordinatorEntity[KlikomanagerDataUpdateCoordinator], CalendarEntity):
     """Calendar entity die ophaaldagen van Klikomanager toont."""
 
     _attr_has_entity_name = True
+    # Fractie waartoe de events beperkt zijn; None toont alle fracties.
+    _fraction_id: int | None = None
 
     def __init__(
         self,
@@ -53,12 +136,133 @@ class KlikomanagerCalendarEntity(CoordinatorEntity[KlikomanagerDataUpdateCoordin
         self._entry = entry
         self._attr_unique_id = f"{entry.entry_id}_calendar"
         self._attr_name = DEFAULT_NAME
+        # Eén timer op de eerstvolgende start/eind-overgang van de state.
+        self._unsub_transition: CALLBACK_TYPE | None = None
+        # Timer op het moment waarop de data verouderd raakt.
+        self._unsub_stale: CALLBACK_TYPE | None = None
+        self._last_written: tuple[Any, datetime | None] | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Start de timers zodra de entity is toegevoegd."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self._async_cancel_transition)
+        self.async_on_remove(self._async_cancel_stale)
+        self._last_written = self._written
+        self._async_schedule_transition()
+        self._async_schedule_stale()
+
+    @property
+    def _written(self) -> tuple[Any, datetime | None]:
+        """Retourneer waarvan de geschreven state afhangt: events en `last_fetched`."""
+        return (self._index, self._last_fetched)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Werk alleen bij als de events of `last_fetched` van deze entity wijzigen.
+
+        De timers volgen altijd de nieuwe data, ook als de state gelijk blijft.
+        """
+        self._async_schedule_transition()
+        self._async_schedule_stale()
+        written = self._written
+        if written == self._last_written and written[0] is not None:
+            return
+        self._last_written = written
+        super()._handle_coordinator_update()
+
+    @callback
+    def _async_schedule_transition(self) -> None:
+        """Zet een timer op de volgende start of het volgende einde van een event."""
+        self._async_cancel_transition()
+
+        index = self._index
+        if not index:
+            return
+
+        transition = index.next_transition(dt_util.utcnow(), self._fraction_id)
+        if transition is not None:
+            self._unsub_transition = async_track_point_in_utc_time(
+                self.hass, self._async_handle_transition, transition
+            )
+
+    @callback
+    def _async_handle_transition(self, _now: datetime) -> None:
+        """Schrijf de nieuwe state op het overgangsmoment en plan de volgende."""
+        self._unsub_transition = None
+        self.async_write_ha_state()
+        self._async_schedule_transition()
+
+    @callback
+    def _async_cancel_transition(self) -> None:
+        """Annuleer een lopende overgangstimer."""
+        if self._unsub_transition is not None:
+            self._unsub_transition()
+            self._unsub_transition = None
+
+    @callback
+    def _async_schedule_stale(self) -> None:
+        """Zet een timer op het moment waarop `stale` omslaat.
+
+        Een ongewijzigde of mislukte refresh informeert de listeners niet,
+        dus zonder deze timer zou `stale` pas bij een volgende overgang
+        bijgewerkt worden.
+        """
+        self._async_cancel_stale()
+
+        last_fetched = self._last_fetched
+        if last_fetched is None:
+            return
+
+        stale_at = last_fetched + STALE_AFTER
+        if stale_at > dt_util.utcnow():
+            self._unsub_stale = async_track_point_in_utc_time(
+                self.hass, self._async_handle_stale, stale_at
+            )
+
+    @callback
+    def _async_handle_stale(self, _now: datetime) -> None:
+        """Schrijf de state op het verloopmoment; een nieuwere fetch plant opnieuw."""
+        self._unsub_stale = None
+        self._last_written = self._written
+        self.async_write_ha_state()
+        self._async_schedule_stale()
+
+    @callback
+    def _async_cancel_stale(self) -> None:
+        """Annuleer een lopende verlooptimer."""
+        if self._unsub_stale is not None:
+            self._unsub_stale()
+            self._unsub_stale = None
+
+    @property
+    def _index(self) -> KlikomanagerEventIndex | None:
+        """Retourneer de index waaruit deze entity events toont."""
+        return self.coordinator.data
+
+    @property
+    def _last_fetched(self) -> datetime | None:
+        """Retourneer wanneer de getoonde data is opgehaald."""
+        return self.coordinator.last_fetched
+
+    @property
+    def _archive(self) -> KlikomanagerArchive | None:
+        """Retourneer het archief met voorbije ophaalmomenten, indien aanwezig."""
+        return self.coordinator.archive
+
+    @property
+    def available(self) -> bool:
+        """Blijf beschikbaar zolang er (eventueel gecachte) data is."""
+        return self._index is not None
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         """Retourneer extra attributen."""
+        last_fetched = self._last_fetched
         return {
             "source": "klikomanager.com",
+            "last_fetched": last_fetched.isoformat() if last_fetched else None,
+            "stale": last_fetched is None
+            or dt_util.utcnow() >= last_fetched + STALE_AFTER,
         }
 
     async def async_get_events(
@@ -69,60 +273,125 @@ class KlikomanagerCalendarEntity(CoordinatorEntity[KlikomanagerDataUpdateCoordin
     ) -> list[CalendarEvent]:
         """Retourneer events in de gevraagde periode.
 
-        Nu nog op basis van dummy-data uit de coordinator.
+        De coordinator levert een gesorteerde index, zodat dit een bisect is
+        in plaats van een scan over alle events. Dagen vóór de index komen
+        uit het archief.
         """
-        events: list[CalendarEvent] = []
-
-        # Converteer naar UTC met timezone, zoals Home Assistant verwacht
-        start_date_utc = dt_util.as_utc(start_date)
-        end_date_utc = dt_util.as_utc(end_date)
-
-        for item in self.coordinator.data or []:
-            start: datetime = dt_util.as_utc(item["start"])
-            end: datetime = dt_util.as_utc(item["end"])
-
-            # Filter op de gevraagde periode
-            if end < start_date_utc or start > end_date_utc:
-                continue
-
-            events.append(
-                CalendarEvent(
-                    summary=item.get("summary") or DEFAULT_NAME,
-                    start=start,
-                    end=end,
-                    description=item.get("description"),
-                )
-            )
+        index = self._index
+        events = (
+            index.events_between(start_date, end_date, self._fraction_id)
+            if index
+            else []
+        )
+
+        archive = self._archive
+        if archive is None or not len(archive):
+            return events
 
-        return events
+        last_day = dt_util.as_local(end_date).date()
+        if index:
+            last_day = min(last_day, index.items[0].day - timedelta(days=1))
+        history = [
+            CalendarEvent(
+                summary=pickup.summary or DEFAULT_NAME,
+                start=pickup.start,
+                end=pickup.end,
+            )
+            for pickup in archive.pickups_between_days(
+                dt_util.as_local(start_date).date(), last_day, self._fraction_id
+            )
+            if pickup.end >= start_date and pickup.start <= end_date
+        ]
+        return history + events
 
     @property
     def event(self) -> CalendarEvent | None:
         """Retourneer het eerstvolgende event (voor entity-state)."""
-        if not self.coordinator.data:
+        index = self._index
+        if not index:
             return None
 
-        now = dt_util.utcnow()
-        next_event: CalendarEvent | None = None
+        return index.next_event(dt_util.utcnow(), self._fraction_id)
 
-        for item in self.coordinator.data:
-            start: datetime = dt_util.as_utc(item["start"])
-            end: datetime = dt_util.as_utc(item["end"])
 
-            # Alleen toekomstige of lopende events meenemen
-            if end < now:
-                continue
+class KlikomanagerFractionCalendarEntity(KlikomanagerCalendarEntity):
+    """Calendar entity die alleen de ophaaldagen van één fractie toont.
 
-            candidate = CalendarEvent(
-                summary=item.get("summary") or DEFAULT_NAME,
-                start=start,
-                end=end,
-                description=item.get("description"),
-            )
+    De entity is een view op de gedeelde index van de coordinator: events
+    worden via de posities per fractie opgezocht en niet gekopieerd.
+    """
 
-            if next_event is None or candidate.start < next_event.start:
-                next_event = candidate
+    def __init__(
+        self,
+        coordinator: KlikomanagerDataUpdateCoordinator,
+        entry: ConfigEntry,
+        fraction_id: int,
+    ) -> None:
+        """Initialiseer de calendar-entity."""
+        super().__init__(coordinator, entry)
+        self._fraction_id = fraction_id
+        self._attr_unique_id = f"{entry.entry_id}_calendar_fraction_{fraction_id}"
+        self._attr_name = f"{DEFAULT_NAME} {self._fraction_name}"
 
-        return next_event
+    @property
+    def _fraction_name(self) -> str:
+        """Retourneer de naam van de fractie."""
+        index = self._index
+        if index and self._fraction_id in index.fractions:
+            return index.fractions[self._fraction_id]
+        return f"Fractie {self._fraction_id}"
 
+    @property
+    def _digest(self) -> int | None:
+        """Retourneer de digest van de events van deze fractie."""
+        index = self._index
+        return index.fraction_digest(self._fraction_id) if index else None
 
+    @property
+    def _written(self) -> tuple[Any, datetime | None]:
+        """Een nieuwe index met dezelfde events voor de fractie telt niet."""
+        return (self._digest, self._last_fetched)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Retourneer extra attributen, inclusief de fractie."""
+        return {
+            **super().extra_state_attributes,
+            "fraction_id": self._fraction_id,
+            "fraction_name": self._fraction_name,
+        }
+
+
+class KlikomanagerFleetCalendarEntity(KlikomanagerCalendarEntity):
+    """Calendar entity voor één adres uit een vloot-entry."""
+
+    _attr_has_entity_name = False
+
+    def __init__(
+        self,
+        coordinator: KlikomanagerFleetCoordinator,
+        entry: ConfigEntry,
+        key: str,
+    ) -> None:
+        """Initialiseer de calendar-entity."""
+        super().__init__(coordinator, entry)  # type: ignore[arg-type]
+        self._key = key
+        # De key kan een adres bevatten; de unique_id gebruikt een hash.
+        digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+        self._attr_unique_id = f"{entry.entry_id}_calendar_{digest}"
+        self._attr_name = coordinator.title(key)
+
+    @property
+    def _index(self) -> KlikomanagerEventIndex | None:
+        """Retourneer de index van dit adres."""
+        return (self.coordinator.data or {}).get(self._key)
+
+    @property
+    def _archive(self) -> KlikomanagerArchive | None:
+        """Vloot-entries houden geen archief bij."""
+        return None
+
+    @property
+    def _last_fetched(self) -> datetime | None:
+        """Retourneer wanneer de kalender van dit adres is opgehaald."""
+        return self.coordinator.last_fetched(self._key)
@@ -2,18 +2,21 @@
 
 from __future__ import annotations
 
+import hashlib
+
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import selector
 
 from .api import (
     KlikomanagerApiError,
     KlikomanagerAuthError,
-    async_login_with_password,
 )
+from .discovery import async_discover, municipality
+from .hub import address_title
 from .const import (
     DOMAIN,
     CONF_CARD_NUMBER,
@@ -21,10 +24,37 @@ from .const import (
     CONF_HOST,
     CONF_CLIENT_NAME,
     CONF_APP,
+    CONF_ARCHIVE_RETENTION,
+    CONF_CARDS,
+    CONF_FRACTION_CALENDARS,
+    CONF_MUNICIPALITY,
     CONF_TARGET_CALENDAR,
-    DEFAULT_HOST,
-    DEFAULT_CLIENT_NAME,
-    DEFAULT_APP,
+    CONF_REFRESH_WINDOW_START,
+    CONF_REFRESH_WINDOW_END,
+    CONF_SYNC_MODE,
+    CONF_SYNC_RECURRING,
+    DATA_PENDING_LOGINS,
+    DEFAULT_REFRESH_WINDOW_START,
+    DEFAULT_REFRESH_WINDOW_END,
+    DEFAULT_SYNC_MODE,
+    SYNC_MODE_APPEND,
+    SYNC_MODE_RECONCILE,
+    MUNICIPALITIES,
+)
+
+_HOUR_SELECTOR = selector.NumberSelector(
+    selector.NumberSelectorConfig(
+        min=0, max=23, step=1, mode=selector.NumberSelectorMode.BOX
+    )
+)
+
+# Leeg laten probeert het register; een eigen slug voor gemeenten daarbuiten.
+_MUNICIPALITY_SELECTOR = selector.SelectSelector(
+    selector.SelectSelectorConfig(
+        options=list(MUNICIPALITIES),
+        custom_value=True,
+        mode=selector.SelectSelectorMode.DROPDOWN,
+    )
 )
 
 
@@ -32,59 +62,85 @@ async def _async_validate_input(
     hass: HomeAssistant,
     data: dict,
 ) -> dict:
-    """Valideer de gebruikersinvoer via een login-call naar Klikomanager."""
+    """Valideer de gebruikersinvoer via een login-call naar Klikomanager.
+
+    Zonder opgegeven gemeente worden de gemeenten uit het register
+    gelijktijdig geprobeerd; de eerste geslaagde login bepaalt de host.
+    """
     card_number: str = data[CONF_CARD_NUMBER]
     password: str = data[CONF_PASSWORD]
+    slug: str | None = data.get(CONF_MUNICIPALITY) or None
 
-    # Voor nu gebruiken we de standaard host/client/app voor Uithoorn.
-    host: str = DEFAULT_HOST
-    client_name: str = DEFAULT_CLIENT_NAME
-    app: str = DEFAULT_APP
-
-    result = await async_login_with_password(
-        hass,
-        host=host,
-        card_number=card_number,
-        password=password,
-        client_name=client_name,
-        app=app,
-    )
-
-    config = result.get("config", {}) or {}
-    card_details = config.get("cardDetails", {}) or {}
-    address = card_details.get("address", {}) or {}
-
-    street = address.get("street")
-    street_number = address.get("streetNumber")
-    zip_code = address.get("zipCode")
+    slug, result = await async_discover(hass, card_number, password, slug)
+    info = municipality(slug)
 
     # Mooie titel op basis van adres, valt terug op kaartnummer.
-    address_parts = [p for p in (street, street_number, zip_code) if p]
-    if address_parts:
-        title = "Klikomanager (" + ", ".join(address_parts) + ")"
-    else:
-        title = f"Klikomanager kaart {card_number}"
+    title = address_title(result, card_number)
 
     return {
         "title": title,
-        "host": host,
-        "client_name": client_name,
-        "app": app,
+        "host": info[CONF_HOST],
+        "client_name": info[CONF_CLIENT_NAME],
+        "app": info[CONF_APP],
+        "login_result": result,
     }
 
 
+def _parse_cards(text: str) -> list[dict[str, str]]:
+    """Lees kaarten uit tekst met per regel kaartnummer:wachtwoord.
+
+    Lege regels worden overgeslagen en dubbele kaartnummers genegeerd; een
+    regel zonder scheidingsteken maakt de hele invoer ongeldig.
+    """
+    cards: dict[str, dict[str, str]] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        card_number, sep, password = line.partition(":")
+        if not sep or not card_number.strip() or not password:
+            return []
+        cards.setdefault(
+            card_number.strip(),
+            {CONF_CARD_NUMBER: card_number.strip(), CONF_PASSWORD: password},
+        )
+    return list(cards.values())
+
+
 class KlikomanagerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Config flow voor Klikomanager."""
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> KlikomanagerOptionsFlowHandler:
+        """Return the options flow handler."""
+        return KlikomanagerOptionsFlowHandler(config_entry)
+
+    @classmethod
+    @callback
+    def async_supports_options_flow(
+        cls, config_entry: config_entries.ConfigEntry
+    ) -> bool:
+        """Vloot-entries gebruiken geen van de opties en tonen dus geen Opties."""
+        return CONF_CARDS not in config_entry.data
+
     async def async_step_user(self, user_input: dict | None = None) -> FlowResult:
-        """Afhandelen van de eerste stap."""
+        """Kies tussen één kaart en een vloot kaarten."""
+        return self.async_show_menu(step_id="user", menu_options=["card", "fleet"])
+
+    async def async_step_card(self, user_input: dict | None = None) -> FlowResult:
+        """Afhandelen van één kaart."""
         errors: dict[str, str] = {}
 
         if user_input is not None:
             try:
                 info = await _async_validate_input(self.hass, user_input)
+            except ValueError:
+                errors[CONF_MUNICIPALITY] = "invalid_municipality"
             except KlikomanagerAuthError:
                 errors["base"] = "invalid_auth"
             except KlikomanagerApiError:
@@ -97,6 +153,13 @@ class KlikomanagerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 )
                 self._abort_if_unique_id_configured()
 
+                # Geef de login door aan de eerste refresh van de coordinator,
+                # zodat die niet direct opnieuw hoeft in te loggen.
+                pending = self.hass.data.setdefault(DOMAIN, {}).setdefault(
+                    DATA_PENDING_LOGINS, {}
+                )
+                pending[self.unique_id] = info["login_result"]
+
                 data: dict = {
                     CONF_CARD_NUMBER: user_input[CONF_CARD_NUMBER],
                     CONF_PASSWORD: user_input[CONF_PASSWORD],
@@ -116,6 +179,7 @@ class KlikomanagerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             {
                 vol.Required(CONF_CARD_NUMBER): str,
                 vol.Required(CONF_PASSWORD): str,
+                vol.Optional(CONF_MUNICIPALITY): _MUNICIPALITY_SELECTOR,
                 vol.Optional(CONF_TARGET_CALENDAR): selector.EntitySelector(
                     selector.EntitySelectorConfig(domain="calendar")
                 ),
@@ -123,7 +187,70 @@ class KlikomanagerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
         return self.async_show_form(
-            step_id="user",
+            step_id="card",
+            data_schema=data_schema,
+            errors=errors,
+        )
+
+    async def async_step_fleet(self, user_input: dict | None = None) -> FlowResult:
+        """Afhandelen van een vloot: één kaart per regel als kaartnummer:wachtwoord.
+
+        Alleen de eerste kaart wordt hier gecontroleerd en bepaalt de
+        gemeente; de overige kaarten worden na de setup op de achtergrond
+        opgehaald.
+        """
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            cards = _parse_cards(user_input[CONF_CARDS])
+            if not cards:
+                errors[CONF_CARDS] = "invalid_cards"
+            else:
+                try:
+                    info = await _async_validate_input(
+                        self.hass,
+                        {
+                            **cards[0],
+                            CONF_MUNICIPALITY: user_input.get(CONF_MUNICIPALITY),
+                        },
+                    )
+                except ValueError:
+                    errors[CONF_MUNICIPALITY] = "invalid_municipality"
+                except KlikomanagerAuthError:
+                    errors["base"] = "invalid_auth"
+                except KlikomanagerApiError:
+                    errors["base"] = "cannot_connect"
+                except Exception:  # noqa: BLE001
+                    errors["base"] = "unknown"
+                else:
+                    card_numbers = sorted(card[CONF_CARD_NUMBER] for card in cards)
+                    digest = hashlib.sha256("|".join(card_numbers).encode()).hexdigest()
+                    await self.async_set_unique_id(
+                        f"{info['host']}_fleet_{digest[:16]}"
+                    )
+                    self._abort_if_unique_id_configured()
+
+                    return self.async_create_entry(
+                        title=f"Klikomanager vloot ({len(cards)} kaarten)",
+                        data={
+                            CONF_CARDS: cards,
+                            CONF_HOST: info["host"],
+                            CONF_CLIENT_NAME: info["client_name"],
+                            CONF_APP: info["app"],
+                        },
+                    )
+
+        data_schema = vol.Schema(
+            {
+                vol.Required(CONF_CARDS): selector.TextSelector(
+                    selector.TextSelectorConfig(multiline=True)
+                ),
+                vol.Optional(CONF_MUNICIPALITY): _MUNICIPALITY_SELECTOR,
+            }
+        )
+
+        return self.async_show_form(
+            step_id="fleet",
             data_schema=data_schema,
             errors=errors,
         )
@@ -141,10 +268,22 @@ class KlikomanagerOptionsFlowHandler(config_entries.OptionsFlow):
         user_input: dict | None = None,
     ) -> FlowResult:
         """Behandel de options-flow."""
+        if CONF_CARDS in self.config_entry.data:
+            # De vloot-coordinator heeft geen sync, venster of archief.
+            return self.async_abort(reason="fleet_no_options")
+
         if user_input is not None:
+            for key in (
+                CONF_REFRESH_WINDOW_START,
+                CONF_REFRESH_WINDOW_END,
+                CONF_ARCHIVE_RETENTION,
+            ):
+                if key in user_input:
+                    user_input[key] = int(user_input[key])
             return self.async_create_entry(title="", data=user_input)
 
-        current_target = self.config_entry.options.get(CONF_TARGET_CALENDAR, "")
+        options = self.config_entry.options
+        current_target = options.get(CONF_TARGET_CALENDAR, "")
 
         data_schema = vol.Schema(
             {
@@ -153,7 +292,48 @@ class KlikomanagerOptionsFlowHandler(config_entries.OptionsFlow):
                     default=current_target,
                 ): selector.EntitySelector(
                     selector.EntitySelectorConfig(domain="calendar")
-                )
+                ),
+                vol.Optional(
+                    CONF_SYNC_MODE,
+                    default=options.get(CONF_SYNC_MODE, DEFAULT_SYNC_MODE),
+                ): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[SYNC_MODE_APPEND, SYNC_MODE_RECONCILE],
+                        mode=selector.SelectSelectorMode.DROPDOWN,
+                    )
+                ),
+                vol.Optional(
+                    CONF_SYNC_RECURRING,
+                    default=options.get(CONF_SYNC_RECURRING, False),
+                ): selector.BooleanSelector(),
+                vol.Optional(
+                    CONF_FRACTION_CALENDARS,
+                    default=options.get(CONF_FRACTION_CALENDARS, False),
+                ): selector.BooleanSelector(),
+                vol.Optional(
+                    CONF_REFRESH_WINDOW_START,
+                    default=options.get(
+                        CONF_REFRESH_WINDOW_START, DEFAULT_REFRESH_WINDOW_START
+                    ),
+                ): _HOUR_SELECTOR,
+                vol.Optional(
+                    CONF_REFRESH_WINDOW_END,
+                    default=options.get(
+                        CONF_REFRESH_WINDOW_END, DEFAULT_REFRESH_WINDOW_END
+                    ),
+                ): _HOUR_SELECTOR,
+                vol.Optional(
+                    CONF_ARCHIVE_RETENTION,
+                    default=options.get(CONF_ARCHIVE_RETENTION, 0),
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=0,
+                        max=3650,
+                        step=1,
+                        unit_of_measurement="d",
+                        mode=selector.NumberSelectorMode.BOX,
+                    )
+                ),
             }
         )
 
@@ -161,12 +341,3 @@ class KlikomanagerOptionsFlowHandler(config_entries.OptionsFlow):
             step_id="init",
             data_schema=data_schema,
         )
-
-
-async def async_get_options_flow(
-    config_entry: config_entries.ConfigEntry,
-) -> KlikomanagerOptionsFlowHandler:
-    """Return the options flow handler."""
-    return KlikomanagerOptionsFlowHandler(config_entry)
-
-
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from datetime import time, timedelta
+
 DOMAIN = "klikomanager"
 
 # Loginvelden voor Klikomanager
@@ -15,13 +17,72 @@ CONF_APP = "app"
 # We slaan de token niet persistent op omdat deze korte tijd geldig is.
 CONF_TOKEN = "token"
 
+# De levensduur van de token is niet gedocumenteerd. We nemen een ruime maar
+# voorzichtige levensduur aan, zodat refreshes rond een ophaaldag de token
+# hergebruiken, en loggen binnen de marge vóór het verlopen opnieuw in.
+# Weigert de server de token eerder, dan wordt alsnog eenmalig opnieuw
+# ingelogd.
+TOKEN_LIFETIME = timedelta(hours=12)
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
 # Optionele target kalender-entity waar we events in kunnen wegschrijven
 CONF_TARGET_CALENDAR = "target_calendar"
 
-# Persistente set van gesynchroniseerde events (datum + fractie) om dubbele
-# creaties over HA-herstarts heen te voorkomen.
+# Vroegere option met gesynchroniseerde events (datum + fractie). Deze set
+# staat nu in een eigen Store en wordt eenmalig hieruit gemigreerd.
 CONF_SYNCED_EVENTS = "synced_events"
 
+# Na deze tijd zonder geslaagde refresh markeren we de data als verouderd.
+STALE_AFTER = timedelta(days=2)
+
+# Versie en schrijfvertraging (seconden) van de Store-bestanden per entry.
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+
+# Nachtelijk venster (lokale uren) waarin de dagelijkse refresh valt.
+CONF_REFRESH_WINDOW_START = "refresh_window_start"
+CONF_REFRESH_WINDOW_END = "refresh_window_end"
+DEFAULT_REFRESH_WINDOW_START = 2
+DEFAULT_REFRESH_WINDOW_END = 5
+
+# Refresh-planning: vaker verversen vlak voor een ophaalmoment en
+# exponentiële backoff na fouten.
+REFRESH_MIN_INTERVAL = timedelta(minutes=1)
+REFRESH_NEAR_PICKUP_WINDOW = timedelta(hours=48)
+REFRESH_NEAR_PICKUP_INTERVAL = timedelta(hours=6)
+REFRESH_BACKOFF_BASE = timedelta(minutes=2)
+REFRESH_BACKOFF_MAX = timedelta(hours=6)
+
+# Sync-modus: alleen nieuwe events toevoegen, of de target gelijktrekken
+# (aanmaken, bijwerken en verwijderen) na het eenmalig uitlezen ervan.
+CONF_SYNC_MODE = "sync_mode"
+SYNC_MODE_APPEND = "append"
+SYNC_MODE_RECONCILE = "reconcile"
+DEFAULT_SYNC_MODE = SYNC_MODE_APPEND
+# Bewaartermijn van het archief met voorbije ophaalmomenten (dagen, 0 = altijd).
+CONF_ARCHIVE_RETENTION = "archive_retention"
+
+# Vaste cycli als terugkerende events aanmaken (alleen in append-modus).
+CONF_SYNC_RECURRING = "sync_recurring"
+
+# Naast de gecombineerde kalender één calendar-entity per fractie aanmaken.
+CONF_FRACTION_CALENDARS = "fraction_calendars"
+
+# Hoe ver vooruit events naar de target kalender worden geschreven.
+SYNC_HORIZON = timedelta(days=60)
+# Aantal gelijktijdige create_event-calls en retries bij tijdelijke fouten.
+SYNC_MAX_CONCURRENCY = 4
+SYNC_MAX_ATTEMPTS = 3
+SYNC_RETRY_DELAY = 2.0
+# Een verdwenen en een nieuw ophaalmoment van dezelfde fractie binnen dit
+# aantal dagen worden als verplaatsing (één update) behandeld.
+SYNC_MOVE_MAX_DAYS = 14
+
+# Een fractie geldt als vaste cyclus vanaf dit aantal ophaalmomenten en zolang
+# de uitzonderingen (EXDATE/RDATE) hooguit deze fractie ervan uitmaken.
+RECURRENCE_MIN_OCCURRENCES = 4
+RECURRENCE_MAX_EXCEPTION_RATIO = 0.25
+
 DEFAULT_NAME = "Klikomanager Afvalkalender"
 
 # Standaardwaarden afgeleid uit de Tempfile (gemeente Uithoorn)
@@ -29,8 +90,97 @@ DEFAULT_HOST = "cp-uithoorn.klikocontainermanager.com"
 DEFAULT_CLIENT_NAME = "uithoorn"
 DEFAULT_APP = "cp-uithoorn.kcm.com"
 
+# Bekende Klikomanager-gemeenten: slug → host, clientName en app. Alleen
+# Uithoorn is geverifieerd. Een andere gemeente kan in de config flow als
+# slug worden opgegeven; die volgt dan het patroon van Uithoorn.
+CONF_MUNICIPALITY = "municipality"
+MUNICIPALITIES: dict[str, dict[str, str]] = {
+    "uithoorn": {
+        CONF_HOST: DEFAULT_HOST,
+        CONF_CLIENT_NAME: DEFAULT_CLIENT_NAME,
+        CONF_APP: DEFAULT_APP,
+    },
+}
+MUNICIPALITY_HOST_TEMPLATE = "cp-{slug}.klikocontainermanager.com"
+MUNICIPALITY_APP_TEMPLATE = "cp-{slug}.kcm.com"
+# Aantal gemeenten dat tegelijk geprobeerd wordt bij het zoeken naar de host.
+DISCOVERY_MAX_CONCURRENCY = 4
+
+# Tijdvenster waarin een ophaalmoment als event getoond wordt (lokale tijd).
+PICKUP_START = time(6, 0)
+PICKUP_END = time(9, 0)
+
+# Vanaf dit aantal ophaalmomenten wordt de ingest in de executor uitgevoerd.
+INGEST_EXECUTOR_THRESHOLD = 500
+
 API_LOGIN_PATH = "/MyKliko/loginWithPassword"
 API_WASTE_CALENDAR_PATH = "/MyKliko/getMyWasteCalendar"
 
-PLATFORMS: list[str] = ["calendar"]
+# Transport: time-outs (seconden), retries en circuit breaker per host.
+API_CONNECT_TIMEOUT = 5
+API_READ_TIMEOUT = 15
+API_MAX_ATTEMPTS = 3
+API_RETRY_DELAY = 1.0
+# Een langere Retry-After wachten we niet af binnen één refresh.
+API_RETRY_AFTER_MAX = 60
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_OPEN_TIME = timedelta(minutes=5)
+# Token bucket per host: gemiddeld aantal aanvragen per seconde en burst.
+API_RATE_LIMIT = 2.0
+API_RATE_BURST = 10
+
+# Vlootmodus: één entry met veel kaarten. Elke kalender wordt eenmaal per
+# dag op een eigen moment opgehaald; de coordinator tikt periodiek en haalt
+# per tik hooguit een batch kalenders op, met een begrensde pool.
+CONF_CARDS = "cards"
+FLEET_TICK = timedelta(minutes=5)
+FLEET_BACKLOG_TICK = timedelta(seconds=10)
+FLEET_BATCH_SIZE = 25
+FLEET_MAX_CONCURRENCY = 4
+
+PLATFORMS: list[str] = ["calendar", "sensor"]
+FLEET_PLATFORMS: list[str] = ["calendar"]
+
+# Aantal refreshes in de rolling windows van de statistieken.
+STATS_WINDOW = 50
+
+# Sleutels binnen hass.data[DOMAIN] die niet bij een config entry horen.
+# Login-resultaten uit de config flow, per unique_id, voor de eerste refresh.
+DATA_PENDING_LOGINS = "pending_logins"
+# Gedeelde API-clients per host.
+DATA_CLIENTS = "clients"
+# Gevonden gemeente per kaartnummer uit de config flow.
+DATA_DISCOVERED = "discovered"
+# Hubs per host die kalenders delen tussen entries met hetzelfde adres.
+DATA_HUBS = "hubs"
+# Cache van get_pickups-resultaten per index.
+DATA_QUERY_CACHE = "query_cache"
+# Debounce/coalesce-state van de refresh-service per coordinator.
+DATA_REFRESH_GATES = "refresh_gates"
+# De geregistreerde iCalendar-view (met zijn feed-cache).
+DATA_ICS_VIEW = "ics_view"
+
+# Pad van de iCalendar-feed per config entry.
+ICS_URL = "/api/klikomanager/{entry_id}/calendar.ics"
+
+
+# Bus-event met toegevoegde, verdwenen en verplaatste ophaalmomenten.
+EVENT_SCHEDULE_CHANGED = "klikomanager_schedule_changed"
 
+# Services.
+SERVICE_PROFILE_REFRESH = "profile_refresh"
+SERVICE_GET_PICKUPS = "get_pickups"
+SERVICE_REFRESH = "refresh"
+# get_pickups: standaardbereik (vanaf vandaag, in dagen) en het aantal
+# gecachte vragen per index.
+QUERY_DEFAULT_DAYS = 7
+QUERY_CACHE_SIZE = 64
+# Map (onder de config-map) voor profielen, aantal regels in het rapport en
+# het meetinterval van de event-loop-lag in seconden.
+PROFILE_DIR = "klikomanager_profiles"
+PROFILE_TOP = 40
+PROFILE_LAG_INTERVAL = 0.01
+# refresh: aanroepen binnen het debounce-venster (seconden) delen één
+# refresh, en per entry start hooguit eenmaal per minimuminterval een nieuwe.
+REFRESH_SERVICE_DEBOUNCE = 2.0
+REFRESH_SERVICE_MIN_INTERVAL = timedelta(minutes=5)
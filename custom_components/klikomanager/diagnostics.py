@@ -0,0 +1,87 @@
+"""Diagnostics voor de Klikomanager integratie."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_CARD_NUMBER, CONF_CARDS, CONF_PASSWORD, CONF_TOKEN, DOMAIN
+from .fleet import KlikomanagerFleetCoordinator
+from . import KlikomanagerDataUpdateCoordinator
+
+TO_REDACT = {CONF_CARD_NUMBER, CONF_CARDS, CONF_PASSWORD, CONF_TOKEN}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+) -> dict[str, Any]:
+    """Retourneer diagnostics voor een config entry."""
+    coordinator: KlikomanagerDataUpdateCoordinator = hass.data[DOMAIN][
+        entry.entry_id
+    ]["coordinator"]
+    if isinstance(coordinator, KlikomanagerFleetCoordinator):
+        return _fleet_diagnostics(entry, coordinator)
+    client = coordinator.client
+    last_fetched = coordinator.last_fetched
+
+    return {
+        "entry": {
+            "title": entry.title,
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "last_exception": repr(coordinator.last_exception)
+            if coordinator.last_exception
+            else None,
+            "last_fetched": last_fetched.isoformat() if last_fetched else None,
+            "update_interval": str(coordinator.update_interval),
+            "event_count": len(coordinator.data) if coordinator.data else 0,
+            "token_valid": coordinator.token_manager.token_valid,
+        },
+        "hub": {
+            "leader": coordinator.hub.is_leader(coordinator),
+            "shared_with": coordinator.hub.member_count(coordinator) - 1,
+        },
+        "client": {
+            "host": client.host,
+            "retries_total": client.retries,
+            "circuit_open": client.circuit_breaker.is_open,
+        },
+        "stats": coordinator.stats.as_dict(),
+    }
+
+
+def _fleet_diagnostics(
+    entry: ConfigEntry, coordinator: KlikomanagerFleetCoordinator
+) -> dict[str, Any]:
+    """Retourneer diagnostics voor een vloot-entry, zonder kaartnummers."""
+    client = coordinator.client
+    calendars = coordinator.data or {}
+    return {
+        "entry": {
+            "title": entry.title,
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "fleet": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": str(coordinator.update_interval),
+            "cards": coordinator.card_count,
+            "calendars": len(calendars),
+            "distinct_schedules": len({id(index) for index in calendars.values()}),
+            "failing": coordinator.failing,
+            "event_count": sum(len(index) for index in calendars.values()),
+        },
+        "client": {
+            "host": client.host,
+            "retries_total": client.retries,
+            "circuit_open": client.circuit_breaker.is_open,
+        },
+        "stats": coordinator.stats.as_dict(),
+    }
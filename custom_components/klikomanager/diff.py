@@ -0,0 +1,105 @@
+"""Verschil tussen twee versies van de Klikomanager-kalender."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any
+
+from .const import SYNC_MOVE_MAX_DAYS
+from .index import KlikomanagerEventIndex
+from .ingest import KlikomanagerPickup
+
+
+@dataclass(slots=True)
+class KlikomanagerScheduleDiff:
+    """Toegevoegde, verdwenen en verplaatste ophaalmomenten."""
+
+    added: list[KlikomanagerPickup] = field(default_factory=list)
+    removed: list[KlikomanagerPickup] = field(default_factory=list)
+    # (oud, nieuw) ophaalmoment van dezelfde fractie.
+    moved: list[tuple[KlikomanagerPickup, KlikomanagerPickup]] = field(
+        default_factory=list
+    )
+
+    def __bool__(self) -> bool:
+        """Geef aan of er iets veranderd is."""
+        return bool(self.added or self.removed or self.moved)
+
+    def as_event_data(self) -> dict[str, Any]:
+        """Retourneer de diff als data voor een bus-event."""
+        return {
+            "added": [_pickup_data(pickup) for pickup in self.added],
+            "removed": [_pickup_data(pickup) for pickup in self.removed],
+            "moved": [
+                {
+                    "fraction_id": new.fraction_id,
+                    "fraction": new.fraction_name,
+                    "from": old.day.isoformat(),
+                    "to": new.day.isoformat(),
+                }
+                for old, new in self.moved
+            ],
+        }
+
+
+def diff_indexes(
+    old: KlikomanagerEventIndex, new: KlikomanagerEventIndex, since: date
+) -> KlikomanagerScheduleDiff:
+    """Bereken het verschil tussen twee indexen, op (datum, fractie).
+
+    Alleen de dagen die beide versies beslaan tellen mee: vanaf `since` tot
+    en met de laatste dag van de kortste. Het venster van de API schuift
+    dagelijks op, dus ophaalmomenten die aan het begin eruit vallen of aan
+    het eind erbij komen, zijn geen wijziging.
+
+    Fracties met dezelfde digest worden overgeslagen; alleen gewijzigde
+    fracties worden op dag vergeleken. Een verdwenen en een nieuw
+    ophaalmoment van dezelfde fractie dicht bij elkaar gelden als
+    verplaatsing.
+    """
+    diff = KlikomanagerScheduleDiff()
+    last_days = [index.items[-1].day for index in (old, new) if index]
+    if not last_days:
+        return diff
+    until = min(last_days)
+    fraction_ids = {
+        fraction_id
+        for fraction_id in old.fractions.keys() | new.fractions.keys()
+        if old.fraction_digest(fraction_id) != new.fraction_digest(fraction_id)
+    }
+    for fraction_id in sorted(fraction_ids):
+        old_pickups = {
+            pickup.day: pickup
+            for pickup in old.fraction_pickups(fraction_id)
+            if since <= pickup.day <= until
+        }
+        new_pickups = {
+            pickup.day: pickup
+            for pickup in new.fraction_pickups(fraction_id)
+            if since <= pickup.day <= until
+        }
+        removed = sorted(old_pickups.keys() - new_pickups.keys())
+        added = sorted(new_pickups.keys() - old_pickups.keys())
+
+        for day in added:
+            # Eerdere verdwenen dagen die te ver weg liggen zijn geen
+            # verplaatsing meer.
+            while removed and (day - removed[0]).days > SYNC_MOVE_MAX_DAYS:
+                diff.removed.append(old_pickups[removed.pop(0)])
+            if removed and abs((removed[0] - day).days) <= SYNC_MOVE_MAX_DAYS:
+                diff.moved.append((old_pickups[removed.pop(0)], new_pickups[day]))
+            else:
+                diff.added.append(new_pickups[day])
+        diff.removed.extend(old_pickups[day] for day in removed)
+
+    return diff
+
+
+def _pickup_data(pickup: KlikomanagerPickup) -> dict[str, Any]:
+    """Retourneer een ophaalmoment als event-data."""
+    return {
+        "date": pickup.day.isoformat(),
+        "fraction_id": pickup.fraction_id,
+        "fraction": pickup.fraction_name,
+    }
@@ -0,0 +1,149 @@
+"""Bepalen bij welke Klikomanager-gemeente een kaart hoort."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .api import KlikomanagerApiError, KlikomanagerAuthError, KlikomanagerClient
+from .const import (
+    CONF_APP,
+    CONF_CLIENT_NAME,
+    CONF_HOST,
+    DATA_DISCOVERED,
+    DISCOVERY_MAX_CONCURRENCY,
+    DOMAIN,
+    MUNICIPALITIES,
+    MUNICIPALITY_APP_TEMPLATE,
+    MUNICIPALITY_HOST_TEMPLATE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_SLUG = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def municipality(slug: str) -> dict[str, str]:
+    """Retourneer host, clientName en app van een gemeente.
+
+    Een zelf opgegeven gemeente buiten het register volgt het patroon van
+    Uithoorn; of die host bestaat, blijkt pas uit de login. Een slug die geen
+    geldige hostnaam oplevert geeft een ValueError.
+    """
+    slug = slug.strip().lower()
+    if (known := MUNICIPALITIES.get(slug)) is not None:
+        return known
+    if not _SLUG.fullmatch(slug):
+        raise ValueError(f"Ongeldige gemeente: {slug!r}")
+    return {
+        CONF_HOST: MUNICIPALITY_HOST_TEMPLATE.format(slug=slug),
+        CONF_CLIENT_NAME: slug,
+        CONF_APP: MUNICIPALITY_APP_TEMPLATE.format(slug=slug),
+    }
+
+
+async def async_discover(
+    hass: HomeAssistant,
+    card_number: str,
+    password: str,
+    slug: str | None = None,
+) -> tuple[str, dict[str, Any]]:
+    """Log in bij de gemeente van een kaart en retourneer (slug, login-resultaat).
+
+    Zonder slug wordt eerst de eerder voor deze kaart gevonden gemeente
+    geprobeerd. Is die er niet of weigert die, dan worden de gemeenten uit
+    het register gelijktijdig geprobeerd, hooguit DISCOVERY_MAX_CONCURRENCY
+    tegelijk; na de eerste geslaagde login worden de overige geannuleerd.
+    De gevonden gemeente wordt per kaartnummer onthouden.
+
+    Elke poging gebruikt een eigen client met één aanvraag op de gedeelde
+    sessie, zodat een verkeerde gemeente geen retries, circuit breaker of
+    client per host achterlaat.
+
+    Mislukken alle logins, dan volgt een KlikomanagerApiError als een host
+    onbereikbaar was (de kaart kan daar horen), en anders een
+    KlikomanagerAuthError. Een ongeldige slug geeft vooraf een ValueError.
+    """
+    discovered: dict[str, str] = hass.data.setdefault(DOMAIN, {}).setdefault(
+        DATA_DISCOVERED, {}
+    )
+    if slug is not None:
+        candidates = [slug.strip().lower()]
+    elif (known := discovered.get(card_number)) is not None:
+        try:
+            return await _async_probe_all(hass, card_number, password, [known])
+        except KlikomanagerApiError as err:
+            # De kaart kan intussen bij een andere gemeente horen.
+            discovered.pop(card_number, None)
+            known_error = err
+        candidates = [other for other in MUNICIPALITIES if other != known]
+        if not candidates:
+            raise known_error
+    else:
+        candidates = list(MUNICIPALITIES)
+
+    found, result = await _async_probe_all(hass, card_number, password, candidates)
+    discovered[card_number] = found
+    return found, result
+
+
+async def _async_probe_all(
+    hass: HomeAssistant,
+    card_number: str,
+    password: str,
+    candidates: list[str],
+) -> tuple[str, dict[str, Any]]:
+    """Probeer de kandidaten gelijktijdig en retourneer de eerste geslaagde login."""
+    infos = {candidate: municipality(candidate) for candidate in candidates}
+    session = async_get_clientsession(hass)
+    semaphore = asyncio.Semaphore(DISCOVERY_MAX_CONCURRENCY)
+
+    async def _async_probe(candidate: str) -> tuple[str, dict[str, Any]]:
+        info = infos[candidate]
+        client = KlikomanagerClient(
+            hass, info[CONF_HOST], max_attempts=1, session=session
+        )
+        async with semaphore:
+            result = await client.async_login_with_password(
+                card_number=card_number,
+                password=password,
+                client_name=info[CONF_CLIENT_NAME],
+                app=info[CONF_APP],
+            )
+        return candidate, result
+
+    tasks = [
+        hass.async_create_task(
+            _async_probe(candidate), f"{DOMAIN} discover {candidate}"
+        )
+        for candidate in infos
+    ]
+    auth_error: KlikomanagerAuthError | None = None
+    api_error: KlikomanagerApiError | None = None
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                candidate, result = await next_done
+            except KlikomanagerAuthError as err:
+                auth_error = err
+            except KlikomanagerApiError as err:
+                api_error = err
+            else:
+                _LOGGER.debug(
+                    "Kaart eindigend op %s hoort bij gemeente %s",
+                    card_number[-4:],
+                    candidate,
+                )
+                return candidate, result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if api_error is not None:
+        raise api_error
+    raise auth_error or KlikomanagerAuthError("Geen gemeente om te proberen")
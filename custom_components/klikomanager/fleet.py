@@ -0,0 +1,306 @@
+"""Vlootmodus: veel Klikomanager-kaarten onder één config entry."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+import hashlib
+import logging
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import (
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
+from homeassistant.util import dt as dt_util
+
+from .api import (
+    KlikomanagerApiError,
+    KlikomanagerAuthError,
+    KlikomanagerTokenManager,
+    async_get_client,
+    count_retries,
+)
+from .const import (
+    CONF_APP,
+    CONF_CARD_NUMBER,
+    CONF_CARDS,
+    CONF_CLIENT_NAME,
+    CONF_HOST,
+    CONF_PASSWORD,
+    FLEET_BACKLOG_TICK,
+    FLEET_BATCH_SIZE,
+    FLEET_MAX_CONCURRENCY,
+    FLEET_TICK,
+    REFRESH_BACKOFF_BASE,
+    REFRESH_BACKOFF_MAX,
+)
+from .hub import address_title, calendar_key
+from .index import KlikomanagerEventIndex
+from .ingest import async_build_index, build_index, fingerprint_calendar
+from .stats import PHASE_FETCH, PHASE_INGEST, PHASE_TOTAL, KlikomanagerRefreshStats
+from .storage import KlikomanagerFleetStore, compact_calendar, expand_calendar
+
+_LOGGER = logging.getLogger(__name__)
+
+# Kalender-key van een kaart waarvan het adres (nog) onbekend is.
+_CARD_PREFIX = "card:"
+
+
+class KlikomanagerFleetCoordinator(
+    DataUpdateCoordinator[dict[str, KlikomanagerEventIndex]]
+):
+    """Coordinator die de kalenders van een vloot kaarten ophaalt.
+
+    De data is een mapping kalender-key → index. Kaarten op hetzelfde adres
+    delen één kalender en worden samen eenmaal per dag opgehaald, op een
+    vast moment dat per adres over de dag verspreid is. Elke tik haalt
+    hooguit een batch achterstallige kalenders op via een begrensde pool;
+    de token bucket van de client begrenst de belasting van de host.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialiseer de coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name="Klikomanager vloot",
+            update_interval=FLEET_TICK,
+            always_update=False,
+        )
+        self.entry = entry
+        data = entry.data
+        self.client = async_get_client(hass, data[CONF_HOST])
+        self._token_managers: dict[str, KlikomanagerTokenManager] = {
+            card[CONF_CARD_NUMBER]: KlikomanagerTokenManager(
+                self.client,
+                card_number=card[CONF_CARD_NUMBER],
+                password=card[CONF_PASSWORD],
+                client_name=data[CONF_CLIENT_NAME],
+                app=data[CONF_APP],
+            )
+            for card in data[CONF_CARDS]
+        }
+        self._store = KlikomanagerFleetStore(hass, entry.entry_id)
+        # Indexen per fingerprint; adressen met hetzelfde schema delen er één.
+        self._indexes: dict[str, KlikomanagerEventIndex] = {}
+        # Backoff per kalender-key na mislukte pogingen.
+        self._failures: dict[str, int] = {}
+        self._retry_at: dict[str, datetime] = {}
+        self.stats = KlikomanagerRefreshStats()
+
+    @property
+    def card_count(self) -> int:
+        """Retourneer het aantal kaarten in de vloot."""
+        return len(self._token_managers)
+
+    @property
+    def failing(self) -> int:
+        """Retourneer het aantal kalenders dat in backoff staat."""
+        return len(self._retry_at)
+
+    def title(self, key: str) -> str:
+        """Retourneer de titel van een kalender."""
+        if (address := self._store.addresses.get(key)) is not None:
+            return address["title"]
+        # Log en toon geen volledige kaartnummers.
+        return f"Klikomanager kaart eindigend op {key[-4:]}"
+
+    def last_fetched(self, key: str) -> datetime | None:
+        """Retourneer het moment waarop een kalender het laatst is opgehaald."""
+        address = self._store.addresses.get(key)
+        return dt_util.parse_datetime(address["fetched_at"]) if address else None
+
+    async def async_load_storage(self) -> bool:
+        """Laad de gedeelde opslag en bouw de indexen buiten de event loop.
+
+        Retourneert True als er kalenders zijn geladen waarmee de entities
+        direct kunnen starten.
+        """
+        loaded = await self._store.async_load()
+        self._store.async_retain_cards(self._token_managers)
+        if not loaded or not self._store.addresses:
+            return False
+
+        calendars = dict(self._store.calendars)
+        self._indexes = await self.hass.async_add_executor_job(
+            _build_indexes, calendars
+        )
+        self.data = self._mapping()
+        return True
+
+    async def _async_update_data(self) -> dict[str, KlikomanagerEventIndex]:
+        """Haal een batch achterstallige kalenders op en plan de volgende tik."""
+        due = self._due(dt_util.utcnow())
+        batch = due[:FLEET_BATCH_SIZE]
+        semaphore = asyncio.Semaphore(FLEET_MAX_CONCURRENCY)
+        with count_retries() as retries:
+            try:
+                with self.stats.measure(PHASE_TOTAL):
+                    results = await asyncio.gather(
+                        *(
+                            self._async_refresh_calendar(key, cards, semaphore)
+                            for key, cards in batch
+                        )
+                    )
+            finally:
+                self.stats.retries.append(retries[0])
+                self.stats.async_refresh_done()
+
+        self.update_interval = (
+            FLEET_BACKLOG_TICK if len(due) > len(batch) else FLEET_TICK
+        )
+        if batch and not any(results) and not self.data:
+            raise UpdateFailed("Geen enkele Klikomanager-kalender kon worden opgehaald")
+
+        mapping = self._mapping()
+        self.stats.event_counts.append(sum(len(index) for index in mapping.values()))
+        if self.data is not None and mapping.keys() == self.data.keys() and all(
+            mapping[key] is self.data[key] for key in mapping
+        ):
+            # Niets veranderd: zelfde object, dus geen listener-update.
+            self.stats.unchanged_refreshes += 1
+            return self.data
+        return mapping
+
+    def _groups(self) -> dict[str, list[str]]:
+        """Kaarten per kalender-key; een kaart zonder bekend adres staat alleen."""
+        groups: dict[str, list[str]] = {}
+        for card_number in self._token_managers:
+            key = self._store.cards.get(card_number) or _CARD_PREFIX + card_number
+            groups.setdefault(key, []).append(card_number)
+        return groups
+
+    def _due(self, now: datetime) -> list[tuple[str, list[str]]]:
+        """Retourneer de kalenders die opgehaald moeten worden, oudste slot eerst."""
+        due: list[tuple[datetime, str, list[str]]] = []
+        for key, cards in self._groups().items():
+            if (retry_at := self._retry_at.get(key)) is not None:
+                if now >= retry_at:
+                    due.append((retry_at, key, cards))
+                continue
+            last_fetched = self.last_fetched(key)
+            if last_fetched is None:
+                due.append((now, key, cards))
+            elif now >= (slot := _next_slot(key, last_fetched)):
+                due.append((slot, key, cards))
+        due.sort(key=lambda item: item[0])
+        return [(key, cards) for _, key, cards in due]
+
+    async def _async_refresh_calendar(
+        self, key: str, cards: list[str], semaphore: asyncio.Semaphore
+    ) -> bool:
+        """Haal één kalender op met de eerste kaart die geaccepteerd wordt."""
+        data = self.entry.data
+        async with semaphore:
+            for card_number in cards:
+                token_manager = self._token_managers[card_number]
+                try:
+                    with self.stats.measure(PHASE_FETCH):
+                        result = await token_manager.async_call(
+                            lambda token: self.client.async_get_waste_calendar(
+                                token=token,
+                                client_name=data[CONF_CLIENT_NAME],
+                                app=data[CONF_APP],
+                            )
+                        )
+                except KlikomanagerAuthError as err:
+                    _LOGGER.warning(
+                        "Kaart eindigend op %s geweigerd door Klikomanager: %s",
+                        card_number[-4:],
+                        err,
+                    )
+                    continue
+                except KlikomanagerApiError as err:
+                    self._async_backoff(key, err)
+                    return False
+                break
+            else:
+                self._async_backoff(key, "geen enkele kaart geaccepteerd")
+                return False
+
+        self._failures.pop(key, None)
+        self._retry_at.pop(key, None)
+
+        login_result = token_manager.login_result
+        new_key = calendar_key(login_result) or _CARD_PREFIX + card_number
+        dates = result.get("dates", {}) or {}
+        fractions = result.get("fractions", []) or []
+        fingerprint = fingerprint_calendar(dates, fractions)
+        if fingerprint not in self._indexes:
+            with self.stats.measure(PHASE_INGEST):
+                self._indexes[fingerprint] = await async_build_index(
+                    self.hass, dates, fractions
+                )
+
+        self._store.async_set_card(card_number, new_key)
+        self._store.async_update_address(
+            new_key,
+            title=address_title(login_result, card_number),
+            fingerprint=fingerprint,
+            fetched_at=dt_util.utcnow(),
+            calendar=None
+            if fingerprint in self._store.calendars
+            else compact_calendar(dates, fractions),
+        )
+        return True
+
+    def _async_backoff(self, key: str, err: Exception | str) -> None:
+        """Plan een nieuwe poging voor een kalender met exponentiële backoff."""
+        failures = self._failures[key] = self._failures.get(key, 0) + 1
+        delay = min(REFRESH_BACKOFF_BASE * 2 ** (failures - 1), REFRESH_BACKOFF_MAX)
+        self._retry_at[key] = dt_util.utcnow() + delay
+        _LOGGER.warning(
+            "Ophalen van %s mislukt (%s), nieuwe poging over %s",
+            self.title(key),
+            err,
+            delay,
+        )
+
+    def _mapping(self) -> dict[str, KlikomanagerEventIndex]:
+        """Bouw de mapping kalender-key → index en ruim ongebruikte indexen op."""
+        mapping = {
+            key: self._indexes[address["fingerprint"]]
+            for key, address in self._store.addresses.items()
+            if address["fingerprint"] in self._indexes
+        }
+        used = {id(index) for index in mapping.values()}
+        self._indexes = {
+            fingerprint: index
+            for fingerprint, index in self._indexes.items()
+            if id(index) in used
+        }
+        return mapping
+
+
+def _next_slot(key: str, after: datetime) -> datetime:
+    """Retourneer het eerstvolgende dagelijkse ophaalmoment van een kalender na `after`.
+
+    Het moment volgt uit een hash van de key, zodat de vloot gelijkmatig over
+    de dag verspreid wordt en elk adres een vast moment houdt.
+    """
+    offset = int(hashlib.sha256(key.encode()).hexdigest()[:8], 16) % 86400
+    slot = dt_util.as_utc(after).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) + timedelta(seconds=offset)
+    if slot <= after:
+        slot += timedelta(days=1)
+    return slot
+
+
+def _build_indexes(
+    calendars: Mapping[str, dict[str, Any]],
+) -> dict[str, KlikomanagerEventIndex]:
+    """Bouw de indexen van alle opgeslagen kalenders (in de executor)."""
+    indexes: dict[str, KlikomanagerEventIndex] = {}
+    for fingerprint, calendar in calendars.items():
+        try:
+            dates, fractions = expand_calendar(calendar)
+        except (KeyError, TypeError, ValueError) as err:
+            _LOGGER.warning("Ongeldige opgeslagen vlootkalender genegeerd: %s", err)
+            continue
+        indexes[fingerprint] = build_index(dates, fractions)
+    return indexes
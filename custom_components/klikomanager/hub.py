@@ -0,0 +1,238 @@
+"""Gedeelde kalenders van config entries op dezelfde Klikomanager-host."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+from typing import TYPE_CHECKING, Any
+import weakref
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DATA_HUBS, DOMAIN
+from .index import KlikomanagerEventIndex
+from .ingest import async_build_index
+
+if TYPE_CHECKING:
+    from . import KlikomanagerDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+_ADDRESS_PREFIX = "address:"
+
+
+@dataclass(frozen=True, slots=True)
+class KlikomanagerCalendarData:
+    """Resultaat van één opgehaalde kalender, gedeeld door alle leden."""
+
+    fingerprint: str
+    dates: Mapping[str, Any]
+    fractions: list[Any]
+    index: KlikomanagerEventIndex
+    fetched_at: datetime
+
+
+def _address(login_result: Mapping[str, Any] | None) -> Mapping[str, Any]:
+    """Retourneer het adres uit `config.cardDetails` van een login-respons."""
+    config = (login_result or {}).get("config", {}) or {}
+    return (config.get("cardDetails", {}) or {}).get("address", {}) or {}
+
+
+def address_title(login_result: Mapping[str, Any] | None, card_number: str) -> str:
+    """Bouw een titel op basis van het adres, met het kaartnummer als terugval."""
+    address = _address(login_result)
+    address_parts = [
+        part
+        for part in (
+            address.get("street"),
+            address.get("streetNumber"),
+            address.get("zipCode"),
+        )
+        if part
+    ]
+    if address_parts:
+        return "Klikomanager (" + ", ".join(str(part) for part in address_parts) + ")"
+    return f"Klikomanager kaart {card_number}"
+
+
+def calendar_key(login_result: Mapping[str, Any] | None) -> str | None:
+    """Bepaal welke kalender een kaart gebruikt.
+
+    Alleen het adres uit `config.cardDetails` van de login bepaalt de key.
+    Zonder adres wordt de kalender niet gedeeld: gelijke kalenders van
+    verschillende adressen (gebruikelijk binnen een wijk) kunnen later
+    uiteenlopen.
+    """
+    address = _address(login_result)
+    parts = [
+        f"{name}={str(value).replace(' ', '').lower()}"
+        for name, value in sorted(address.items())
+        if value not in (None, "")
+    ]
+    if parts:
+        return _ADDRESS_PREFIX + "|".join(parts)
+    return None
+
+
+class KlikomanagerHub:
+    """Deelt ophalen en event-index tussen entries met dezelfde kalender.
+
+    Per adres is de eerst geregistreerde coordinator de leader: alleen die
+    haalt volgens zijn schema op. De andere leden krijgen na elke fetch een
+    refresh die het gedeelde resultaat hergebruikt, en gelijktijdige
+    aanvragen wachten op dezelfde lopende fetch. Een lid dat het laatste
+    resultaat al heeft (bijv. bij een handmatige refresh), haalt zelf op en
+    deelt dat met de rest. Indexen worden per fingerprint gedeeld zodat
+    identieke kalenders één keer in het geheugen staan.
+    """
+
+    def __init__(self, hass: HomeAssistant, host: str) -> None:
+        """Initialiseer de hub."""
+        self._hass = hass
+        self.host = host
+        self._members: dict[str, list[KlikomanagerDataUpdateCoordinator]] = {}
+        self._keys: dict[str, str] = {}
+        self._data: dict[str, KlikomanagerCalendarData] = {}
+        self._inflight: dict[str, asyncio.Task[KlikomanagerCalendarData]] = {}
+        self._indexes: weakref.WeakValueDictionary[str, KlikomanagerEventIndex] = (
+            weakref.WeakValueDictionary()
+        )
+
+    def key_for(self, coordinator: KlikomanagerDataUpdateCoordinator) -> str | None:
+        """Retourneer de kalender-key van een coordinator, indien bekend."""
+        if (key := self._keys.get(coordinator.entry.entry_id)) is not None:
+            return key
+        return calendar_key(coordinator.token_manager.login_result)
+
+    def is_leader(self, coordinator: KlikomanagerDataUpdateCoordinator) -> bool:
+        """Geef aan of de coordinator zelf ophaalt (of niet gedeeld wordt)."""
+        key = self._keys.get(coordinator.entry.entry_id)
+        return key is None or self._members[key][0] is coordinator
+
+    def member_count(self, coordinator: KlikomanagerDataUpdateCoordinator) -> int:
+        """Retourneer het aantal entries dat de kalender van deze coordinator deelt."""
+        key = self._keys.get(coordinator.entry.entry_id)
+        return len(self._members[key]) if key is not None else 1
+
+    async def async_get_index(
+        self,
+        fingerprint: str,
+        dates: Mapping[str, Iterable[Any]],
+        fractions: Iterable[Mapping[str, Any]],
+    ) -> KlikomanagerEventIndex:
+        """Retourneer de gedeelde index voor een fingerprint, of bouw hem."""
+        if (index := self._indexes.get(fingerprint)) is not None:
+            return index
+        index = await async_build_index(self._hass, dates, fractions)
+        return self._indexes.setdefault(fingerprint, index)
+
+    async def async_fetch(
+        self,
+        coordinator: KlikomanagerDataUpdateCoordinator,
+        fetch: Callable[[], Awaitable[KlikomanagerCalendarData]],
+    ) -> KlikomanagerCalendarData:
+        """Haal de kalender van een coordinator op, of deel een ander resultaat.
+
+        Een lopende fetch voor hetzelfde adres wordt afgewacht, en een
+        resultaat dat nieuwer is dan dat van de coordinator wordt hergebruikt.
+        """
+        key = self.key_for(coordinator)
+        if key is not None:
+            if (task := self._inflight.get(key)) is not None:
+                data = await asyncio.shield(task)
+                self._async_register(coordinator, key)
+                return data
+            data = self._data.get(key)
+            if data is not None and (
+                coordinator.last_fetched is None
+                or coordinator.last_fetched < data.fetched_at
+            ):
+                self._async_register(coordinator, key)
+                return data
+
+        task = self._hass.async_create_task(
+            fetch(), f"{DOMAIN} fetch {coordinator.entry.entry_id}"
+        )
+        if key is not None:
+            self._inflight[key] = task
+        try:
+            data = await asyncio.shield(task)
+        finally:
+            if key is not None and self._inflight.get(key) is task:
+                del self._inflight[key]
+
+        new_key = calendar_key(coordinator.token_manager.login_result)
+        if new_key is None:
+            # Zonder adres deelt deze kaart niets (meer).
+            self.async_remove(coordinator)
+            return data
+        self._async_register(coordinator, new_key)
+        self._data[new_key] = data
+        self._async_notify_members(coordinator, new_key, data)
+        return data
+
+    @callback
+    def async_remove(self, coordinator: KlikomanagerDataUpdateCoordinator) -> None:
+        """Meld een coordinator af; een volger neemt zo nodig het ophalen over."""
+        key = self._keys.pop(coordinator.entry.entry_id, None)
+        if key is None:
+            return
+        members = self._members[key]
+        was_leader = members[0] is coordinator
+        members.remove(coordinator)
+        if not members:
+            del self._members[key]
+            self._data.pop(key, None)
+        elif was_leader:
+            _LOGGER.debug(
+                "%s neemt het ophalen van %s over", members[0].entry.title, key
+            )
+            members[0].async_promote()
+
+    @callback
+    def _async_register(
+        self, coordinator: KlikomanagerDataUpdateCoordinator, key: str
+    ) -> None:
+        """Koppel een coordinator aan een kalender-key."""
+        entry_id = coordinator.entry.entry_id
+        old_key = self._keys.get(entry_id)
+        if old_key == key:
+            return
+
+        self.async_remove(coordinator)
+        self._keys[entry_id] = key
+        self._members.setdefault(key, []).append(coordinator)
+
+    @callback
+    def _async_notify_members(
+        self,
+        fetcher: KlikomanagerDataUpdateCoordinator,
+        key: str,
+        data: KlikomanagerCalendarData,
+    ) -> None:
+        """Laat de andere leden met een ouder resultaat het nieuwe overnemen."""
+        for member in self._members[key]:
+            if member is fetcher or (
+                member.last_fetched is not None
+                and member.last_fetched >= data.fetched_at
+            ):
+                continue
+            member.entry.async_create_background_task(
+                self._hass,
+                member.async_request_refresh(),
+                f"{DOMAIN} shared refresh {member.entry.entry_id}",
+            )
+
+
+@callback
+def async_get_hub(hass: HomeAssistant, host: str) -> KlikomanagerHub:
+    """Retourneer de hub voor `host`."""
+    hubs: dict[str, KlikomanagerHub] = hass.data.setdefault(DOMAIN, {}).setdefault(
+        DATA_HUBS, {}
+    )
+    if (hub := hubs.get(host)) is None:
+        hub = hubs[host] = KlikomanagerHub(hass, host)
+    return hub
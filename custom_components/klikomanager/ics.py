@@ -0,0 +1,333 @@
+"""iCalendar-feed van de Klikomanager-ophaalmomenten."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, time, timedelta, tzinfo
+import gzip
+import hashlib
+from http import HTTPStatus
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import DEFAULT_NAME, DOMAIN, ICS_URL, PICKUP_END, PICKUP_START
+from .index import KlikomanagerEventIndex
+from .ingest import KlikomanagerPickup
+from .recurrence import KlikomanagerSeries, compress_index
+
+
+@dataclass(frozen=True, slots=True)
+class KlikomanagerIcsFeed:
+    """Gerenderde feed voor één versie van de index."""
+
+    index: KlikomanagerEventIndex
+    body: bytes
+    body_gzip: bytes
+    etag: str
+
+
+def _escape(value: str) -> str:
+    """Escape tekst volgens RFC 5545."""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Vouw regels langer dan 75 octets (RFC 5545, 3.1)."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+    parts: list[str] = []
+    while encoded:
+        # Knip niet midden in een UTF-8-teken.
+        cut = min(len(encoded), 75 if not parts else 74)
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+    return "\r\n ".join(parts)
+
+
+def _format_utc(value: datetime) -> str:
+    """Formatteer een UTC-tijdstip als iCalendar DATE-TIME."""
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _format_local(day: date, at: time) -> str:
+    """Formatteer een lokale dag en tijd als iCalendar DATE-TIME (met TZID)."""
+    return datetime.combine(day, at).strftime("%Y%m%dT%H%M%S")
+
+
+def _format_offset(offset: timedelta) -> str:
+    """Formatteer een UTC-offset als iCalendar UTC-OFFSET."""
+    sign = "-" if offset < timedelta(0) else "+"
+    minutes = abs(int(offset.total_seconds())) // 60
+    return f"{sign}{minutes // 60:02d}{minutes % 60:02d}"
+
+
+def _vtimezone(tz: tzinfo, tzid: str, first: date, last: date) -> list[str]:
+    """Render een VTIMEZONE met de overgangen van `tz` tussen first en last.
+
+    Elke overgang wordt als losse STANDARD/DAYLIGHT-component opgenomen, zodat
+    we geen regels voor de tijdzone hoeven af te leiden.
+    """
+    moment = datetime(first.year, 1, 1, tzinfo=UTC)
+    end = datetime(last.year + 1, 1, 1, tzinfo=UTC)
+    local = moment.astimezone(tz)
+    offset = local.utcoffset() or timedelta(0)
+    lines = ["BEGIN:VTIMEZONE", f"TZID:{tzid}"]
+
+    def component(at: datetime, offset_from: timedelta, local: datetime) -> None:
+        kind = "DAYLIGHT" if local.dst() else "STANDARD"
+        lines.extend(
+            [
+                f"BEGIN:{kind}",
+                f"DTSTART:{(at + offset_from).strftime('%Y%m%dT%H%M%S')}",
+                f"TZOFFSETFROM:{_format_offset(offset_from)}",
+                f"TZOFFSETTO:{_format_offset(local.utcoffset() or timedelta(0))}",
+                f"TZNAME:{local.tzname()}",
+                f"END:{kind}",
+            ]
+        )
+
+    component(moment, offset, local)
+    day, step = timedelta(days=1), timedelta(minutes=15)
+    while moment < end:
+        if (moment + day).astimezone(tz).utcoffset() != offset:
+            # Zoek de overgang binnen deze dag op het kwartier nauwkeurig.
+            while (moment + step).astimezone(tz).utcoffset() == offset:
+                moment += step
+            moment += step
+            local = moment.astimezone(tz)
+            component(moment, offset, local)
+            offset = local.utcoffset() or timedelta(0)
+        else:
+            moment += day
+    lines.append("END:VTIMEZONE")
+    return lines
+
+
+def _pickup_lines(
+    pickup: KlikomanagerPickup, *, entry_id: str, stamp: str
+) -> list[str]:
+    """Render één ophaalmoment als VEVENT."""
+    day, fraction_id = pickup.key
+    return [
+        "BEGIN:VEVENT",
+        f"UID:{day}-{fraction_id}@{entry_id}.{DOMAIN}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{_format_utc(pickup.start)}",
+        f"DTEND:{_format_utc(pickup.end)}",
+        _fold(f"SUMMARY:{_escape(pickup.summary or DEFAULT_NAME)}"),
+        _fold(f"DESCRIPTION:{_escape(f'Klikomanager: {pickup.fraction_name}')}"),
+        "TRANSP:TRANSPARENT",
+        "END:VEVENT",
+    ]
+
+
+def _series_lines(
+    series: KlikomanagerSeries, *, entry_id: str, stamp: str, tzid: str
+) -> list[str]:
+    """Render een vaste cyclus als één VEVENT met RRULE, EXDATE en RDATE."""
+    template = series.template
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:series-{series.fraction_id}-{series.first.isoformat()}"
+        f"@{entry_id}.{DOMAIN}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;TZID={tzid}:{_format_local(series.first, PICKUP_START)}",
+        f"DTEND;TZID={tzid}:{_format_local(series.first, PICKUP_END)}",
+        f"RRULE:{series.rrule}",
+    ]
+    for name, days in (("EXDATE", series.exdates), ("RDATE", series.rdates)):
+        if days:
+            values = ",".join(_format_local(day, PICKUP_START) for day in days)
+            lines.append(_fold(f"{name};TZID={tzid}:{values}"))
+    lines += [
+        _fold(f"SUMMARY:{_escape(template.summary or DEFAULT_NAME)}"),
+        _fold(f"DESCRIPTION:{_escape(f'Klikomanager: {template.fraction_name}')}"),
+        "TRANSP:TRANSPARENT",
+        "END:VEVENT",
+    ]
+    return lines
+
+
+def render_ics(
+    index: KlikomanagerEventIndex,
+    *,
+    entry_id: str,
+    name: str,
+    dtstamp: datetime,
+    expand: bool = False,
+) -> bytes:
+    """Render alle events van de index als VCALENDAR.
+
+    Fracties met een vast ritme worden als één terugkerend event met RRULE
+    gerenderd, tenzij `expand` is gezet of de tijdzone geen IANA-naam heeft.
+    """
+    stamp = _format_utc(dtstamp)
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//ha-klikomanager//Klikomanager Afvalkalender//NL",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        _fold(f"X-WR-CALNAME:{_escape(name)}"),
+    ]
+
+    tz = dt_util.DEFAULT_TIME_ZONE
+    tzid: str | None = getattr(tz, "key", None)
+    if expand or tzid is None or not index:
+        series: list[KlikomanagerSeries] = []
+        singles = list(index.items)
+    else:
+        series, singles = compress_index(index)
+
+    if series:
+        assert tzid is not None
+        lines += _vtimezone(tz, tzid, index.items[0].day, index.items[-1].day)
+        for found in series:
+            lines += _series_lines(found, entry_id=entry_id, stamp=stamp, tzid=tzid)
+    for pickup in singles:
+        lines += _pickup_lines(pickup, entry_id=entry_id, stamp=stamp)
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+def build_feed(
+    index: KlikomanagerEventIndex, *, entry_id: str, name: str, expand: bool = False
+) -> KlikomanagerIcsFeed:
+    """Render de feed, comprimeer hem en bereken een sterke ETag.
+
+    DTSTAMP volgt uit de data (het begin van het eerste ophaalmoment) en niet
+    uit de klok, zodat dezelfde events na een herstart of een nieuwe render
+    dezelfde bytes en dus dezelfde ETag opleveren.
+    """
+    dtstamp = index.items[0].start if index else datetime.fromtimestamp(0, UTC)
+    body = render_ics(
+        index, entry_id=entry_id, name=name, dtstamp=dtstamp, expand=expand
+    )
+    return KlikomanagerIcsFeed(
+        index=index,
+        body=body,
+        body_gzip=gzip.compress(body, compresslevel=6),
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+    )
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Geef aan of een If-None-Match-header de ETag bevat.
+
+    If-None-Match gebruikt de zwakke vergelijking, dus een `W/`-prefix telt
+    niet mee.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in (
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    )
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Geef aan of een Accept-Encoding-header gzip toestaat.
+
+    Een codering met `q=0` wordt geweigerd; zonder eigen vermelding geldt de
+    q-waarde van `*`.
+    """
+    qvalues: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *params = (item.strip() for item in part.split(";"))
+        if not coding:
+            continue
+        qvalue = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        qvalues[coding.lower()] = qvalue
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qvalues:
+            return qvalues[coding] > 0
+    return False
+
+
+class KlikomanagerIcsView(HomeAssistantView):
+    """Geauthenticeerde iCalendar-feed per config entry.
+
+    De bytes worden eenmaal per nieuwe index gerenderd en gecachet; clients
+    met een passende `If-None-Match` krijgen een 304 zonder body. Met
+    `?expand=1` krijgt een client losse events in plaats van RRULE-reeksen.
+    """
+
+    url = ICS_URL
+    name = f"api:{DOMAIN}:ics"
+    requires_auth = True
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialiseer de view."""
+        self._hass = hass
+        self._feeds: dict[tuple[str, bool], KlikomanagerIcsFeed] = {}
+
+    async def get(self, request: web.Request, entry_id: str) -> web.Response:
+        """Retourneer de feed van een config entry."""
+        entry_data = self._hass.data.get(DOMAIN, {}).get(entry_id)
+        if not isinstance(entry_data, dict) or "coordinator" not in entry_data:
+            return web.Response(status=HTTPStatus.NOT_FOUND)
+
+        coordinator = entry_data["coordinator"]
+        index = coordinator.data
+        if not isinstance(index, KlikomanagerEventIndex | None):
+            # Vloot-entries hebben geen enkele kalender om te serveren.
+            return web.Response(status=HTTPStatus.NOT_FOUND)
+        if index is None:
+            return web.Response(status=HTTPStatus.SERVICE_UNAVAILABLE)
+
+        expand = request.query.get("expand", "") in ("1", "true")
+        feed = self._feeds.get((entry_id, expand))
+        if feed is None or feed.index is not index:
+            feed = await self._hass.async_add_executor_job(
+                lambda: build_feed(
+                    index,
+                    entry_id=entry_id,
+                    name=coordinator.entry.title,
+                    expand=expand,
+                )
+            )
+            self._feeds[(entry_id, expand)] = feed
+
+        headers = {
+            "ETag": feed.etag,
+            "Cache-Control": "private, no-cache",
+            "Vary": "Accept-Encoding",
+        }
+
+        if etag_matches(request.headers.get("If-None-Match", ""), feed.etag):
+            return web.Response(status=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+        body = feed.body
+        if accepts_gzip(request.headers.get("Accept-Encoding", "")):
+            body = feed.body_gzip
+            headers["Content-Encoding"] = "gzip"
+
+        return web.Response(
+            body=body,
+            content_type="text/calendar",
+            charset="utf-8",
+            headers=headers,
+        )
+
+    def forget(self, entry_id: str) -> None:
+        """Verwijder de gecachte feed van een (ontladen) entry."""
+        for expand in (False, True):
+            self._feeds.pop((entry_id, expand), None)
@@ -0,0 +1,235 @@
+"""Gesorteerde, onveranderlijke index over de Klikomanager-events."""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Mapping, Sequence
+from datetime import date, datetime
+from itertools import accumulate
+from typing import TYPE_CHECKING
+
+from homeassistant.components.calendar import CalendarEvent
+from homeassistant.util import dt as dt_util
+
+from .const import DEFAULT_NAME
+
+if TYPE_CHECKING:
+    from .ingest import KlikomanagerPickup
+
+
+class KlikomanagerEventIndex:
+    """Op starttijd gesorteerde events met bisect-zoekfuncties.
+
+    De index wordt eenmaal per (gewijzigde) refresh opgebouwd en daarna
+    alleen gelezen. Naast de starttijden houden we een lopend maximum van de
+    eindtijden bij; dat is monotoon stijgend en maakt het mogelijk om ook de
+    ondergrens van een bereik met bisect te vinden.
+    """
+
+    __slots__ = (
+        "items",
+        "events",
+        "fractions",
+        "_starts",
+        "_ends",
+        "_max_ends",
+        "_by_fraction",
+        "_fraction_digests",
+        # Zodat de hub indexen per fingerprint zwak kan delen.
+        "__weakref__",
+    )
+
+    def __init__(
+        self,
+        items: Iterable[KlikomanagerPickup],
+        fractions: Mapping[int, str] | None = None,
+    ) -> None:
+        """Bouw de index op uit ophaal-records met UTC-tijden.
+
+        `fractions` is de fractietabel (id → naam), inclusief fracties zonder
+        ophaalmomenten.
+        """
+        # Records uit de ingest zijn al gesorteerd; Timsort is dan lineair.
+        self.items: tuple[KlikomanagerPickup, ...] = tuple(
+            sorted(items, key=lambda item: (item.start, item.end))
+        )
+        self._starts: tuple[datetime, ...] = tuple(item.start for item in self.items)
+        self._ends: tuple[datetime, ...] = tuple(item.end for item in self.items)
+        self._max_ends: tuple[datetime, ...] = tuple(accumulate(self._ends, max))
+        # CalendarEvent-objecten worden eenmalig aangemaakt en hergebruikt.
+        self.events: tuple[CalendarEvent, ...] = tuple(
+            CalendarEvent(
+                summary=item.summary or DEFAULT_NAME,
+                start=item.start,
+                end=item.end,
+            )
+            for item in self.items
+        )
+        # Per fractie de posities van haar events, op volgorde.
+        self._by_fraction: dict[int, array[int]] = {}
+        for pos, item in enumerate(self.items):
+            self._by_fraction.setdefault(item.fraction_id, array("I")).append(pos)
+        # Per fractie een digest van haar ophaaldagen; een diff tussen twee
+        # indexen hoeft zo alleen gewijzigde fracties te bekijken.
+        self._fraction_digests: dict[int, int] = {
+            fraction_id: hash(
+                tuple(self.items[pos].day.toordinal() for pos in positions)
+            )
+            for fraction_id, positions in self._by_fraction.items()
+        }
+        self.fractions: dict[int, str] = dict(fractions or {})
+        for item in self.items:
+            self.fractions.setdefault(item.fraction_id, item.fraction_name)
+
+    def __len__(self) -> int:
+        """Retourneer het aantal events."""
+        return len(self.events)
+
+    def __bool__(self) -> bool:
+        """Een lege index is onwaar, net als een lege lijst."""
+        return bool(self.events)
+
+    @property
+    def starts(self) -> Sequence[datetime]:
+        """Retourneer de gesorteerde starttijden (UTC)."""
+        return self._starts
+
+    def _scope(
+        self, lo: int, hi: int, fraction_id: int | None
+    ) -> Sequence[int]:
+        """Retourneer de posities in [lo, hi), eventueel van één fractie.
+
+        De posities per fractie zijn gesorteerde globale posities, zodat een
+        globaal bereik met twee bisects naar de fractie te vertalen is.
+        """
+        if fraction_id is None:
+            return range(lo, hi)
+        positions = self._by_fraction.get(fraction_id)
+        if not positions:
+            return ()
+        return positions[bisect_left(positions, lo) : bisect_left(positions, hi)]
+
+    def positions_between(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        fraction_id: int | None = None,
+    ) -> list[int]:
+        """Retourneer de posities van events die overlappen met [start_date, end_date].
+
+        Events die eindigen vóór `start_date` of beginnen na `end_date` vallen
+        erbuiten; dit is O(log n + k). Met `fraction_id` alleen die fractie.
+        """
+        start_date = dt_util.as_utc(start_date)
+        end_date = dt_util.as_utc(end_date)
+
+        lo = bisect_left(self._max_ends, start_date)
+        hi = bisect_right(self._starts, end_date)
+        ends = self._ends
+        return [
+            pos for pos in self._scope(lo, hi, fraction_id) if ends[pos] >= start_date
+        ]
+
+    def events_between(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        fraction_id: int | None = None,
+    ) -> list[CalendarEvent]:
+        """Retourneer de events die overlappen met [start_date, end_date]."""
+        events = self.events
+        return [
+            events[pos]
+            for pos in self.positions_between(start_date, end_date, fraction_id)
+        ]
+
+    def next_event(
+        self, now: datetime, fraction_id: int | None = None
+    ) -> CalendarEvent | None:
+        """Retourneer het lopende of eerstvolgende event op `now`."""
+        ends = self._ends
+        lo = bisect_left(self._max_ends, now)
+        for pos in self._scope(lo, len(ends), fraction_id):
+            if ends[pos] >= now:
+                return self.events[pos]
+        return None
+
+    def next_transition(
+        self, now: datetime, fraction_id: int | None = None
+    ) -> datetime | None:
+        """Retourneer het eerstvolgende start- of eindmoment na `now`.
+
+        Dat is het vroegste van de eerstvolgende start en de einden van de
+        events die op `now` lopen.
+        """
+        starts = self._starts
+        ends = self._ends
+        pos = bisect_right(starts, now)
+        upcoming = self._scope(pos, len(starts), fraction_id)
+        transition = starts[upcoming[0]] if upcoming else None
+        for running in self._scope(bisect_right(self._max_ends, now), pos, fraction_id):
+            end = ends[running]
+            if end > now and (transition is None or end < transition):
+                transition = end
+        return transition
+
+    def next_pickup(
+        self, fraction_id: int, today: date
+    ) -> KlikomanagerPickup | None:
+        """Retourneer het eerste ophaalmoment van een fractie op of na `today`."""
+        positions = self._by_fraction.get(fraction_id)
+        if not positions:
+            return None
+        items = self.items
+        pos = bisect_left(positions, today, key=lambda position: items[position].day)
+        return items[positions[pos]] if pos < len(positions) else None
+
+    def fraction_digest(self, fraction_id: int) -> int | None:
+        """Retourneer de digest van de ophaaldagen van een fractie."""
+        return self._fraction_digests.get(fraction_id)
+
+    def fraction_pickups(self, fraction_id: int) -> list[KlikomanagerPickup]:
+        """Retourneer de ophaalmomenten van één fractie, op volgorde."""
+        items = self.items
+        return [items[pos] for pos in self._by_fraction.get(fraction_id, ())]
+
+    def pickups_between_days(
+        self,
+        first: date,
+        last: date,
+        fraction_ids: Iterable[int] | None = None,
+    ) -> list[KlikomanagerPickup]:
+        """Retourneer de ophaalmomenten op de dagen [first, last], op volgorde.
+
+        Met `fraction_ids` worden alleen de positielijsten van die fracties
+        doorzocht, zodat ook een gefilterde vraag O(log n + k) blijft.
+        """
+        items = self.items
+        if fraction_ids is None:
+            lo = bisect_left(items, first, key=_day)
+            hi = bisect_right(items, last, key=_day)
+            return list(items[lo:hi])
+
+        def day(position: int) -> date:
+            return items[position].day
+
+        found: list[int] = []
+        for fraction_id in fraction_ids:
+            positions = self._by_fraction.get(fraction_id)
+            if positions:
+                lo = bisect_left(positions, first, key=day)
+                hi = bisect_right(positions, last, key=day)
+                found.extend(positions[lo:hi])
+        found.sort()
+        return [items[pos] for pos in found]
+
+    def has_start_between(self, after: datetime, until: datetime) -> bool:
+        """Geef aan of er een event start in het interval (after, until]."""
+        pos = bisect_right(self._starts, after)
+        return pos < len(self._starts) and self._starts[pos] <= until
+
+
+def _day(item: KlikomanagerPickup) -> date:
+    """Retourneer de ophaaldag van een record (bisect-key)."""
+    return item.day
@@ -0,0 +1,126 @@
+"""Omzetten van de ruwe Klikomanager-kalender naar compacte ophaal-records."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from datetime import date, datetime
+import hashlib
+import json
+import logging
+import sys
+from typing import Any, NamedTuple
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import INGEST_EXECUTOR_THRESHOLD, PICKUP_END, PICKUP_START
+from .index import KlikomanagerEventIndex
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class KlikomanagerPickup(NamedTuple):
+    """Eén ophaalmoment van één fractie.
+
+    Een NamedTuple heeft geen per-instance dict; start en end zijn al
+    tz-aware UTC zodat consumenten niet opnieuw hoeven te converteren.
+    """
+
+    start: datetime
+    end: datetime
+    day: date
+    fraction_id: int
+    fraction_name: str
+
+    @property
+    def summary(self) -> str:
+        """Retourneer de titel van het event."""
+        return self.fraction_name
+
+    @property
+    def key(self) -> tuple[str, int]:
+        """Retourneer de sleutel (datum, fractie) van dit ophaalmoment."""
+        return (self.day.isoformat(), self.fraction_id)
+
+
+def fraction_names(fractions: Iterable[Mapping[str, Any]]) -> dict[int, str]:
+    """Bouw een tabel fractie-id → naam met geïnterneerde strings."""
+    return {
+        int(f["id"]): sys.intern(str(f.get("name") or f["id"])) for f in fractions
+    }
+
+
+def ingest_calendar(
+    dates: Mapping[str, Iterable[Any]],
+    name_by_id: dict[int, str],
+) -> list[KlikomanagerPickup]:
+    """Zet `dates` uit getMyWasteCalendar om naar ophaal-records.
+
+    Elke datum wordt eenmaal geparsed en gelokaliseerd; alle fracties op die
+    dag delen dezelfde datetime-objecten en fractienamen. Onbekende fracties
+    krijgen een standaardnaam die aan `name_by_id` wordt toegevoegd.
+    """
+    pickups: list[KlikomanagerPickup] = []
+
+    # ISO-datums sorteren lexicografisch, dus de records komen op volgorde.
+    for date_str in sorted(dates):
+        # date_str is "YYYY-MM-DD"
+        try:
+            day = date.fromisoformat(date_str)
+        except ValueError:
+            _LOGGER.warning("Ongeldige datum in Klikomanager-data: %s", date_str)
+            continue
+
+        start_dt = dt_util.as_utc(datetime.combine(day, PICKUP_START))
+        end_dt = dt_util.as_utc(datetime.combine(day, PICKUP_END))
+
+        for entry in dates[date_str]:
+            # entry is [fractionId, 0]
+            if not entry:
+                continue
+            fraction_id = int(entry[0])
+            fraction_name = name_by_id.get(fraction_id)
+            if fraction_name is None:
+                fraction_name = name_by_id[fraction_id] = sys.intern(
+                    f"Fractie {fraction_id}"
+                )
+
+            pickups.append(
+                KlikomanagerPickup(start_dt, end_dt, day, fraction_id, fraction_name)
+            )
+
+    return pickups
+
+
+def build_index(
+    dates: Mapping[str, Iterable[Any]],
+    fractions: Iterable[Mapping[str, Any]],
+) -> KlikomanagerEventIndex:
+    """Ingest de kalenderdata en bouw er direct de event-index van."""
+    name_by_id = fraction_names(fractions)
+    pickups = ingest_calendar(dates, name_by_id)
+    return KlikomanagerEventIndex(pickups, name_by_id)
+
+
+def fingerprint_calendar(
+    dates: Mapping[str, Any], fractions: Iterable[Mapping[str, Any]]
+) -> str:
+    """Bereken een fingerprint van de relevante delen van de kalenderrespons."""
+    payload = json.dumps(
+        {"dates": dates, "fractions": list(fractions)},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def async_build_index(
+    hass: HomeAssistant,
+    dates: Mapping[str, Iterable[Any]],
+    fractions: Iterable[Mapping[str, Any]],
+) -> KlikomanagerEventIndex:
+    """Bouw de index; grote kalenders worden buiten de event loop verwerkt."""
+    if sum(len(entries) for entries in dates.values()) < INGEST_EXECUTOR_THRESHOLD:
+        return build_index(dates, fractions)
+
+    return await hass.async_add_executor_job(build_index, dates, fractions)
@@ -0,0 +1,142 @@
+"""Herkennen van vaste ophaalcycli per fractie (RRULE-compressie)."""
+
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from .const import RECURRENCE_MAX_EXCEPTION_RATIO, RECURRENCE_MIN_OCCURRENCES
+from .index import KlikomanagerEventIndex
+from .ingest import KlikomanagerPickup
+
+
+@dataclass(frozen=True, slots=True)
+class KlikomanagerSeries:
+    """Wekelijkse reeks ophaalmomenten van één fractie met uitzonderingen.
+
+    De reeks loopt van `first` in stappen van `interval_weeks` weken, in
+    totaal `count` slots. `exdates` zijn slots zonder ophaling, `rdates`
+    ophaalmomenten buiten het ritme (bijv. verschoven rond feestdagen).
+    """
+
+    fraction_id: int
+    first: date
+    interval_weeks: int
+    count: int
+    exdates: tuple[date, ...]
+    rdates: tuple[date, ...]
+    # Een willekeurig ophaalmoment uit de reeks, voor naam en tijden.
+    template: KlikomanagerPickup
+
+    @property
+    def rrule(self) -> str:
+        """Retourneer de RRULE (zonder uitzonderingen)."""
+        return f"FREQ=WEEKLY;INTERVAL={self.interval_weeks};COUNT={self.count}"
+
+    def slots(self) -> Iterator[date]:
+        """Itereer over alle slots van de reeks, inclusief EXDATEs."""
+        step = timedelta(weeks=self.interval_weeks)
+        for number in range(self.count):
+            yield self.first + number * step
+
+    def runs(self, start: date, end: date) -> list[tuple[date, int]]:
+        """Splits de reeks binnen [start, end] op in runs zonder EXDATEs.
+
+        Voor targets die wel RRULE maar geen EXDATE ondersteunen; elke run is
+        (eerste dag, aantal).
+        """
+        exdates = set(self.exdates)
+        runs: list[tuple[date, int]] = []
+        run_start: date | None = None
+        run_count = 0
+        for slot in self.slots():
+            if slot < start or slot > end or slot in exdates:
+                if run_start is not None:
+                    runs.append((run_start, run_count))
+                    run_start, run_count = None, 0
+                continue
+            if run_start is None:
+                run_start = slot
+            run_count += 1
+        if run_start is not None:
+            runs.append((run_start, run_count))
+        return runs
+
+
+def detect_series(
+    pickups: Sequence[KlikomanagerPickup],
+) -> KlikomanagerSeries | None:
+    """Zoek een wekelijks ritme in de (gesorteerde) ophaalmomenten van één fractie.
+
+    Het interval is het meest voorkomende verschil tussen opeenvolgende
+    ophaaldagen; het anker is de meest voorkomende fase binnen dat interval.
+    Een reeks wordt alleen teruggegeven als de uitzonderingen beperkt zijn.
+    """
+    if len(pickups) < RECURRENCE_MIN_OCCURRENCES:
+        return None
+
+    days = [pickup.day for pickup in pickups]
+    gaps = Counter(
+        (later - earlier).days
+        for earlier, later in zip(days, days[1:])
+        if (later - earlier).days % 7 == 0 and later > earlier
+    )
+    if not gaps:
+        return None
+    interval_days = gaps.most_common(1)[0][0]
+
+    phases = Counter(day.toordinal() % interval_days for day in days)
+    phase = phases.most_common(1)[0][0]
+    in_rhythm = [day for day in days if day.toordinal() % interval_days == phase]
+    first, last = in_rhythm[0], in_rhythm[-1]
+    count = (last - first).days // interval_days + 1
+
+    actual = set(days)
+    expected = {first + timedelta(days=interval_days * n) for n in range(count)}
+    exdates = tuple(sorted(expected - actual))
+    rdates = tuple(sorted(actual - expected))
+
+    if len(exdates) + len(rdates) > max(1, len(days) * RECURRENCE_MAX_EXCEPTION_RATIO):
+        return None
+
+    return KlikomanagerSeries(
+        fraction_id=pickups[0].fraction_id,
+        first=first,
+        interval_weeks=interval_days // 7,
+        count=count,
+        exdates=exdates,
+        rdates=rdates,
+        template=pickups[0],
+    )
+
+
+def compress(
+    pickups: Iterable[KlikomanagerPickup],
+) -> tuple[list[KlikomanagerSeries], list[KlikomanagerPickup]]:
+    """Verdeel ophaalmomenten in reeksen per fractie en losse events.
+
+    Losse events zijn de ophaalmomenten van fracties zonder herkenbaar ritme;
+    RDATEs blijven onderdeel van hun reeks.
+    """
+    by_fraction: dict[int, list[KlikomanagerPickup]] = {}
+    for pickup in pickups:
+        by_fraction.setdefault(pickup.fraction_id, []).append(pickup)
+
+    series: list[KlikomanagerSeries] = []
+    singles: list[KlikomanagerPickup] = []
+    for fraction_pickups in by_fraction.values():
+        fraction_pickups.sort(key=lambda pickup: pickup.day)
+        if (found := detect_series(fraction_pickups)) is not None:
+            series.append(found)
+        else:
+            singles.extend(fraction_pickups)
+    return series, singles
+
+
+def compress_index(
+    index: KlikomanagerEventIndex,
+) -> tuple[list[KlikomanagerSeries], list[KlikomanagerPickup]]:
+    """Comprimeer alle ophaalmomenten van een index."""
+    return compress(index.items)
@@ -0,0 +1,89 @@
+"""Bepalen wanneer de coordinator Klikomanager opnieuw bevraagt."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import hashlib
+import random
+
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    REFRESH_BACKOFF_BASE,
+    REFRESH_BACKOFF_MAX,
+    REFRESH_MIN_INTERVAL,
+    REFRESH_NEAR_PICKUP_INTERVAL,
+    REFRESH_NEAR_PICKUP_WINDOW,
+)
+from .index import KlikomanagerEventIndex
+
+
+class KlikomanagerRefreshScheduler:
+    """Plan refreshes in een nachtelijk venster, met jitter en backoff.
+
+    - Na een geslaagde refresh volgt de volgende in het ingestelde venster,
+      op een vaste, per entry verschillende offset zodat installaties niet
+      allemaal tegelijk de host bevragen.
+    - Staat er binnenkort een ophaalmoment gepland, dan verversen we vaker
+      zodat late wijzigingen nog opgepikt worden.
+    - Na fouten proberen we het met exponentiële backoff opnieuw, beginnend
+      bij enkele minuten in plaats van een hele dag.
+    """
+
+    def __init__(self, entry_id: str) -> None:
+        """Initialiseer de scheduler."""
+        digest = hashlib.sha256(entry_id.encode()).digest()
+        # Stabiele waarde in [0, 1) per entry.
+        self._jitter = int.from_bytes(digest[:4], "big") / 2**32
+        self._failures = 0
+
+    @property
+    def failures(self) -> int:
+        """Retourneer het aantal opeenvolgende mislukte refreshes."""
+        return self._failures
+
+    def interval_after_success(
+        self,
+        index: KlikomanagerEventIndex | None,
+        window_start: int,
+        window_end: int,
+        now: datetime | None = None,
+    ) -> timedelta:
+        """Retourneer de wachttijd tot de volgende refresh na een succes."""
+        self._failures = 0
+        now = now or dt_util.now()
+
+        interval = self._next_window_time(now, window_start, window_end) - now
+
+        if index and index.has_start_between(
+            dt_util.as_utc(now), dt_util.as_utc(now) + REFRESH_NEAR_PICKUP_WINDOW
+        ):
+            near = REFRESH_NEAR_PICKUP_INTERVAL * (0.75 + self._jitter / 2)
+            interval = min(interval, near)
+
+        return max(interval, REFRESH_MIN_INTERVAL)
+
+    def interval_after_failure(self) -> timedelta:
+        """Retourneer de wachttijd tot de volgende poging na een fout."""
+        self._failures += 1
+        backoff = min(
+            REFRESH_BACKOFF_BASE * 2 ** (self._failures - 1),
+            REFRESH_BACKOFF_MAX,
+        )
+        return backoff * random.uniform(0.8, 1.2)
+
+    def _next_window_time(
+        self, now: datetime, window_start: int, window_end: int
+    ) -> datetime:
+        """Retourneer het eerstvolgende refreshmoment in het venster."""
+        length = (window_end - window_start) % 24 or 24
+        offset = timedelta(hours=length * self._jitter)
+
+        start_of_day = dt_util.start_of_local_day(now)
+        for day in range(2):
+            candidate = (
+                start_of_day + timedelta(days=day, hours=window_start) + offset
+            )
+            if candidate - now >= REFRESH_MIN_INTERVAL:
+                return candidate
+        return start_of_day + timedelta(days=2, hours=window_start) + offset
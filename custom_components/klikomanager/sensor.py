@@ -0,0 +1,231 @@
+"""Sensor platform voor de Klikomanager integratie."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .stats import PHASE_FETCH, PHASE_TOTAL
+from . import KlikomanagerDataUpdateCoordinator
+
+
+@dataclass(frozen=True, kw_only=True)
+class KlikomanagerDiagnosticSensorDescription(SensorEntityDescription):
+    """Beschrijving van een diagnostische sensor."""
+
+    value_fn: Callable[[KlikomanagerDataUpdateCoordinator], float | int | None]
+
+
+def _phase_ms(phase: str) -> Callable[[KlikomanagerDataUpdateCoordinator], float | None]:
+    """Retourneer een value_fn voor de laatste duur van een fase in ms."""
+
+    def value(coordinator: KlikomanagerDataUpdateCoordinator) -> float | None:
+        last = coordinator.stats.phases[phase].last
+        return None if last is None else round(last * 1000, 1)
+
+    return value
+
+
+DIAGNOSTIC_SENSORS: tuple[KlikomanagerDiagnosticSensorDescription, ...] = (
+    KlikomanagerDiagnosticSensorDescription(
+        key="refresh_duration",
+        name="Refresh-duur",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_phase_ms(PHASE_TOTAL),
+    ),
+    KlikomanagerDiagnosticSensorDescription(
+        key="fetch_duration",
+        name="Ophaalduur kalender",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_phase_ms(PHASE_FETCH),
+    ),
+    KlikomanagerDiagnosticSensorDescription(
+        key="event_count",
+        name="Aantal ophaalmomenten",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: len(coordinator.data)
+        if coordinator.data
+        else 0,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up de sensoren vanuit een config entry."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    coordinator: KlikomanagerDataUpdateCoordinator = data["coordinator"]
+
+    async_add_entities(
+        KlikomanagerDiagnosticSensor(coordinator, entry, description)
+        for description in DIAGNOSTIC_SENSORS
+    )
+
+    # Eén "volgende ophaaldag"-sensor per fractie; nieuwe fracties in latere
+    # data krijgen alsnog een sensor.
+    known_fractions: set[int] = set()
+
+    @callback
+    def _async_add_fraction_sensors() -> None:
+        index = coordinator.data
+        if not index:
+            return
+        new_fractions = [
+            fraction_id
+            for fraction_id in index.fractions
+            if fraction_id not in known_fractions
+        ]
+        if not new_fractions:
+            return
+        known_fractions.update(new_fractions)
+        async_add_entities(
+            KlikomanagerNextPickupSensor(coordinator, entry, fraction_id)
+            for fraction_id in new_fractions
+        )
+
+    _async_add_fraction_sensors()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_fraction_sensors))
+
+
+class KlikomanagerDiagnosticSensor(SensorEntity):
+    """Diagnostische sensor op basis van de refresh-statistieken.
+
+    Standaard uitgeschakeld; werkt na elke refresh bij, ook als de data
+    zelf niet veranderd is.
+    """
+
+    entity_description: KlikomanagerDiagnosticSensorDescription
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        coordinator: KlikomanagerDataUpdateCoordinator,
+        entry: ConfigEntry,
+        description: KlikomanagerDiagnosticSensorDescription,
+    ) -> None:
+        """Initialiseer de sensor."""
+        self.coordinator = coordinator
+        self.entity_description = description
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+
+    async def async_added_to_hass(self) -> None:
+        """Luister naar afgeronde refreshes."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.stats.async_add_listener(self.async_write_ha_state)
+        )
+
+    @property
+    def native_value(self) -> float | int | None:
+        """Retourneer de waarde uit de statistieken."""
+        return self.entity_description.value_fn(self.coordinator)
+
+
+class KlikomanagerNextPickupSensor(
+    CoordinatorEntity[KlikomanagerDataUpdateCoordinator], SensorEntity
+):
+    """Eerstvolgende ophaaldag van één fractie.
+
+    De waarde wordt alleen herberekend bij nieuwe data en om middernacht;
+    het uitlezen van de state is daardoor O(1).
+    """
+
+    _attr_has_entity_name = True
+    _attr_device_class = SensorDeviceClass.DATE
+
+    def __init__(
+        self,
+        coordinator: KlikomanagerDataUpdateCoordinator,
+        entry: ConfigEntry,
+        fraction_id: int,
+    ) -> None:
+        """Initialiseer de sensor."""
+        super().__init__(coordinator)
+        self._fraction_id = fraction_id
+        self._attr_unique_id = f"{entry.entry_id}_next_pickup_{fraction_id}"
+        self._attr_name = f"Volgende ophaaldag {self._fraction_name}"
+        self._days_until: int | None = None
+        self._compute()
+
+    @property
+    def _fraction_name(self) -> str:
+        """Retourneer de naam van de fractie."""
+        index = self.coordinator.data
+        if index and self._fraction_id in index.fractions:
+            return index.fractions[self._fraction_id]
+        return f"Fractie {self._fraction_id}"
+
+    @property
+    def available(self) -> bool:
+        """Blijf beschikbaar zolang er (eventueel gecachte) data is."""
+        return self.coordinator.data is not None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Retourneer het aantal dagen tot de ophaaldag."""
+        return {
+            "days_until": self._days_until,
+            "fraction_id": self._fraction_id,
+            "fraction_name": self._fraction_name,
+        }
+
+    async def async_added_to_hass(self) -> None:
+        """Herbereken om middernacht."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_track_time_change(
+                self.hass, self._async_handle_midnight, hour=0, minute=0, second=0
+            )
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Herbereken bij nieuwe data."""
+        self._compute()
+        super()._handle_coordinator_update()
+
+    @callback
+    def _async_handle_midnight(self, _now: datetime) -> None:
+        """Herbereken op een nieuwe dag."""
+        self._compute()
+        self.async_write_ha_state()
+
+    def _compute(self) -> None:
+        """Zoek de volgende ophaaldag in de per-fractie index."""
+        today: date = dt_util.now().date()
+        index = self.coordinator.data
+        pickup = index.next_pickup(self._fraction_id, today) if index else None
+        if pickup is None:
+            self._attr_native_value = None
+            self._days_until = None
+        else:
+            self._attr_native_value = pickup.day
+            self._days_until = (pickup.day - today).days
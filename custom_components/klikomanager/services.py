@@ -0,0 +1,535 @@
+"""Services van de Klikomanager integratie."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+import cProfile
+from contextlib import suppress
+from datetime import date, timedelta
+import io
+from pathlib import Path
+import pstats
+import time
+from typing import Any
+import weakref
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DATA_QUERY_CACHE,
+    DATA_REFRESH_GATES,
+    DOMAIN,
+    PROFILE_DIR,
+    PROFILE_LAG_INTERVAL,
+    PROFILE_TOP,
+    QUERY_CACHE_SIZE,
+    QUERY_DEFAULT_DAYS,
+    REFRESH_SERVICE_DEBOUNCE,
+    REFRESH_SERVICE_MIN_INTERVAL,
+    SERVICE_GET_PICKUPS,
+    SERVICE_PROFILE_REFRESH,
+    SERVICE_REFRESH,
+)
+from .index import KlikomanagerEventIndex
+from .ingest import KlikomanagerPickup
+from .stats import KlikomanagerRefreshStats
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_LOOP_LAG = "loop_lag"
+ATTR_TOP = "top"
+ATTR_CONFIG_ENTRY_IDS = "config_entry_ids"
+ATTR_RANGES = "ranges"
+ATTR_FRACTIONS = "fractions"
+
+PROFILE_REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_LOOP_LAG, default=False): cv.boolean,
+        vol.Optional(ATTR_TOP, default=PROFILE_TOP): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=500)
+        ),
+    }
+)
+
+# Een bereik is absoluut (start/end) of relatief aan vandaag (offset/days).
+_RANGE_SCHEMA = vol.Any(
+    vol.Schema(
+        {
+            vol.Optional("name"): cv.string,
+            vol.Required("start"): cv.date,
+            vol.Required("end"): cv.date,
+        }
+    ),
+    vol.Schema(
+        {
+            vol.Optional("name"): cv.string,
+            vol.Optional("offset", default=0): vol.Coerce(int),
+            vol.Required("days"): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        }
+    ),
+)
+
+GET_PICKUPS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_IDS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_RANGES): vol.All(cv.ensure_list, [_RANGE_SCHEMA]),
+        vol.Optional(ATTR_FRACTIONS): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_IDS): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+# cProfile kan niet genest draaien; één profiel tegelijk.
+_PROFILE_LOCK = asyncio.Lock()
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Registreer de services van de integratie."""
+
+    async def _async_profile_refresh(call: ServiceCall) -> ServiceResponse:
+        return await async_profile_refresh(
+            hass,
+            call.data[ATTR_CONFIG_ENTRY_ID],
+            loop_lag=call.data[ATTR_LOOP_LAG],
+            top=call.data[ATTR_TOP],
+        )
+
+    async def _async_get_pickups(call: ServiceCall) -> ServiceResponse:
+        return async_get_pickups(
+            hass,
+            call.data.get(ATTR_CONFIG_ENTRY_IDS),
+            call.data.get(ATTR_RANGES),
+            call.data.get(ATTR_FRACTIONS),
+        )
+
+    async def _async_refresh(call: ServiceCall) -> ServiceResponse:
+        return await async_refresh(hass, call.data.get(ATTR_CONFIG_ENTRY_IDS))
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REFRESH,
+        _async_refresh,
+        schema=REFRESH_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_PICKUPS,
+        _async_get_pickups,
+        schema=GET_PICKUPS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE_REFRESH,
+        _async_profile_refresh,
+        schema=PROFILE_REFRESH_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _get_coordinator(hass: HomeAssistant, entry_id: str) -> Any:
+    """Zoek de coordinator van een geladen config entry op.
+
+    Alleen via de config entries: hass.data[DOMAIN] bevat ook gedeelde
+    state (hubs, clients, logins) onder eigen sleutels.
+    """
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if (
+        entry is None
+        or entry.domain != DOMAIN
+        or entry.state is not ConfigEntryState.LOADED
+    ):
+        raise ServiceValidationError(
+            f"Geen geladen Klikomanager config entry met id {entry_id}"
+        )
+    return hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+
+def _loaded_entry_ids(hass: HomeAssistant) -> list[str]:
+    """Retourneer de ids van alle geladen entries."""
+    return [
+        entry.entry_id
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.state is ConfigEntryState.LOADED
+    ]
+
+
+def async_get_pickups(
+    hass: HomeAssistant,
+    entry_ids: list[str] | None,
+    ranges: list[dict[str, Any]] | None,
+    fractions: list[str] | None,
+) -> dict[str, Any]:
+    """Beantwoord ophaalvragen voor meerdere entries en bereiken in één keer.
+
+    Alles komt uit de in-memory indexen; resultaten worden per index (de
+    dataversie), bereik en fractiefilter gecachet.
+    """
+    domain_data: dict[str, Any] = hass.data.get(DOMAIN, {})
+    if entry_ids is None:
+        entry_ids = _loaded_entry_ids(hass)
+    coordinators = {
+        entry_id: _get_coordinator(hass, entry_id) for entry_id in entry_ids
+    }
+
+    today = dt_util.now().date()
+    resolved = [
+        _resolve_range(query, today)
+        for query in ranges or [{"offset": 0, "days": QUERY_DEFAULT_DAYS}]
+    ]
+    wanted = {fraction.casefold() for fraction in fractions} if fractions else None
+    if (cache := domain_data.get(DATA_QUERY_CACHE)) is None:
+        cache = domain_data[DATA_QUERY_CACHE] = _PickupCache()
+
+    entries: dict[str, Any] = {}
+    for entry_id, coordinator in coordinators.items():
+        calendars: dict[str, Any] = {}
+        for name, index in _calendars(coordinator).items():
+            fraction_ids = _fraction_ids(index, wanted)
+            calendars[name] = {
+                range_name: cache.get(index, first, last, fraction_ids)
+                for range_name, first, last in resolved
+            }
+        entries[entry_id] = {"title": coordinator.entry.title, "calendars": calendars}
+    return {"entries": entries}
+
+
+def _resolve_range(query: dict[str, Any], today: date) -> tuple[str, date, date]:
+    """Zet een bereik om naar (naam, eerste dag, laatste dag)."""
+    if "start" in query:
+        first, last = query["start"], query["end"]
+    else:
+        first = today + timedelta(days=query["offset"])
+        last = first + timedelta(days=query["days"] - 1)
+    if last < first:
+        raise ServiceValidationError(f"Bereik eindigt vóór het begint: {first} – {last}")
+    return query.get("name") or f"{first.isoformat()}/{last.isoformat()}", first, last
+
+
+def _calendars(coordinator: Any) -> dict[str, KlikomanagerEventIndex]:
+    """Retourneer de indexen van een coordinator per kalendernaam."""
+    data = coordinator.data
+    if data is None:
+        return {}
+    if isinstance(data, KlikomanagerEventIndex):
+        return {coordinator.entry.title: data}
+    # Vloot: één index per adres.
+    return {coordinator.title(key): index for key, index in data.items()}
+
+
+def _fraction_ids(
+    index: KlikomanagerEventIndex, wanted: set[str] | None
+) -> tuple[int, ...] | None:
+    """Vertaal een filter op fractienamen of -ids naar de ids van deze index."""
+    if wanted is None:
+        return None
+    return tuple(
+        sorted(
+            fraction_id
+            for fraction_id, name in index.fractions.items()
+            if str(fraction_id) in wanted or name.casefold() in wanted
+        )
+    )
+
+
+class _PickupCache:
+    """Resultaten van ophaalvragen per index.
+
+    Een nieuwe index (na gewijzigde data) krijgt een lege cache; de oude
+    verdwijnt vanzelf met de index. Per index blijven de meest recente
+    vragen bewaard.
+    """
+
+    def __init__(self) -> None:
+        """Initialiseer de cache."""
+        self._results: weakref.WeakKeyDictionary[
+            KlikomanagerEventIndex,
+            OrderedDict[tuple[date, date, tuple[int, ...] | None], list[dict[str, Any]]],
+        ] = weakref.WeakKeyDictionary()
+
+    def get(
+        self,
+        index: KlikomanagerEventIndex,
+        first: date,
+        last: date,
+        fraction_ids: tuple[int, ...] | None,
+    ) -> list[dict[str, Any]]:
+        """Retourneer de ophaalmomenten uit de cache of bereken ze."""
+        results = self._results.setdefault(index, OrderedDict())
+        key = (first, last, fraction_ids)
+        if (found := results.get(key)) is not None:
+            results.move_to_end(key)
+            return found
+
+        found = [
+            _pickup_dict(pickup)
+            for pickup in index.pickups_between_days(first, last, fraction_ids)
+        ]
+        results[key] = found
+        if len(results) > QUERY_CACHE_SIZE:
+            results.popitem(last=False)
+        return found
+
+
+def _pickup_dict(pickup: KlikomanagerPickup) -> dict[str, Any]:
+    """Zet een ophaalmoment om naar service-responsdata."""
+    return {
+        "date": pickup.day.isoformat(),
+        "fraction_id": pickup.fraction_id,
+        "fraction": pickup.fraction_name,
+        "start": pickup.start.isoformat(),
+        "end": pickup.end.isoformat(),
+    }
+
+
+async def async_profile_refresh(
+    hass: HomeAssistant, entry_id: str, *, loop_lag: bool, top: int
+) -> dict[str, Any]:
+    """Voer één refresh van een entry uit onder cProfile en schrijf het resultaat weg.
+
+    Het profiel omvat alles wat in die tijd op de event loop draait (ook
+    andere integraties); werk in de executor, zoals een grote ingest, valt
+    erbuiten en is alleen in de wall-clock-verdeling zichtbaar.
+    """
+    coordinator = _get_coordinator(hass, entry_id)
+    if _PROFILE_LOCK.locked():
+        raise HomeAssistantError("Er loopt al een Klikomanager-profiel")
+
+    async with _PROFILE_LOCK:
+        stats = coordinator.stats
+        counts_before = _phase_counts(stats)
+        sampler = _LoopLagSampler(PROFILE_LAG_INTERVAL) if loop_lag else None
+        if sampler is not None:
+            sampler.start(hass)
+
+        profiler = cProfile.Profile()
+        started_at = dt_util.utcnow()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await coordinator.async_refresh()
+        finally:
+            profiler.disable()
+            wall = time.perf_counter() - started
+            if sampler is not None:
+                await sampler.async_stop()
+
+    summary: dict[str, Any] = {
+        "entry_id": entry_id,
+        "started": started_at.isoformat(),
+        "success": coordinator.last_update_success,
+        "wall_ms": round(wall * 1000, 2),
+        "phases_ms": _phases_since(stats, counts_before),
+    }
+    if sampler is not None:
+        summary["loop_lag"] = sampler.as_dict()
+
+    base = Path(hass.config.path(PROFILE_DIR)) / (
+        f"{entry_id}_{started_at.strftime('%Y%m%dT%H%M%SZ')}"
+    )
+    summary["files"] = await hass.async_add_executor_job(
+        _write_profile, profiler, base, summary, top
+    )
+    return summary
+
+
+def _phase_counts(stats: KlikomanagerRefreshStats) -> dict[str, int]:
+    """Retourneer het aantal metingen per fase tot nu toe."""
+    return {
+        phase: len(phase_stats.durations) for phase, phase_stats in stats.phases.items()
+    }
+
+
+def _phases_since(
+    stats: KlikomanagerRefreshStats, counts_before: dict[str, int]
+) -> dict[str, float]:
+    """Tel per fase de duur (ms) van de metingen sinds `counts_before` op.
+
+    Alleen fases die sindsdien gemeten zijn komen in het resultaat.
+    """
+    return {
+        phase: round(sum(list(phase_stats.durations)[counts_before[phase]:]) * 1000, 2)
+        for phase, phase_stats in stats.phases.items()
+        if len(phase_stats.durations) > counts_before[phase]
+    }
+
+
+def _write_profile(
+    profiler: cProfile.Profile, base: Path, summary: dict[str, Any], top: int
+) -> dict[str, str]:
+    """Schrijf het ruwe profiel en een leesbaar rapport (in de executor)."""
+    base.parent.mkdir(parents=True, exist_ok=True)
+    prof_path = base.with_suffix(".prof")
+    report_path = base.with_suffix(".txt")
+    profiler.dump_stats(prof_path)
+
+    report = io.StringIO()
+    report.write("Klikomanager profile_refresh\n")
+    for key, value in summary.items():
+        report.write(f"{key}: {value}\n")
+    report.write("\n")
+    pstats.Stats(profiler, stream=report).sort_stats(
+        pstats.SortKey.CUMULATIVE
+    ).print_stats(top)
+    report_path.write_text(report.getvalue(), encoding="utf-8")
+    return {"profile": str(prof_path), "report": str(report_path)}
+
+
+class _LoopLagSampler:
+    """Meet hoe laat een periodieke slaap op de event loop terugkomt.
+
+    Elke vertraging boven het interval is tijd waarin de loop door iets
+    anders bezet was.
+    """
+
+    def __init__(self, interval: float) -> None:
+        """Initialiseer de sampler."""
+        self._interval = interval
+        self._lags: list[float] = []
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self, hass: HomeAssistant) -> None:
+        """Start het meten."""
+        self._task = hass.async_create_background_task(
+            self._async_run(), f"{DOMAIN} loop lag sampler"
+        )
+
+    async def async_stop(self) -> None:
+        """Stop het meten."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+
+    async def _async_run(self) -> None:
+        """Meet de lag tot het meten gestopt wordt."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            self._lags.append(max(0.0, loop.time() - expected))
+
+    def as_dict(self) -> dict[str, Any]:
+        """Retourneer een samenvatting in milliseconden."""
+        lags = sorted(self._lags)
+        if not lags:
+            return {"samples": 0}
+        return {
+            "samples": len(lags),
+            "interval_ms": round(self._interval * 1000, 2),
+            "avg_ms": round(sum(lags) / len(lags) * 1000, 2),
+            "p95_ms": round(lags[int(0.95 * (len(lags) - 1))] * 1000, 2),
+            "max_ms": round(lags[-1] * 1000, 2),
+        }
+
+
+async def async_refresh(
+    hass: HomeAssistant, entry_ids: list[str] | None
+) -> dict[str, Any]:
+    """Ververs de gevraagde entries zonder ze te herladen.
+
+    Per entry wachten aanroepen binnen het debounce-venster en tijdens een
+    lopende refresh op dezelfde refresh; daarna start er binnen het
+    minimuminterval geen nieuwe en krijgt de aanroeper de vorige uitkomst.
+    """
+    if entry_ids is None:
+        entry_ids = _loaded_entry_ids(hass)
+    coordinators = {
+        entry_id: _get_coordinator(hass, entry_id) for entry_id in entry_ids
+    }
+    domain_data: dict[str, Any] = hass.data[DOMAIN]
+    if (gates := domain_data.get(DATA_REFRESH_GATES)) is None:
+        gates = domain_data[DATA_REFRESH_GATES] = weakref.WeakKeyDictionary()
+
+    for coordinator in coordinators.values():
+        if coordinator not in gates:
+            gates[coordinator] = _RefreshGate(coordinator)
+    results = await asyncio.gather(
+        *(gates[coordinator].async_refresh(hass) for coordinator in coordinators.values())
+    )
+    return {"entries": dict(zip(coordinators, results))}
+
+
+class _RefreshGate:
+    """Debounce, bundel en begrens handmatige refreshes van één coordinator.
+
+    De gate houdt de coordinator zwak vast, zodat hij met een herladen entry
+    verdwijnt.
+    """
+
+    def __init__(self, coordinator: Any) -> None:
+        """Initialiseer de gate."""
+        self._coordinator = weakref.ref(coordinator)
+        self._pending: asyncio.Task[dict[str, Any]] | None = None
+        self._last: dict[str, Any] | None = None
+        self._next_allowed = 0.0
+
+    async def async_refresh(self, hass: HomeAssistant) -> dict[str, Any]:
+        """Sluit aan bij de lopende refresh, of start er een als dat mag."""
+        if self._pending is not None:
+            # Een geannuleerde aanroeper mag de refresh van anderen niet stoppen.
+            return {**await asyncio.shield(self._pending), "coalesced": True}
+
+        now = time.monotonic()
+        if now < self._next_allowed:
+            return {
+                **(self._last or {}),
+                "refreshed": False,
+                "retry_after_s": round(self._next_allowed - now, 1),
+            }
+
+        self._pending = hass.async_create_task(
+            self._async_run(), f"{DOMAIN} service refresh"
+        )
+        return await asyncio.shield(self._pending)
+
+    async def _async_run(self) -> dict[str, Any]:
+        """Wacht het debounce-venster af en voer één refresh uit."""
+        try:
+            await asyncio.sleep(REFRESH_SERVICE_DEBOUNCE)
+            coordinator = self._coordinator()
+            if coordinator is None:
+                raise HomeAssistantError("De Klikomanager-entry is niet meer geladen")
+
+            stats = coordinator.stats
+            counts_before = _phase_counts(stats)
+            data_before = coordinator.data
+            started_at = dt_util.utcnow()
+            started = time.perf_counter()
+            await coordinator.async_refresh()
+            wall = time.perf_counter() - started
+
+            self._last = {
+                "refreshed": True,
+                "started": started_at.isoformat(),
+                "success": coordinator.last_update_success,
+                # Ongewijzigde data levert hetzelfde object op.
+                "changed": coordinator.data is not data_before,
+                "wall_ms": round(wall * 1000, 2),
+                "phases_ms": _phases_since(stats, counts_before),
+            }
+            return self._last
+        finally:
+            # Ook na een mislukte refresh: niet direct opnieuw de API belasten.
+            self._next_allowed = (
+                time.monotonic() + REFRESH_SERVICE_MIN_INTERVAL.total_seconds()
+            )
+            self._pending = None
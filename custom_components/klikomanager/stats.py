@@ -0,0 +1,119 @@
+"""Timings en tellers van de refreshes van een Klikomanager-coordinator."""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import datetime
+import time
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.util import dt as dt_util
+
+from .const import STATS_WINDOW
+
+PHASE_TOTAL = "total"
+PHASE_LOGIN = "login"
+PHASE_FETCH = "fetch"
+PHASE_INGEST = "ingest"
+PHASE_SYNC = "sync"
+PHASE_FANOUT = "fanout"
+
+PHASES = (PHASE_TOTAL, PHASE_LOGIN, PHASE_FETCH, PHASE_INGEST, PHASE_SYNC, PHASE_FANOUT)
+
+
+class KlikomanagerPhaseStats:
+    """Rolling window met duur en laatste fout van één fase."""
+
+    __slots__ = ("durations", "last_error", "last_error_at")
+
+    def __init__(self) -> None:
+        """Initialiseer de fase."""
+        self.durations: deque[float] = deque(maxlen=STATS_WINDOW)
+        self.last_error: str | None = None
+        self.last_error_at: datetime | None = None
+
+    @property
+    def last(self) -> float | None:
+        """Retourneer de laatst gemeten duur in seconden."""
+        return self.durations[-1] if self.durations else None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Retourneer een samenvatting in milliseconden."""
+        durations = sorted(self.durations)
+        return {
+            "count": len(durations),
+            "last_ms": _ms(self.last),
+            "avg_ms": _ms(sum(durations) / len(durations)) if durations else None,
+            "p95_ms": _ms(durations[int(0.95 * (len(durations) - 1))])
+            if durations
+            else None,
+            "max_ms": _ms(durations[-1]) if durations else None,
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at.isoformat()
+            if self.last_error_at
+            else None,
+        }
+
+
+class KlikomanagerRefreshStats:
+    """Per-fase timings, responsgroottes, aantallen en retries per refresh."""
+
+    def __init__(self) -> None:
+        """Initialiseer de statistieken."""
+        self.phases: dict[str, KlikomanagerPhaseStats] = {
+            phase: KlikomanagerPhaseStats() for phase in PHASES
+        }
+        self.response_sizes: deque[int] = deque(maxlen=STATS_WINDOW)
+        self.event_counts: deque[int] = deque(maxlen=STATS_WINDOW)
+        self.retries: deque[int] = deque(maxlen=STATS_WINDOW)
+        self.unchanged_refreshes = 0
+        self._listeners: list[Callable[[], None]] = []
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        """Meet de duur van een fase en onthoud een eventuele fout."""
+        stats = self.phases[phase]
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as err:
+            stats.last_error = f"{type(err).__name__}: {err}"
+            stats.last_error_at = dt_util.utcnow()
+            raise
+        finally:
+            stats.durations.append(time.perf_counter() - started)
+
+    @callback
+    def async_add_listener(self, update_callback: Callable[[], None]) -> CALLBACK_TYPE:
+        """Registreer een callback die na elke refresh wordt aangeroepen."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_refresh_done(self) -> None:
+        """Informeer listeners dat er een refresh is afgerond."""
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Retourneer alle statistieken (voor diagnostics)."""
+        return {
+            "phases": {phase: stats.as_dict() for phase, stats in self.phases.items()},
+            "response_size_bytes": list(self.response_sizes),
+            "event_counts": list(self.event_counts),
+            "retries": list(self.retries),
+            "unchanged_refreshes": self.unchanged_refreshes,
+        }
+
+
+def _ms(seconds: float | None) -> float | None:
+    """Zet seconden om naar afgeronde milliseconden."""
+    return None if seconds is None else round(seconds * 1000, 2)
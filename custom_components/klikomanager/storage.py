@@ -0,0 +1,431 @@
+"""Persistente opslag per config entry voor de Klikomanager integratie."""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable
+from datetime import date, datetime
+from itertools import accumulate, pairwise
+import logging
+import sys
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    PICKUP_END,
+    PICKUP_START,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+)
+from .ingest import KlikomanagerPickup
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class KlikomanagerSyncedEvents:
+    """Set van (datum, fractie)-keys die al naar de target kalender zijn geschreven.
+
+    In het geheugen per fractie een set met datum-ordinals; op schijf per
+    fractie een gesorteerde lijst ordinals. Opslaan gebeurt vertraagd zodat
+    meerdere wijzigingen in één schrijfactie terechtkomen.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialiseer de opslag."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, _storage_key(entry_id, "synced_events")
+        )
+        self._days: dict[int, set[int]] = {}
+
+    def __contains__(self, key: tuple[str, int]) -> bool:
+        """Geef aan of de key al gesynchroniseerd is."""
+        day, fraction_id = key
+        days = self._days.get(fraction_id)
+        return days is not None and date.fromisoformat(day).toordinal() in days
+
+    def __len__(self) -> int:
+        """Retourneer het aantal bewaarde keys."""
+        return sum(len(days) for days in self._days.values())
+
+    async def async_load(self, legacy_keys: Iterable[str] = ()) -> bool:
+        """Laad de keys van schijf, of migreer ze uit de oude entry-option.
+
+        Retourneert True als er een migratie uit `legacy_keys` heeft
+        plaatsgevonden; de gemigreerde keys staan dan al op schijf.
+        """
+        stored = await self._store.async_load()
+        if stored is not None:
+            self._days = {
+                int(fraction_id): set(days)
+                for fraction_id, days in stored.get("fractions", {}).items()
+            }
+            self.async_prune(dt_util.now().date())
+            return False
+
+        migrated = False
+        for str_key in legacy_keys:
+            if "|" not in str_key:
+                continue
+            day, fraction_id = str_key.split("|", 1)
+            try:
+                ordinal = date.fromisoformat(day).toordinal()
+            except ValueError:
+                continue
+            self._days.setdefault(int(fraction_id), set()).add(ordinal)
+            migrated = True
+
+        if migrated:
+            _LOGGER.debug("Gesynchroniseerde events gemigreerd naar eigen opslag")
+            self.async_prune(dt_util.now().date())
+            # Direct opslaan: de aanroeper verwijdert hierna de oude option,
+            # en een herstart binnen de vertraging zou de keys anders kwijtraken.
+            await self._store.async_save(self._data_to_save())
+        return migrated
+
+    @callback
+    def async_add(self, keys: Iterable[tuple[str, int]]) -> None:
+        """Voeg bevestigde keys toe en plan een vertraagde save."""
+        for day, fraction_id in keys:
+            self._days.setdefault(fraction_id, set()).add(
+                date.fromisoformat(day).toordinal()
+            )
+        self.async_prune(dt_util.now().date())
+        self._async_schedule_save()
+
+    @callback
+    def async_prune(self, before: date) -> None:
+        """Verwijder keys van vóór `before`; die vallen buiten het sync-venster."""
+        cutoff = before.toordinal()
+        pruned = False
+        for fraction_id in list(self._days):
+            days = self._days[fraction_id]
+            if min(days, default=cutoff) >= cutoff:
+                continue
+            days.difference_update([day for day in days if day < cutoff])
+            if not days:
+                del self._days[fraction_id]
+            pruned = True
+        if pruned:
+            self._async_schedule_save()
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        """Plan een vertraagde, samengevoegde save."""
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Compacte representatie voor op schijf."""
+        return {
+            "fractions": {
+                str(fraction_id): sorted(days)
+                for fraction_id, days in self._days.items()
+            }
+        }
+
+
+class KlikomanagerSnapshot:
+    """Laatst goed opgehaalde kalenderdata, voor een warme start na herstart.
+
+    We bewaren alleen de genormaliseerde `dates`/`fractions` uit de respons,
+    met de fingerprint en het moment van ophalen.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialiseer de opslag."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, _storage_key(entry_id, "snapshot")
+        )
+        self._data: dict[str, Any] | None = None
+
+    async def async_load(self) -> dict[str, Any] | None:
+        """Laad de snapshot van schijf."""
+        self._data = await self._store.async_load()
+        return self._data
+
+    @callback
+    def async_update(
+        self,
+        *,
+        fetched_at: datetime,
+        fingerprint: str,
+        dates: dict[str, Any] | None = None,
+        fractions: list[Any] | None = None,
+    ) -> None:
+        """Werk de snapshot bij; zonder dates/fractions alleen het tijdstip."""
+        if dates is None or fractions is None:
+            if self._data is None or self._data.get("fingerprint") != fingerprint:
+                return
+            self._data = {**self._data, "fetched_at": fetched_at.isoformat()}
+        else:
+            self._data = {
+                "fetched_at": fetched_at.isoformat(),
+                "fingerprint": fingerprint,
+                "dates": dates,
+                "fractions": fractions,
+            }
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Retourneer de snapshot voor op schijf."""
+        return self._data or {}
+
+
+class KlikomanagerFleetStore:
+    """Gedeelde, compacte opslag van alle kalenders van een vloot-entry.
+
+    Per kaart het adres (kalender-key), per adres titel, fingerprint en
+    ophaalmoment, en per fingerprint één compacte kalender: adressen met een
+    identiek schema delen zo één kopie.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialiseer de opslag."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, _storage_key(entry_id, "fleet")
+        )
+        self.cards: dict[str, str] = {}
+        self.addresses: dict[str, dict[str, Any]] = {}
+        self.calendars: dict[str, dict[str, Any]] = {}
+
+    async def async_load(self) -> bool:
+        """Laad de opslag; retourneert True als er kalenders in staan."""
+        stored = await self._store.async_load() or {}
+        self.cards = stored.get("cards", {})
+        self.addresses = stored.get("addresses", {})
+        self.calendars = stored.get("calendars", {})
+        return bool(self.addresses)
+
+    @callback
+    def async_retain_cards(self, card_numbers: Iterable[str]) -> None:
+        """Vergeet kaarten die niet (meer) in de entry staan."""
+        keep = set(card_numbers)
+        removed = [number for number in self.cards if number not in keep]
+        if not removed:
+            return
+        for number in removed:
+            del self.cards[number]
+        self._async_prune()
+        self._async_schedule_save()
+
+    @callback
+    def async_set_card(self, card_number: str, key: str) -> None:
+        """Leg vast bij welke kalender een kaart hoort."""
+        if self.cards.get(card_number) == key:
+            return
+        self.cards[card_number] = key
+        self._async_prune()
+        self._async_schedule_save()
+
+    @callback
+    def async_update_address(
+        self,
+        key: str,
+        *,
+        title: str,
+        fingerprint: str,
+        fetched_at: datetime,
+        calendar: dict[str, Any] | None = None,
+    ) -> None:
+        """Werk de kalender van een adres bij; zonder `calendar` alleen het tijdstip."""
+        if calendar is not None:
+            self.calendars.setdefault(fingerprint, calendar)
+        self.addresses[key] = {
+            "title": title,
+            "fingerprint": fingerprint,
+            "fetched_at": fetched_at.isoformat(),
+        }
+        self._async_prune()
+        self._async_schedule_save()
+
+    @callback
+    def _async_prune(self) -> None:
+        """Verwijder adressen zonder kaart en kalenders zonder adres."""
+        used_keys = set(self.cards.values())
+        for key in [key for key in self.addresses if key not in used_keys]:
+            del self.addresses[key]
+        used_fingerprints = {address["fingerprint"] for address in self.addresses.values()}
+        for fingerprint in [fp for fp in self.calendars if fp not in used_fingerprints]:
+            del self.calendars[fingerprint]
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        """Plan een vertraagde, samengevoegde save."""
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Retourneer de opslag voor op schijf."""
+        return {
+            "cards": self.cards,
+            "addresses": self.addresses,
+            "calendars": self.calendars,
+        }
+
+
+class KlikomanagerArchive:
+    """Archief van voorbije ophaalmomenten, buiten het venster van de API.
+
+    Per fractie een gesorteerde array met datum-ordinals (4 bytes per
+    ophaalmoment) en de laatst bekende naam; op schijf delta-gecodeerd.
+    Ophaalmomenten worden pas gearchiveerd als hun dag voorbij is, zodat
+    latere verplaatsingen het archief niet vervuilen.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialiseer het archief."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, _storage_key(entry_id, "archive")
+        )
+        self._days: dict[int, array[int]] = {}
+        self._names: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        """Retourneer het aantal gearchiveerde ophaalmomenten."""
+        return sum(len(days) for days in self._days.values())
+
+    async def async_load(self) -> None:
+        """Laad het archief van schijf."""
+        stored = await self._store.async_load() or {}
+        for fraction_id, fraction in stored.get("fractions", {}).items():
+            self._names[int(fraction_id)] = sys.intern(fraction["name"])
+            self._days[int(fraction_id)] = array(
+                "I", accumulate(fraction.get("days", []))
+            )
+
+    @callback
+    def async_add(
+        self, pickups: Iterable[KlikomanagerPickup], retention_days: int = 0
+    ) -> None:
+        """Voeg voorbije ophaalmomenten toe (ontdubbeld) en pas de retentie toe."""
+        changed = False
+        for pickup in pickups:
+            days = self._days.get(pickup.fraction_id)
+            if days is None:
+                days = self._days[pickup.fraction_id] = array("I")
+            self._names[pickup.fraction_id] = pickup.fraction_name
+            ordinal = pickup.day.toordinal()
+            pos = bisect_left(days, ordinal)
+            if pos == len(days) or days[pos] != ordinal:
+                days.insert(pos, ordinal)
+                changed = True
+
+        if retention_days:
+            cutoff = dt_util.now().date().toordinal() - retention_days
+            for fraction_id, days in list(self._days.items()):
+                if days and days[0] < cutoff:
+                    del days[: bisect_left(days, cutoff)]
+                    changed = True
+                if not days:
+                    del self._days[fraction_id]
+                    self._names.pop(fraction_id, None)
+
+        if changed:
+            self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    def pickups_between_days(
+        self, first: date, last: date, fraction_id: int | None = None
+    ) -> list[KlikomanagerPickup]:
+        """Retourneer de gearchiveerde ophaalmomenten op de dagen [first, last].
+
+        Records worden alleen voor het gevraagde bereik (en eventueel alleen
+        voor `fraction_id`) aangemaakt.
+        """
+        lo_ordinal, hi_ordinal = first.toordinal(), last.toordinal()
+        pickups: list[KlikomanagerPickup] = []
+        selected = (
+            self._days.items()
+            if fraction_id is None
+            else [(fraction_id, self._days[fraction_id])]
+            if fraction_id in self._days
+            else []
+        )
+        for fraction_id, days in selected:
+            name = self._names[fraction_id]
+            for ordinal in days[
+                bisect_left(days, lo_ordinal) : bisect_right(days, hi_ordinal)
+            ]:
+                day = date.fromordinal(ordinal)
+                pickups.append(
+                    KlikomanagerPickup(
+                        dt_util.as_utc(datetime.combine(day, PICKUP_START)),
+                        dt_util.as_utc(datetime.combine(day, PICKUP_END)),
+                        day,
+                        fraction_id,
+                        name,
+                    )
+                )
+        pickups.sort(key=lambda pickup: (pickup.start, pickup.fraction_id))
+        return pickups
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Compacte representatie voor op schijf: eerste ordinal plus verschillen."""
+        return {
+            "fractions": {
+                str(fraction_id): {
+                    "name": self._names[fraction_id],
+                    "days": [
+                        days[0],
+                        *(later - earlier for earlier, later in pairwise(days)),
+                    ]
+                    if days
+                    else [],
+                }
+                for fraction_id, days in self._days.items()
+            }
+        }
+
+
+def compact_calendar(
+    dates: dict[str, Any], fractions: list[Any]
+) -> dict[str, Any]:
+    """Zet een kalenderrespons om naar fractienamen en ordinals per fractie."""
+    days: dict[str, list[int]] = {}
+    for date_str in sorted(dates):
+        try:
+            ordinal = date.fromisoformat(date_str).toordinal()
+        except ValueError:
+            continue
+        for entry in dates[date_str]:
+            if entry:
+                days.setdefault(str(int(entry[0])), []).append(ordinal)
+    return {
+        "fractions": {
+            str(fraction["id"]): fraction.get("name") or str(fraction["id"])
+            for fraction in fractions
+        },
+        "days": days,
+    }
+
+
+def expand_calendar(calendar: dict[str, Any]) -> tuple[dict[str, Any], list[Any]]:
+    """Zet een compacte kalender terug naar `dates` en `fractions`."""
+    dates: dict[str, list[list[int]]] = {}
+    for fraction_id, ordinals in calendar["days"].items():
+        for ordinal in ordinals:
+            dates.setdefault(date.fromordinal(ordinal).isoformat(), []).append(
+                [int(fraction_id), 0]
+            )
+    fractions = [
+        {"id": int(fraction_id), "name": name}
+        for fraction_id, name in calendar["fractions"].items()
+    ]
+    return dates, fractions
+
+
+def _storage_key(entry_id: str, name: str) -> str:
+    """Retourneer de storage-key voor een bestand van deze entry."""
+    return f"{DOMAIN}.{entry_id}.{name}"
+
+
+async def async_remove_storage(hass: HomeAssistant, entry_id: str) -> None:
+    """Verwijder alle opgeslagen bestanden van een config entry."""
+    for name in ("synced_events", "snapshot", "fleet", "archive"):
+        await Store(hass, STORAGE_VERSION, _storage_key(entry_id, name)).async_remove()
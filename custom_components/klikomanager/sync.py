@@ -0,0 +1,552 @@
+"""Wegschrijven van ophaalmomenten naar een externe kalender-entity."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+import logging
+import random
+import re
+import time
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components.calendar import CalendarEntityFeature, CalendarEvent
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    SYNC_MAX_ATTEMPTS,
+    SYNC_MAX_CONCURRENCY,
+    SYNC_MOVE_MAX_DAYS,
+    SYNC_RETRY_DELAY,
+)
+from .ingest import KlikomanagerPickup
+from .recurrence import compress
+
+_LOGGER = logging.getLogger(__name__)
+
+# Tag in de event-beschrijving waarmee we onze events in de target herkennen.
+_TAG_RE = re.compile(
+    r"klikomanager-id:(?P<entry_id>[^/\s]+)/(?P<day>\d{4}-\d{2}-\d{2})/(?P<fraction_id>\d+)"
+)
+# Tag van een terugkerend event; alle exemplaren delen de beschrijving, dus
+# de dag van een exemplaar volgt uit zijn starttijd.
+_SERIES_TAG_RE = re.compile(
+    r"klikomanager-series:(?P<entry_id>[^/\s]+)/(?P<fraction_id>\d+)"
+)
+
+# Verwijzing naar een event in de target: uid en, voor één exemplaar van een
+# terugkerend event, zijn recurrence_id.
+EventRef = tuple[str, str | None]
+
+
+@dataclass
+class KlikomanagerSyncResult:
+    """Samenvatting van één sync-run."""
+
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    skipped: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    # Sleutels waarvan de creatie (of verplaatsing) bevestigd is.
+    created_keys: set[tuple[str, int]] = field(default_factory=set)
+
+
+@dataclass
+class KlikomanagerSyncPlan:
+    """Minimale set wijzigingen om de target gelijk te trekken."""
+
+    create: list[KlikomanagerPickup] = field(default_factory=list)
+    # Terugkerende events: (ophaalmomenten van de run, RRULE).
+    create_series: list[tuple[list[KlikomanagerPickup], str]] = field(
+        default_factory=list
+    )
+    update: list[tuple[EventRef, KlikomanagerPickup]] = field(default_factory=list)
+    delete: list[EventRef] = field(default_factory=list)
+    unchanged: int = 0
+
+    def __len__(self) -> int:
+        """Retourneer het aantal schrijfacties in het plan."""
+        return (
+            len(self.create)
+            + len(self.create_series)
+            + len(self.update)
+            + len(self.delete)
+        )
+
+
+def sync_description(entry_id: str, pickup: KlikomanagerPickup) -> str:
+    """Retourneer de event-beschrijving, inclusief herkenningstag."""
+    day, fraction_id = pickup.key
+    return (
+        f"Klikomanager: {pickup.fraction_name}\n"
+        f"klikomanager-id:{entry_id}/{day}/{fraction_id}"
+    )
+
+
+def series_description(entry_id: str, pickup: KlikomanagerPickup) -> str:
+    """Retourneer de beschrijving van een terugkerend event van een fractie."""
+    return (
+        f"Klikomanager: {pickup.fraction_name}\n"
+        f"klikomanager-series:{entry_id}/{pickup.fraction_id}"
+    )
+
+
+async def async_create_events(
+    hass: HomeAssistant,
+    target_calendar: str,
+    pickups: Iterable[KlikomanagerPickup],
+    *,
+    entry_id: str,
+    skipped: int = 0,
+    recurring: bool = False,
+) -> KlikomanagerSyncResult:
+    """Maak events aan in `target_calendar` met een begrensde worker-pool.
+
+    Elke creatie wordt afgewacht (blocking) zodat we alleen bevestigde
+    events als gesynchroniseerd markeren. Tijdelijke fouten worden met
+    exponentiële backoff opnieuw geprobeerd. Met `recurring` worden vaste
+    cycli als terugkerende events aangemaakt als de target events kan
+    aanmaken; of de target de RRULE ook uitvoert, wordt per reeks nagelezen.
+    """
+    pickups = list(pickups)
+    entity = _get_calendar_entity(hass, target_calendar) if recurring else None
+    if entity is not None and (entity.supported_features or 0) & (
+        CalendarEntityFeature.CREATE_EVENT
+    ):
+        plan = plan_recurring(pickups)
+    else:
+        plan = KlikomanagerSyncPlan(create=pickups)
+    return await async_apply_plan(
+        hass,
+        target_calendar,
+        plan,
+        entry_id=entry_id,
+        skipped=skipped,
+        entity=entity,
+    )
+
+
+def plan_recurring(pickups: list[KlikomanagerPickup]) -> KlikomanagerSyncPlan:
+    """Plan vaste cycli als RRULE-events en de rest als losse events.
+
+    HA-kalenders kennen geen EXDATE/RDATE; een reeks wordt daarom op haar
+    EXDATEs opgesplitst in runs met COUNT, en RDATEs worden losse events.
+    """
+    plan = KlikomanagerSyncPlan()
+    if not pickups:
+        return plan
+
+    series, plan.create = compress(pickups)
+    first_day = min(pickup.day for pickup in pickups)
+    last_day = max(pickup.day for pickup in pickups)
+    for found in series:
+        by_day = {
+            pickup.day: pickup
+            for pickup in pickups
+            if pickup.fraction_id == found.fraction_id
+        }
+        for run_start, count in found.runs(first_day, last_day):
+            run = [
+                by_day[run_start + timedelta(weeks=found.interval_weeks * number)]
+                for number in range(count)
+            ]
+            if count == 1:
+                plan.create.extend(run)
+            else:
+                plan.create_series.append(
+                    (
+                        run,
+                        f"FREQ=WEEKLY;INTERVAL={found.interval_weeks};COUNT={count}",
+                    )
+                )
+        plan.create.extend(by_day[day] for day in found.rdates)
+    return plan
+
+
+async def async_reconcile(
+    hass: HomeAssistant,
+    target_calendar: str,
+    pickups: Iterable[KlikomanagerPickup],
+    *,
+    entry_id: str,
+    start: datetime,
+    end: datetime,
+) -> KlikomanagerSyncResult | None:
+    """Trek de target over [start, end] gelijk met `pickups`.
+
+    De target wordt eenmaal gelezen; daarna worden alleen de verschillen
+    geschreven. Retourneert None als de target-entity niet leesbaar is.
+    """
+    entity = _get_calendar_entity(hass, target_calendar)
+    if entity is None:
+        _LOGGER.warning(
+            "Kalender %s niet gevonden; reconciliatie overgeslagen", target_calendar
+        )
+        return None
+
+    try:
+        existing = await entity.async_get_events(hass, start, end)
+    except HomeAssistantError as err:
+        _LOGGER.warning("Kon %s niet uitlezen voor reconciliatie: %s", target_calendar, err)
+        return None
+    features = entity.supported_features or 0
+    plan = plan_reconciliation(
+        entry_id,
+        pickups,
+        existing,
+        can_update=bool(features & CalendarEntityFeature.UPDATE_EVENT),
+        can_delete=bool(features & CalendarEntityFeature.DELETE_EVENT),
+    )
+    _LOGGER.debug(
+        "Reconciliatie %s: %s nieuw, %s bijwerken, %s verwijderen, %s ongewijzigd",
+        target_calendar,
+        len(plan.create),
+        len(plan.update),
+        len(plan.delete),
+        plan.unchanged,
+    )
+    return await async_apply_plan(
+        hass,
+        target_calendar,
+        plan,
+        entry_id=entry_id,
+        skipped=plan.unchanged,
+        entity=entity,
+    )
+
+
+def plan_reconciliation(
+    entry_id: str,
+    pickups: Iterable[KlikomanagerPickup],
+    existing: Iterable[CalendarEvent],
+    *,
+    can_update: bool,
+    can_delete: bool,
+) -> KlikomanagerSyncPlan:
+    """Bereken het create/update/delete-plan.
+
+    Events worden gematcht op de tag in de beschrijving; exemplaren van een
+    terugkerend event en oudere events zonder tag worden herkend aan
+    beschrijving en starttijd. Een verdwenen en een nieuw ophaalmoment van
+    dezelfde fractie dicht bij elkaar worden samen één update (verplaatsing)
+    als de target dat ondersteunt. Exemplaren van een reeks worden los
+    bijgewerkt en verwijderd via hun recurrence_id.
+    """
+    desired = {pickup.key: pickup for pickup in pickups}
+    legacy = {
+        (key[0], f"Klikomanager: {pickup.fraction_name}"): key
+        for key, pickup in desired.items()
+    }
+    present: dict[tuple[str, int], CalendarEvent] = {}
+    plan = KlikomanagerSyncPlan()
+
+    for event in existing:
+        key = _event_key(entry_id, event, legacy)
+        if key is None:
+            continue
+        if key in present:
+            # Dubbel event in de target: het tweede kan weg.
+            if event.uid and can_delete:
+                plan.delete.append(_event_ref(event))
+            continue
+        present[key] = event
+
+    moved_from: dict[int, list[tuple[str, CalendarEvent]]] = defaultdict(list)
+    for key, event in present.items():
+        pickup = desired.get(key)
+        if pickup is None:
+            if event.uid:
+                moved_from[key[1]].append((key[0], event))
+        elif _matches(event, pickup):
+            plan.unchanged += 1
+        elif event.uid and can_update:
+            plan.update.append((_event_ref(event), pickup))
+
+    moved_to: dict[int, list[KlikomanagerPickup]] = defaultdict(list)
+    for key, pickup in desired.items():
+        if key not in present:
+            moved_to[pickup.fraction_id].append(pickup)
+
+    for fraction_id, new_pickups in moved_to.items():
+        old_events = sorted(moved_from.pop(fraction_id, []), key=lambda row: row[0])
+        leftover: list[tuple[str, CalendarEvent]] = []
+        new_pickups.sort(key=lambda pickup: pickup.day)
+        for pickup in new_pickups:
+            # Oude events die te ver vóór dit ophaalmoment liggen, zijn geen
+            # verplaatsing meer; die blijven over om te verwijderen.
+            while old_events and (
+                pickup.day - date.fromisoformat(old_events[0][0])
+            ).days > SYNC_MOVE_MAX_DAYS:
+                leftover.append(old_events.pop(0))
+            if (
+                can_update
+                and old_events
+                and (date.fromisoformat(old_events[0][0]) - pickup.day).days
+                <= SYNC_MOVE_MAX_DAYS
+            ):
+                _, old_event = old_events.pop(0)
+                plan.update.append((_event_ref(old_event), pickup))
+                continue
+            plan.create.append(pickup)
+        moved_from[fraction_id] = leftover + old_events
+
+    if can_delete:
+        plan.delete.extend(
+            _event_ref(event)
+            for old_events in moved_from.values()
+            for _, event in old_events
+            if event.uid
+        )
+
+    return plan
+
+
+async def async_apply_plan(
+    hass: HomeAssistant,
+    target_calendar: str,
+    plan: KlikomanagerSyncPlan,
+    *,
+    entry_id: str,
+    skipped: int = 0,
+    entity: Any = None,
+) -> KlikomanagerSyncResult:
+    """Voer een plan uit met een begrensde worker-pool en retries.
+
+    Elke actie vangt haar eigen fouten af en telt dan als mislukt, zodat de
+    keys van de wel gelukte acties altijd in het resultaat staan. Van een
+    reeks tellen alleen de exemplaren die na het aanmaken in de target staan;
+    de rest wordt alsnog als losse events aangemaakt.
+    """
+    result = KlikomanagerSyncResult(skipped=skipped)
+    semaphore = asyncio.Semaphore(SYNC_MAX_CONCURRENCY)
+    started = time.monotonic()
+
+    async def _create(pickup: KlikomanagerPickup) -> None:
+        async with semaphore:
+            if await _async_retry(
+                f"aanmaken {pickup.key}",
+                lambda: _async_create_event(hass, target_calendar, entry_id, pickup),
+            ):
+                result.created += 1
+                result.created_keys.add(pickup.key)
+            else:
+                result.failed += 1
+
+    async def _create_series(run: list[KlikomanagerPickup], rrule: str) -> None:
+        async with semaphore:
+            if not await _async_retry(
+                f"aanmaken reeks {run[0].key} ({rrule})",
+                lambda: entity.async_create_event(
+                    **{
+                        **_event_data(entry_id, run[0]),
+                        "description": series_description(entry_id, run[0]),
+                    },
+                    rrule=rrule,
+                ),
+            ):
+                result.failed += len(run)
+                return
+            confirmed = await _async_confirm_series(hass, entity, entry_id, run)
+        result.created += len(confirmed)
+        result.created_keys.update(confirmed)
+        if missing := [pickup for pickup in run if pickup.key not in confirmed]:
+            _LOGGER.warning(
+                "%s heeft de reeks %s niet (volledig) aangemaakt; %s ophaalmomenten "
+                "worden als losse events toegevoegd",
+                target_calendar,
+                run[0].key,
+                len(missing),
+            )
+            await asyncio.gather(*(_create(pickup) for pickup in missing))
+
+    async def _update(ref: EventRef, pickup: KlikomanagerPickup) -> None:
+        uid, recurrence_id = ref
+        async with semaphore:
+            if await _async_retry(
+                f"bijwerken {pickup.key}",
+                lambda: entity.async_update_event(
+                    uid, _event_data(entry_id, pickup), recurrence_id=recurrence_id
+                ),
+            ):
+                result.updated += 1
+                result.created_keys.add(pickup.key)
+            else:
+                result.failed += 1
+
+    async def _delete(ref: EventRef) -> None:
+        uid, recurrence_id = ref
+        async with semaphore:
+            if await _async_retry(
+                f"verwijderen {uid}",
+                lambda: entity.async_delete_event(uid, recurrence_id=recurrence_id),
+            ):
+                result.deleted += 1
+            else:
+                result.failed += 1
+
+    await asyncio.gather(
+        *(_create(pickup) for pickup in plan.create),
+        *(_create_series(run, rrule) for run, rrule in plan.create_series),
+        *(_update(ref, pickup) for ref, pickup in plan.update),
+        *(_delete(ref) for ref in plan.delete),
+    )
+
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+async def _async_create_event(
+    hass: HomeAssistant,
+    target_calendar: str,
+    entry_id: str,
+    pickup: KlikomanagerPickup,
+) -> None:
+    """Maak één event aan via calendar.create_event."""
+    start_local = dt_util.as_local(pickup.start).isoformat()
+    end_local = dt_util.as_local(pickup.end).isoformat()
+
+    _LOGGER.debug(
+        "Maak event in %s voor %s (%s)",
+        target_calendar,
+        start_local,
+        pickup.summary,
+    )
+
+    await hass.services.async_call(
+        "calendar",
+        "create_event",
+        {
+            "entity_id": target_calendar,
+            "summary": pickup.summary,
+            "description": sync_description(entry_id, pickup),
+            "start_date_time": start_local,
+            "end_date_time": end_local,
+        },
+        blocking=True,
+    )
+
+
+async def _async_confirm_series(
+    hass: HomeAssistant,
+    entity: Any,
+    entry_id: str,
+    run: list[KlikomanagerPickup],
+) -> set[tuple[str, int]]:
+    """Lees na welke ophaalmomenten van een nieuwe reeks in de target staan.
+
+    Targets die de RRULE negeren, hebben alleen het eerste exemplaar. Lukt
+    het nalezen niet, dan geldt alleen dat (bevestigd aangemaakte) exemplaar.
+    """
+    wanted = {pickup.key for pickup in run}
+    try:
+        events = await entity.async_get_events(hass, run[0].start, run[-1].end)
+    except Exception as err:  # noqa: BLE001
+        _LOGGER.warning("Kon de nieuwe reeks %s niet nalezen: %s", run[0].key, err)
+        return {run[0].key}
+    return {
+        key
+        for event in events
+        if (key := _event_key(entry_id, event, {})) is not None and key in wanted
+    }
+
+
+async def _async_retry(description: str, call: Callable[[], Awaitable[Any]]) -> bool:
+    """Voer een schrijfactie uit met retries; retourneer of die gelukt is."""
+    for attempt in range(1, SYNC_MAX_ATTEMPTS + 1):
+        try:
+            await call()
+        except (ServiceValidationError, vol.Invalid) as err:
+            # Ongeldige aanvraag: opnieuw proberen heeft geen zin.
+            _LOGGER.warning("Sync-actie %s mislukt: %s", description, err)
+            return False
+        except HomeAssistantError as err:
+            if attempt == SYNC_MAX_ATTEMPTS:
+                _LOGGER.warning(
+                    "Sync-actie %s mislukt na %s pogingen: %s",
+                    description,
+                    attempt,
+                    err,
+                )
+                return False
+            delay = SYNC_RETRY_DELAY * 2 ** (attempt - 1)
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+        except Exception:  # noqa: BLE001
+            # Een onverwachte fout van de target-integratie raakt alleen deze
+            # actie; de rest van het plan en de bevestigde keys blijven staan.
+            _LOGGER.exception("Sync-actie %s mislukt met een onverwachte fout", description)
+            return False
+        else:
+            return True
+
+    return False
+
+
+def _get_calendar_entity(hass: HomeAssistant, entity_id: str) -> Any:
+    """Zoek de CalendarEntity achter een entity_id op."""
+    component = hass.data.get("calendar")
+    if component is None:
+        return None
+    return component.get_entity(entity_id)
+
+
+def _event_key(
+    entry_id: str,
+    event: CalendarEvent,
+    legacy: dict[tuple[str, str], tuple[str, int]],
+) -> tuple[str, int] | None:
+    """Bepaal de (datum, fractie)-key van een bestaand target-event."""
+    description = event.description or ""
+    if match := _TAG_RE.search(description):
+        if match["entry_id"] != entry_id:
+            return None
+        return (match["day"], int(match["fraction_id"]))
+
+    if match := _SERIES_TAG_RE.search(description):
+        if match["entry_id"] != entry_id or not isinstance(event.start, datetime):
+            return None
+        day = dt_util.as_local(event.start).date().isoformat()
+        return (day, int(match["fraction_id"]))
+
+    # Events uit oudere versies hebben alleen "Klikomanager: <fractie>".
+    if not description.startswith("Klikomanager: ") or not isinstance(
+        event.start, datetime
+    ):
+        return None
+    day = dt_util.as_local(event.start).date().isoformat()
+    return legacy.get((day, description))
+
+
+def _event_ref(event: CalendarEvent) -> EventRef:
+    """Retourneer de verwijzing naar een (exemplaar van een) target-event."""
+    assert event.uid is not None
+    return (event.uid, event.recurrence_id)
+
+
+def _matches(event: CalendarEvent, pickup: KlikomanagerPickup) -> bool:
+    """Geef aan of een bestaand event al overeenkomt met het ophaalmoment."""
+    return (
+        isinstance(event.start, datetime)
+        and isinstance(event.end, datetime)
+        and dt_util.as_utc(event.start) == pickup.start
+        and dt_util.as_utc(event.end) == pickup.end
+        and event.summary == pickup.summary
+    )
+
+
+def _event_data(entry_id: str, pickup: KlikomanagerPickup) -> dict[str, Any]:
+    """Retourneer event-data in het formaat van de CalendarEntity-methodes."""
+    return {
+        "summary": pickup.summary,
+        "description": sync_description(entry_id, pickup),
+        "dtstart": dt_util.as_local(pickup.start),
+        "dtend": dt_util.as_local(pickup.end),
+    }
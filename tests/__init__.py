@@ -0,0 +1 @@
+"""Tests voor de Klikomanager integratie."""
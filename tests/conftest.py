@@ -0,0 +1,47 @@
+"""Gedeelde fixtures voor de Klikomanager-tests."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator, Mapping
+from datetime import date
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.klikomanager.index import KlikomanagerEventIndex
+from custom_components.klikomanager.ingest import build_index
+
+FRACTIONS = [
+    {"id": 1, "name": "Restafval"},
+    {"id": 2, "name": "GFT"},
+    {"id": 3, "name": "Papier"},
+]
+
+
+@pytest.fixture(autouse=True)
+def time_zone() -> Iterator[None]:
+    """Reken in de tijdzone van de gemeenten, niet in UTC."""
+    default = dt_util.DEFAULT_TIME_ZONE
+    dt_util.set_default_time_zone(dt_util.get_time_zone("Europe/Amsterdam"))
+    yield
+    dt_util.set_default_time_zone(default)
+
+
+def make_dates(days: Mapping[int, list[date]]) -> dict[str, list[list[int]]]:
+    """Bouw `dates` zoals getMyWasteCalendar die levert uit dagen per fractie."""
+    dates: dict[str, list[list[int]]] = {}
+    for fraction_id, fraction_days in days.items():
+        for day in fraction_days:
+            dates.setdefault(day.isoformat(), []).append([fraction_id, 0])
+    return dates
+
+
+@pytest.fixture
+def make_index() -> Callable[[Mapping[int, list[date]]], KlikomanagerEventIndex]:
+    """Bouw een index uit ophaaldagen per fractie."""
+
+    def _make(days: Mapping[int, list[date]]) -> KlikomanagerEventIndex:
+        return build_index(make_dates(days), FRACTIONS)
+
+    return _make
@@ -0,0 +1,374 @@
+"""Tests voor de Klikomanager API-client."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from datetime import timedelta
+from email.utils import format_datetime
+import json
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.klikomanager import api
+from custom_components.klikomanager.api import (
+    KlikomanagerApiError,
+    KlikomanagerAuthError,
+    KlikomanagerCircuitOpenError,
+    KlikomanagerClient,
+    KlikomanagerRateLimiter,
+    count_retries,
+)
+from custom_components.klikomanager.const import (
+    API_MAX_ATTEMPTS,
+    API_RETRY_AFTER_MAX,
+    API_RETRY_DELAY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_OPEN_TIME,
+    TOKEN_LIFETIME,
+    TOKEN_REFRESH_MARGIN,
+)
+
+OK = {"success": True, "dates": {}, "fractions": []}
+
+# Het echte asyncio.sleep, ook als de klok-fixture het vervangen heeft.
+_REAL_SLEEP = asyncio.sleep
+
+
+class FakeResponse:
+    """Respons met alleen wat de client leest."""
+
+    def __init__(
+        self, status: int, body: Any = None, headers: dict[str, str] | None = None
+    ) -> None:
+        self.status = status
+        self.headers = headers or {}
+        self._body = json.dumps(body if body is not None else {}).encode()
+
+    async def read(self) -> bytes:
+        await _REAL_SLEEP(0)
+        return self._body
+
+    async def __aenter__(self) -> FakeResponse:
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        return None
+
+
+class FakeSession:
+    """Sessie die per aanvraag een respons van `respond` teruggeeft."""
+
+    def __init__(self, respond: Callable[[str, dict[str, Any]], FakeResponse]) -> None:
+        self.respond = respond
+        self.requests: list[tuple[str, dict[str, Any]]] = []
+
+    def post(self, url: str, *, json: dict[str, Any], **kwargs: Any) -> FakeResponse:
+        self.requests.append((url, json))
+        return self.respond(url, json)
+
+
+def make_client(
+    respond: Callable[[str, dict[str, Any]], FakeResponse], **kwargs: Any
+) -> KlikomanagerClient:
+    """Bouw een client op een nepsessie."""
+    return KlikomanagerClient(
+        None, "example.invalid", session=FakeSession(respond), **kwargs
+    )
+
+
+class FakeClock:
+    """Monotone klok die alleen vooruitgaat als er geslapen wordt."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+        self.now += delay
+        await _REAL_SLEEP(0)
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    """Vervang de klok en het slapen van de client."""
+    clock = FakeClock()
+    monkeypatch.setattr(api, "time", SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def responses(*items: FakeResponse) -> Callable[[str, dict[str, Any]], FakeResponse]:
+    """Geef de responsen op volgorde terug; de laatste blijft herhalen."""
+    queue = list(items)
+
+    def _respond(url: str, payload: dict[str, Any]) -> FakeResponse:
+        return queue.pop(0) if len(queue) > 1 else queue[0]
+
+    return _respond
+
+
+def fetch(client: KlikomanagerClient) -> dict[str, Any]:
+    """Haal de kalender op met een vaste token."""
+    return asyncio.run(
+        client.async_get_waste_calendar(token="t", client_name="c", app="a")
+    )
+
+
+class FlakyClient(KlikomanagerClient):
+    """Client waarvan aanvragen eerst een aantal keer tijdelijk mislukken."""
+
+    def __init__(self, failures: dict[str, int]) -> None:
+        super().__init__(None, "example.invalid")
+        self.failures = failures
+
+    async def _async_post_once(
+        self, path: str, payload: dict[str, Any], response_sizes: Any
+    ) -> dict[str, Any]:
+        await asyncio.sleep(0)
+        if self.failures[payload["card"]]:
+            self.failures[payload["card"]] -= 1
+            raise api._RetryableError("HTTP 503")
+        return {"success": True}
+
+
+def test_count_retries_per_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Retries op een gedeelde client tellen alleen mee bij hun eigen refresh."""
+    monkeypatch.setattr(api, "_retry_delay", lambda attempt, retry_after: 0)
+    client = FlakyClient({"a": 2, "b": 0})
+
+    async def _refresh(card: str) -> int:
+        with count_retries() as retries:
+            await client._async_post("/path", {"card": card})
+        return retries[0]
+
+    async def _run() -> list[int]:
+        return await asyncio.gather(_refresh("a"), _refresh("b"))
+
+    assert asyncio.run(_run()) == [2, 0]
+    assert client.retries == 2
+
+
+def test_response_sizes_per_call() -> None:
+    """Gelijktijdige aanvragen op een gedeelde client tellen elk hun eigen respons."""
+    bodies = {
+        "small": {"dates": {}, "fractions": []},
+        "large": {"dates": {"2026-01-05": [[1, 0]] * 50}, "fractions": []},
+    }
+    client = make_client(
+        lambda url, payload: FakeResponse(200, bodies[payload["token"]])
+    )
+    sizes: dict[str, list[int]] = {"small": [], "large": []}
+
+    async def _run() -> None:
+        await asyncio.gather(
+            *(
+                client.async_get_waste_calendar(
+                    token=token, client_name="c", app="a", response_sizes=sizes[token]
+                )
+                for token in ("large", "small")
+            )
+        )
+
+    asyncio.run(_run())
+
+    assert sizes == {
+        token: [len(json.dumps(body).encode())] for token, body in bodies.items()
+    }
+
+
+def test_retry_until_success(clock) -> None:
+    """Tijdelijke fouten worden opnieuw geprobeerd tot de host antwoordt."""
+    client = make_client(
+        responses(FakeResponse(503), FakeResponse(502), FakeResponse(200, OK))
+    )
+
+    with count_retries() as retries:
+        assert fetch(client) == OK
+
+    assert retries[0] == 2
+    assert len(client.session.requests) == 3
+    assert len(clock.sleeps) == 2
+
+
+def test_retry_exhaustion(clock) -> None:
+    """Na API_MAX_ATTEMPTS pogingen volgt een KlikomanagerApiError."""
+    client = make_client(responses(FakeResponse(500)))
+
+    with pytest.raises(KlikomanagerApiError, match="HTTP 500"):
+        fetch(client)
+
+    assert len(client.session.requests) == API_MAX_ATTEMPTS
+    assert len(clock.sleeps) == API_MAX_ATTEMPTS - 1
+
+
+def test_no_retry_on_auth_or_client_errors(clock) -> None:
+    """401 en andere 4xx worden niet herhaald."""
+    for status, error in ((401, KlikomanagerAuthError), (404, KlikomanagerApiError)):
+        client = make_client(responses(FakeResponse(status)))
+        with pytest.raises(error):
+            fetch(client)
+        assert len(client.session.requests) == 1
+    assert clock.sleeps == []
+
+
+@pytest.mark.parametrize("attempt", [1, 2, 3])
+def test_jittered_backoff_bounds(monkeypatch, attempt: int) -> None:
+    """De backoff verdubbelt per poging met ±50 % jitter."""
+    base = API_RETRY_DELAY * 2 ** (attempt - 1)
+    for factor in (0.5, 1.5):
+        monkeypatch.setattr(api.random, "uniform", lambda low, high, f=factor: f)
+        assert api._retry_delay(attempt, None) == pytest.approx(base * factor)
+
+    monkeypatch.undo()
+    delays = [api._retry_delay(attempt, None) for _ in range(200)]
+    assert all(base * 0.5 <= delay <= base * 1.5 for delay in delays)
+
+
+def test_retry_after_seconds(clock) -> None:
+    """Een Retry-After in seconden wordt precies afgewacht, zonder jitter."""
+    client = make_client(
+        responses(
+            FakeResponse(429, headers={"Retry-After": "7"}), FakeResponse(200, OK)
+        )
+    )
+
+    assert fetch(client) == OK
+    assert clock.sleeps == [7.0]
+
+
+def test_retry_after_http_date(clock) -> None:
+    """Een Retry-After als HTTP-datum wordt omgerekend naar een wachttijd."""
+    retry_at = dt_util.utcnow().replace(microsecond=0) + timedelta(seconds=30)
+    client = make_client(
+        responses(
+            FakeResponse(503, headers={"Retry-After": format_datetime(retry_at, True)}),
+            FakeResponse(200, OK),
+        )
+    )
+
+    assert fetch(client) == OK
+    (delay,) = clock.sleeps
+    assert 0 < delay <= 30
+
+
+def test_long_retry_after_gives_up(clock) -> None:
+    """Een Retry-After boven het maximum wordt niet binnen de refresh afgewacht."""
+    too_long = {"Retry-After": f"{API_RETRY_AFTER_MAX + 1}"}
+    client = make_client(responses(FakeResponse(429, headers=too_long)))
+
+    with pytest.raises(KlikomanagerApiError):
+        fetch(client)
+
+    assert len(client.session.requests) == 1
+    assert clock.sleeps == []
+
+
+def test_circuit_opens_and_half_opens(clock) -> None:
+    """Het circuit opent na herhaalde fouten; daarna mag er één poging door."""
+    client = make_client(responses(FakeResponse(500)), max_attempts=1)
+
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        with pytest.raises(KlikomanagerApiError):
+            fetch(client)
+    assert client.circuit_breaker.is_open
+
+    requests = len(client.session.requests)
+    with pytest.raises(KlikomanagerCircuitOpenError):
+        fetch(client)
+    assert len(client.session.requests) == requests
+
+    # Half open: één poging mag; mislukt die, dan gaat het circuit direct dicht.
+    clock.now += CIRCUIT_OPEN_TIME.total_seconds()
+    with pytest.raises(KlikomanagerApiError):
+        fetch(client)
+    assert len(client.session.requests) == requests + 1
+    assert client.circuit_breaker.is_open
+
+    # Slaagt de poging na de open-periode, dan sluit het circuit.
+    clock.now += CIRCUIT_OPEN_TIME.total_seconds()
+    client.session.respond = responses(FakeResponse(200, OK))
+    assert fetch(client) == OK
+    assert not client.circuit_breaker.is_open
+    assert fetch(client) == OK
+
+
+def test_rate_limiter_burst_then_waits(clock) -> None:
+    """Na de burst wacht de token bucket op de gemiddelde snelheid."""
+    limiter = KlikomanagerRateLimiter(rate=2.0, capacity=3)
+
+    async def _run() -> None:
+        for _ in range(5):
+            await limiter.async_acquire()
+
+    asyncio.run(_run())
+
+    assert clock.sleeps == [pytest.approx(0.5), pytest.approx(0.5)]
+
+
+class LoginClient:
+    """Client die bij elke login een nieuwe token uitgeeft."""
+
+    def __init__(self) -> None:
+        self.logins = 0
+
+    async def async_login_with_password(self, **kwargs: Any) -> dict[str, Any]:
+        self.logins += 1
+        return {"success": True, "token": f"t{self.logins}"}
+
+
+def make_token_manager(client: LoginClient) -> api.KlikomanagerTokenManager:
+    """Bouw een token manager voor een vaste kaart."""
+    return api.KlikomanagerTokenManager(
+        client, card_number="1234", password="pw", client_name="c", app="a"
+    )
+
+
+def test_rejected_token_logs_in_again_and_retries(clock) -> None:
+    """Een geweigerde token leidt tot één nieuwe login en een herhaalde call."""
+    client = LoginClient()
+    manager = make_token_manager(client)
+    manager.seed({"token": "oud"})
+    used: list[str] = []
+
+    async def _call(token: str) -> str:
+        used.append(token)
+        if token == "oud":
+            raise KlikomanagerAuthError("verlopen")
+        return "kalender"
+
+    assert asyncio.run(manager.async_call(_call)) == "kalender"
+    assert used == ["oud", "t1"]
+    assert client.logins == 1
+
+    # Een tweede weigering direct na de nieuwe login wordt niet opnieuw herhaald.
+    async def _refused(token: str) -> str:
+        raise KlikomanagerAuthError("nee")
+
+    with pytest.raises(KlikomanagerAuthError):
+        asyncio.run(manager.async_call(_refused))
+    assert client.logins == 2
+
+
+def test_token_renewed_before_it_expires(clock) -> None:
+    """De token wordt hergebruikt en binnen de marge vóór het verlopen vernieuwd."""
+    client = LoginClient()
+    manager = make_token_manager(client)
+
+    assert asyncio.run(manager.async_get_token()) == "t1"
+    clock.now += (TOKEN_LIFETIME - TOKEN_REFRESH_MARGIN).total_seconds() - 1
+    assert manager.token_valid
+    assert asyncio.run(manager.async_get_token()) == "t1"
+
+    clock.now += 1
+    assert not manager.token_valid
+    assert asyncio.run(manager.async_get_token()) == "t2"
+    assert client.logins == 2
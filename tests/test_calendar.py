@@ -0,0 +1,124 @@
+"""Tests voor de state-updates van de calendar-entities."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.klikomanager import calendar
+from custom_components.klikomanager.calendar import (
+    KlikomanagerCalendarEntity,
+    KlikomanagerFleetCalendarEntity,
+)
+from custom_components.klikomanager.const import STALE_AFTER
+
+MONDAY = date(2026, 1, 5)
+
+
+class Timers:
+    """Vangt geplande timers op in plaats van ze aan de event loop te geven."""
+
+    def __init__(self) -> None:
+        self.scheduled: dict[datetime, Any] = {}
+
+    def track(self, hass: Any, action: Any, point: datetime) -> Any:
+        self.scheduled[point] = action
+        return lambda: self.scheduled.pop(point, None)
+
+
+@pytest.fixture
+def timers(monkeypatch: pytest.MonkeyPatch) -> Timers:
+    """Vervang async_track_point_in_utc_time door een registratie."""
+    timers = Timers()
+    monkeypatch.setattr(calendar, "async_track_point_in_utc_time", timers.track)
+    return timers
+
+
+def add(entity: KlikomanagerCalendarEntity) -> list[dict[str, Any]]:
+    """Voeg een entity 'toe' en retourneer de lijst met geschreven attributen."""
+    written: list[dict[str, Any]] = []
+    entity.hass = SimpleNamespace()
+    entity.async_write_ha_state = lambda: written.append(
+        entity.extra_state_attributes
+    )
+    entity._last_written = entity._written
+    entity._async_schedule_transition()
+    entity._async_schedule_stale()
+    return written
+
+
+def test_stale_flips_on_time_without_coordinator_update(make_index, timers) -> None:
+    """Zonder listener-update slaat `stale` toch om op het verloopmoment."""
+    last_fetched = dt_util.utcnow() - STALE_AFTER + timedelta(minutes=5)
+    coordinator = SimpleNamespace(
+        data=make_index({1: [MONDAY]}),
+        last_fetched=last_fetched,
+        archive=None,
+    )
+    entity = KlikomanagerCalendarEntity(coordinator, SimpleNamespace(entry_id="a"))
+    written = add(entity)
+    assert entity.extra_state_attributes["stale"] is False
+
+    stale_at = last_fetched + STALE_AFTER
+    assert stale_at in timers.scheduled
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(dt_util, "utcnow", lambda: stale_at)
+        timers.scheduled.pop(stale_at)(stale_at)
+
+    assert [attributes["stale"] for attributes in written] == [True]
+    assert timers.scheduled == {}
+
+
+def test_stale_timer_follows_unchanged_refresh(make_index, timers) -> None:
+    """Een ongewijzigde refresh schuift het verloopmoment bij de volgende write op."""
+    first = dt_util.utcnow() - STALE_AFTER + timedelta(minutes=5)
+    coordinator = SimpleNamespace(
+        data=make_index({1: [MONDAY]}), last_fetched=first, archive=None
+    )
+    entity = KlikomanagerCalendarEntity(coordinator, SimpleNamespace(entry_id="a"))
+    written = add(entity)
+
+    # De coordinator haalde opnieuw op zonder de listeners te informeren.
+    coordinator.last_fetched = second = dt_util.utcnow()
+    timers.scheduled.pop(first + STALE_AFTER)(first + STALE_AFTER)
+
+    assert written == [
+        {
+            "source": "klikomanager.com",
+            "last_fetched": second.isoformat(),
+            "stale": False,
+        }
+    ]
+    assert second + STALE_AFTER in timers.scheduled
+
+
+def test_fleet_entity_writes_when_last_fetched_changes(make_index, timers) -> None:
+    """Een vloot-entity schrijft bij een nieuwe `last_fetched` van het eigen adres."""
+    index = make_index({1: [MONDAY]})
+    fetched = {"a": dt_util.utcnow() - timedelta(hours=1)}
+    coordinator = SimpleNamespace(
+        data={"a": index, "b": index},
+        last_fetched=fetched.get,
+        title=lambda key: key,
+    )
+    entity = KlikomanagerFleetCalendarEntity(
+        coordinator, SimpleNamespace(entry_id="fleet"), "a"
+    )
+    written = add(entity)
+
+    # Alleen een ander adres is bijgewerkt.
+    coordinator.data = {**coordinator.data, "b": make_index({2: [MONDAY]})}
+    entity._handle_coordinator_update()
+    assert written == []
+
+    # Zelfde index, maar opnieuw opgehaald.
+    fetched["a"] = dt_util.utcnow()
+    entity._handle_coordinator_update()
+    assert [attributes["last_fetched"] for attributes in written] == [
+        fetched["a"].isoformat()
+    ]
@@ -0,0 +1,124 @@
+"""Tests voor het verversen door de coordinator."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.klikomanager import KlikomanagerDataUpdateCoordinator
+from custom_components.klikomanager.const import (
+    CONF_APP,
+    CONF_CARD_NUMBER,
+    CONF_CLIENT_NAME,
+    CONF_HOST,
+    CONF_PASSWORD,
+)
+from custom_components.klikomanager.hub import KlikomanagerCalendarData
+from custom_components.klikomanager.ingest import build_index
+
+from .conftest import FRACTIONS, make_dates
+
+MONDAY = date(2026, 1, 5)
+
+
+def run_with_coordinator(
+    config_dir: Path,
+    test: Callable[[KlikomanagerDataUpdateCoordinator], Awaitable[None]],
+) -> None:
+    """Draai `test` met een coordinator op een minimale Home Assistant."""
+
+    async def _run() -> None:
+        hass = HomeAssistant(str(config_dir))
+        entry = SimpleNamespace(
+            entry_id="entry",
+            title="Dorpsstraat 1",
+            unique_id="1234",
+            options={},
+            data={
+                CONF_HOST: "example.invalid",
+                CONF_CARD_NUMBER: "1234",
+                CONF_PASSWORD: "pw",
+                CONF_CLIENT_NAME: "uithoorn",
+                CONF_APP: "app",
+            },
+        )
+        try:
+            await test(KlikomanagerDataUpdateCoordinator(hass, entry))
+        finally:
+            await hass.async_stop(force=True)
+
+    asyncio.run(_run())
+
+
+def serve(
+    coordinator: KlikomanagerDataUpdateCoordinator,
+    responses: list[dict[int, list[date]]],
+) -> list[Any]:
+    """Laat de coordinator de responsen op volgorde 'ophalen'.
+
+    Elke respons wordt opnieuw geparsed, zoals bij een echte fetch; de
+    fingerprint volgt uit de inhoud.
+    """
+    fetched: list[Any] = []
+
+    async def _fetch() -> KlikomanagerCalendarData:
+        dates = make_dates(responses.pop(0))
+        index = build_index(dates, FRACTIONS)
+        fetched.append(index)
+        return KlikomanagerCalendarData(
+            fingerprint=repr(sorted(dates.items())),
+            dates=dates,
+            fractions=FRACTIONS,
+            index=index,
+            fetched_at=dt_util.utcnow(),
+        )
+
+    coordinator._async_fetch_remote = _fetch
+    return fetched
+
+
+def test_unchanged_response_keeps_index_and_skips_listeners(tmp_path) -> None:
+    """Een ongewijzigde respons houdt dezelfde index en informeert niemand."""
+
+    async def _test(coordinator: KlikomanagerDataUpdateCoordinator) -> None:
+        updates: list[Any] = []
+        coordinator.async_add_listener(lambda: updates.append(coordinator.data))
+        fetched = serve(coordinator, [{1: [MONDAY]}, {1: [MONDAY]}])
+
+        await coordinator.async_refresh()
+        first, first_fetched = coordinator.data, coordinator.last_fetched
+        await coordinator.async_refresh()
+
+        assert len(fetched) == 2 and fetched[1] is not first
+        assert coordinator.data is first
+        assert updates == [first]
+        assert coordinator.last_fetched > first_fetched
+        assert coordinator.stats.unchanged_refreshes == 1
+
+    run_with_coordinator(tmp_path, _test)
+
+
+def test_changed_response_replaces_index(tmp_path) -> None:
+    """Een gewijzigde respons levert een nieuwe index en een listener-update."""
+
+    async def _test(coordinator: KlikomanagerDataUpdateCoordinator) -> None:
+        updates: list[Any] = []
+        coordinator.async_add_listener(lambda: updates.append(coordinator.data))
+        fetched = serve(coordinator, [{1: [MONDAY]}, {1: [MONDAY], 2: [MONDAY]}])
+
+        await coordinator.async_refresh()
+        await coordinator.async_refresh()
+
+        assert coordinator.data is fetched[1]
+        assert updates == fetched
+        assert len(coordinator.data) == 2
+        assert coordinator.stats.unchanged_refreshes == 0
+
+    run_with_coordinator(tmp_path, _test)
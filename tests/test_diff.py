@@ -0,0 +1,63 @@
+"""Tests voor het verschil tussen twee versies van de kalender."""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from custom_components.klikomanager.diff import diff_indexes
+
+MONDAY = date(2026, 1, 5)
+
+
+def weeks(*numbers: int, days: int = 0) -> list[date]:
+    """Retourneer de maandagen (plus `days`) van de gegeven weken."""
+    return [MONDAY + timedelta(weeks=number, days=days) for number in numbers]
+
+
+def test_sliding_window_is_no_change(make_index) -> None:
+    """Een venster dat een week opschuift geeft geen verschil."""
+    old = make_index({1: weeks(0, 1, 2, 3), 2: weeks(0, 2, days=1)})
+    new = make_index({1: weeks(1, 2, 3, 4), 2: weeks(2, 4, days=1)})
+
+    assert not diff_indexes(old, new, MONDAY + timedelta(weeks=1))
+
+
+def test_added_removed_and_moved(make_index) -> None:
+    """Binnen het gedeelde bereik worden wijzigingen per fractie gevonden."""
+    old = make_index({1: weeks(0, 1, 2, 3), 2: weeks(0, 3, days=1)})
+    new = make_index(
+        {
+            1: weeks(0, 2, 3, 4) + weeks(1, days=2),
+            2: weeks(0, days=1),
+            3: weeks(2),
+        }
+    )
+
+    diff = diff_indexes(old, new, MONDAY)
+
+    assert [(old.day, new.day) for old, new in diff.moved] == [
+        (MONDAY + timedelta(weeks=1), MONDAY + timedelta(weeks=1, days=2))
+    ]
+    assert [(p.day, p.fraction_id) for p in diff.removed] == [
+        (MONDAY + timedelta(weeks=3, days=1), 2)
+    ]
+    assert [(p.day, p.fraction_id) for p in diff.added] == [
+        (MONDAY + timedelta(weeks=2), 3)
+    ]
+    assert diff.as_event_data()["moved"] == [
+        {
+            "fraction_id": 1,
+            "fraction": "Restafval",
+            "from": (MONDAY + timedelta(weeks=1)).isoformat(),
+            "to": (MONDAY + timedelta(weeks=1, days=2)).isoformat(),
+        }
+    ]
+
+
+def test_past_days_ignored(make_index) -> None:
+    """Dagen vóór `since` tellen niet mee."""
+    old = make_index({1: weeks(0, 1, 2)})
+    new = make_index({1: weeks(1, 2)})
+
+    assert not diff_indexes(old, new, MONDAY + timedelta(days=1))
+    assert diff_indexes(old, new, MONDAY).removed[0].day == MONDAY
@@ -0,0 +1,158 @@
+"""Tests voor het bepalen van de gemeente van een kaart."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from custom_components.klikomanager import discovery
+from custom_components.klikomanager.api import KlikomanagerAuthError
+from custom_components.klikomanager.const import DEFAULT_HOST
+
+OTHER_HOST = "cp-anders.klikocontainermanager.com"
+SLOW_HOST = "cp-traag.klikocontainermanager.com"
+
+
+class ProbeClient:
+    """Client die alleen op `accepted` een login laat slagen.
+
+    Een login bij SLOW_HOST blijft hangen tot hij geannuleerd wordt.
+    """
+
+    accepted: set[str] = set()
+    created: list[tuple[str, int]] = []
+    cancelled: list[str] = []
+
+    def __init__(
+        self, hass: Any, host: str, *, max_attempts: int, session: Any
+    ) -> None:
+        self.host = host
+        self.created.append((host, max_attempts))
+
+    async def async_login_with_password(self, **kwargs: Any) -> dict[str, Any]:
+        if self.host == SLOW_HOST:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                self.cancelled.append(self.host)
+                raise
+        if self.host not in self.accepted:
+            raise KlikomanagerAuthError("nee")
+        return {"token": "t"}
+
+
+@pytest.fixture(autouse=True)
+def probe_client(monkeypatch: pytest.MonkeyPatch) -> type[ProbeClient]:
+    """Vervang client en sessie van de discovery."""
+    ProbeClient.accepted = set()
+    ProbeClient.created = []
+    ProbeClient.cancelled = []
+    monkeypatch.setattr(discovery, "KlikomanagerClient", ProbeClient)
+    monkeypatch.setattr(discovery, "async_get_clientsession", lambda hass: None)
+    return ProbeClient
+
+
+@pytest.fixture
+def registry(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Breid het register uit met een trage en een andere gemeente."""
+    monkeypatch.setattr(
+        discovery,
+        "MUNICIPALITIES",
+        {
+            "traag": discovery.municipality("traag"),
+            "uithoorn": discovery.municipality("uithoorn"),
+            "anders": discovery.municipality("anders"),
+        },
+    )
+
+
+def make_hass() -> SimpleNamespace:
+    """Bouw een minimale hass die taken op de lopende loop start."""
+    return SimpleNamespace(
+        data={},
+        async_create_task=lambda target, name: asyncio.get_running_loop().create_task(
+            target
+        ),
+    )
+
+
+def test_registry_is_probed_once_per_host(probe_client) -> None:
+    """Zonder slug wordt het register geprobeerd, met één poging per host."""
+    probe_client.accepted = {DEFAULT_HOST}
+
+    slug, result = asyncio.run(discovery.async_discover(make_hass(), "1234", "pw"))
+
+    assert (slug, result) == ("uithoorn", {"token": "t"})
+    assert probe_client.created == [(DEFAULT_HOST, 1)]
+
+
+@pytest.mark.usefixtures("registry")
+def test_first_success_cancels_other_probes(probe_client) -> None:
+    """De eerste geslaagde login annuleert de probes die nog lopen."""
+    probe_client.accepted = {DEFAULT_HOST}
+
+    async def _run() -> str:
+        slug, _ = await discovery.async_discover(make_hass(), "1234", "pw")
+        # Laat de annulering binnen de loop aankomen, vóór asyncio.run opruimt.
+        await asyncio.sleep(0)
+        assert probe_client.cancelled == [SLOW_HOST]
+        return slug
+
+    assert asyncio.run(_run()) == "uithoorn"
+    assert {host for host, _ in probe_client.created} == {
+        SLOW_HOST,
+        DEFAULT_HOST,
+        OTHER_HOST,
+    }
+
+
+@pytest.mark.usefixtures("registry")
+def test_discovered_municipality_is_reused(probe_client) -> None:
+    """Een volgende poging voor dezelfde kaart probeert alleen de gevonden host."""
+    probe_client.accepted = {OTHER_HOST}
+    hass = make_hass()
+
+    async def _run() -> None:
+        assert (await discovery.async_discover(hass, "1234", "pw"))[0] == "anders"
+        probe_client.created.clear()
+        assert (await discovery.async_discover(hass, "1234", "pw"))[0] == "anders"
+
+    asyncio.run(_run())
+
+    assert probe_client.created == [(OTHER_HOST, 1)]
+
+
+@pytest.mark.usefixtures("registry")
+def test_rejected_cached_municipality_probes_the_rest(probe_client) -> None:
+    """Weigert de onthouden gemeente, dan wordt de rest van het register geprobeerd."""
+    probe_client.accepted = {DEFAULT_HOST}
+    hass = make_hass()
+    hass.data[discovery.DOMAIN] = {discovery.DATA_DISCOVERED: {"1234": "anders"}}
+
+    slug, _ = asyncio.run(discovery.async_discover(hass, "1234", "pw"))
+
+    assert slug == "uithoorn"
+    assert probe_client.created[0] == (OTHER_HOST, 1)
+    assert OTHER_HOST not in {host for host, _ in probe_client.created[1:]}
+    assert hass.data[discovery.DOMAIN][discovery.DATA_DISCOVERED] == {
+        "1234": "uithoorn"
+    }
+
+
+def test_typed_slug_follows_host_pattern(probe_client) -> None:
+    """Een eigen slug gebruikt het hostpatroon; een weigering blijft een authfout."""
+    with pytest.raises(KlikomanagerAuthError):
+        asyncio.run(
+            discovery.async_discover(make_hass(), "1234", "pw", " Voorbeeld ")
+        )
+
+    assert probe_client.created == [("cp-voorbeeld.klikocontainermanager.com", 1)]
+
+
+def test_invalid_slug() -> None:
+    """Een slug die geen hostnaam oplevert wordt vooraf geweigerd."""
+    with pytest.raises(ValueError):
+        discovery.municipality("niet geldig")
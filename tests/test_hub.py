@@ -0,0 +1,123 @@
+"""Tests voor het delen van kalenders tussen entries."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.klikomanager.hub import (
+    KlikomanagerCalendarData,
+    KlikomanagerHub,
+    calendar_key,
+)
+from custom_components.klikomanager.index import KlikomanagerEventIndex
+
+ADDRESS = {"street": "Dorpsstraat", "streetNumber": "1", "zipCode": "1234 AB"}
+
+
+def login(address: dict[str, Any] | None) -> dict[str, Any]:
+    """Bouw een login-respons met (optioneel) een adres."""
+    return {"token": "t", "config": {"cardDetails": {"address": address or {}}}}
+
+
+class FakeCoordinator:
+    """Coordinator met alleen wat de hub gebruikt."""
+
+    def __init__(self, entry_id: str, address: dict[str, Any] | None) -> None:
+        self.entry = SimpleNamespace(
+            entry_id=entry_id,
+            title=entry_id,
+            async_create_background_task=self._background_task,
+        )
+        self.token_manager = SimpleNamespace(login_result=login(address))
+        self.last_fetched: datetime | None = None
+        self.fetches = 0
+        self.notified = 0
+
+    def _background_task(self, hass: Any, target: Any, name: str) -> None:
+        target.close()
+        self.notified += 1
+
+    async def async_request_refresh(self) -> None:
+        """Niet gebruikt; de notificatie wordt alleen geteld."""
+
+    async def fetch(self) -> KlikomanagerCalendarData:
+        """Haal 'op' met een uniek moment."""
+        self.fetches += 1
+        await asyncio.sleep(0)
+        return KlikomanagerCalendarData(
+            fingerprint="f",
+            dates={},
+            fractions=[],
+            index=KlikomanagerEventIndex([]),
+            fetched_at=dt_util.utcnow() + timedelta(microseconds=self.fetches),
+        )
+
+    async def refresh(self, hub: KlikomanagerHub) -> KlikomanagerCalendarData:
+        """Ververs via de hub zoals de coordinator dat doet."""
+        data = await hub.async_fetch(self, self.fetch)
+        self.last_fetched = data.fetched_at
+        return data
+
+
+def make_hub() -> KlikomanagerHub:
+    """Bouw een hub met een minimale hass."""
+    hass = SimpleNamespace(
+        async_create_task=lambda target, name: asyncio.get_running_loop().create_task(
+            target
+        )
+    )
+    return KlikomanagerHub(hass, "example.invalid")
+
+
+def test_calendar_key_uses_address_only() -> None:
+    """Het adres wordt genormaliseerd; zonder adres is er geen key."""
+    assert calendar_key(login(ADDRESS)) == calendar_key(
+        login({**ADDRESS, "zipCode": "1234ab"})
+    )
+    assert calendar_key(login(None)) is None
+    assert calendar_key(None) is None
+
+
+def test_same_address_shares_fetch() -> None:
+    """Een tweede entry op hetzelfde adres hergebruikt het resultaat."""
+    hub = make_hub()
+    leader = FakeCoordinator("a", ADDRESS)
+    follower = FakeCoordinator("b", ADDRESS)
+
+    async def _run() -> None:
+        first = await leader.refresh(hub)
+        assert await follower.refresh(hub) is first
+        assert (leader.fetches, follower.fetches) == (1, 0)
+        assert hub.is_leader(leader) and not hub.is_leader(follower)
+
+        # Een handmatige refresh van de volger haalt echt op en deelt dat.
+        second = await follower.refresh(hub)
+        assert second is not first
+        assert follower.fetches == 1
+        assert leader.notified == 1
+        assert await leader.refresh(hub) is second
+        assert leader.fetches == 1
+
+    asyncio.run(_run())
+
+
+def test_without_address_nothing_is_shared() -> None:
+    """Kaarten zonder adres halen altijd zelf op, ook met gelijke kalenders."""
+    hub = make_hub()
+    first = FakeCoordinator("a", None)
+    second = FakeCoordinator("b", None)
+
+    async def _run() -> None:
+        await first.refresh(hub)
+        await second.refresh(hub)
+
+    asyncio.run(_run())
+
+    assert (first.fetches, second.fetches) == (1, 1)
+    assert hub.member_count(first) == hub.member_count(second) == 1
+    assert hub.is_leader(first) and hub.is_leader(second)
@@ -0,0 +1,87 @@
+"""Tests voor de iCalendar-feed."""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.klikomanager.ics import (
+    accepts_gzip,
+    build_feed,
+    etag_matches,
+    render_ics,
+)
+
+ETAG = '"abc123"'
+MONDAY = date(2026, 1, 5)
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("", False),
+        ("gzip", True),
+        ("gzip, deflate, br", True),
+        ("deflate, gzip;q=0.5", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.0, deflate", False),
+        ("GZIP;Q=1", True),
+        ("*", True),
+        ("*;q=0", False),
+        ("gzip;q=0, *", False),
+        ("identity", False),
+    ],
+)
+def test_accepts_gzip(header: str, expected: bool) -> None:
+    """Alleen een gzip-codering met een positieve q-waarde telt."""
+    assert accepts_gzip(header) is expected
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("", False),
+        (ETAG, True),
+        (f'"other", {ETAG}', True),
+        (f"W/{ETAG}", True),
+        ('W/"other"', False),
+        ("*", True),
+    ],
+)
+def test_etag_matches(header: str, expected: bool) -> None:
+    """If-None-Match vergelijkt zwak en accepteert een lijst tags."""
+    assert etag_matches(header, ETAG) is expected
+
+
+def test_render_ics_compresses_fixed_cycle(make_index) -> None:
+    """Een vast ritme wordt één RRULE-event met de lokale tijdzone."""
+    index = make_index({1: [MONDAY + timedelta(weeks=2 * w) for w in range(6)]})
+
+    body = render_ics(
+        index, entry_id="a", name="Afval", dtstamp=index.items[0].start
+    ).decode()
+
+    assert body.count("BEGIN:VEVENT") == 1
+    assert "BEGIN:VTIMEZONE\r\nTZID:Europe/Amsterdam" in body
+    assert "RRULE:FREQ=WEEKLY;INTERVAL=2;COUNT=6" in body
+
+
+def test_etag_stable_across_renders(make_index, monkeypatch) -> None:
+    """Dezelfde events geven op elk moment dezelfde bytes en ETag."""
+    days = [MONDAY + timedelta(weeks=w) for w in range(4)]
+
+    def _feed(now_offset: timedelta, fraction_days: list[date]):
+        now = dt_util.utcnow() + now_offset
+        monkeypatch.setattr(dt_util, "utcnow", lambda: now)
+        return build_feed(make_index({1: fraction_days}), entry_id="a", name="Afval")
+
+    first = _feed(timedelta(0), days)
+    later = _feed(timedelta(days=3, hours=5), days)
+    changed = _feed(timedelta(days=3, hours=5), days[:3])
+
+    assert later.body == first.body
+    assert later.etag == first.etag
+    assert changed.etag != first.etag
@@ -0,0 +1,163 @@
+"""Tests voor de bisect-index over de ophaalmomenten."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+import random
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.klikomanager.index import KlikomanagerEventIndex
+
+MONDAY = date(2026, 1, 5)
+
+
+def local(day: date, hour: int, minute: int = 0) -> datetime:
+    """Retourneer een lokaal tijdstip op `day`."""
+    return dt_util.start_of_local_day(day) + timedelta(hours=hour, minutes=minute)
+
+
+@pytest.fixture
+def index(make_index) -> KlikomanagerEventIndex:
+    """Restafval en GFT om de week, papier eens per vier weken."""
+    return make_index(
+        {
+            1: [MONDAY + timedelta(weeks=w) for w in range(0, 8, 2)],
+            2: [MONDAY + timedelta(weeks=w, days=1) for w in range(1, 8, 2)],
+            3: [MONDAY + timedelta(weeks=w) for w in range(0, 8, 4)],
+        }
+    )
+
+
+def test_items_sorted_by_start(index: KlikomanagerEventIndex) -> None:
+    """De records staan op starttijd en de events horen erbij."""
+    assert len(index) == 10
+    assert list(index.starts) == sorted(index.starts)
+    assert [event.start for event in index.events] == list(index.starts)
+    assert index.events[0].summary in ("Restafval", "Papier")
+    assert index.fractions == {1: "Restafval", 2: "GFT", 3: "Papier"}
+
+
+def test_empty_index_is_falsy() -> None:
+    """Een lege index is onwaar en vindt niets."""
+    index = KlikomanagerEventIndex([])
+    assert not index
+    assert index.events_between(local(MONDAY, 0), local(MONDAY, 23)) == []
+    assert index.next_event(local(MONDAY, 0)) is None
+    assert index.next_transition(local(MONDAY, 0)) is None
+
+
+def test_events_between_overlap(index: KlikomanagerEventIndex) -> None:
+    """Een bereik dat alleen het einde of begin raakt telt mee."""
+    events = index.events_between(local(MONDAY, 8), local(MONDAY, 8, 30))
+    assert {event.summary for event in events} == {"Restafval", "Papier"}
+
+    assert index.events_between(local(MONDAY, 9, 1), local(MONDAY, 23)) == []
+    assert len(index.events_between(local(MONDAY, 0), local(MONDAY, 6))) == 2
+
+
+def test_events_between_fraction(index: KlikomanagerEventIndex) -> None:
+    """Met een fractie worden alleen haar events teruggegeven."""
+    events = index.events_between(
+        local(MONDAY, 0), local(MONDAY + timedelta(weeks=8), 0), fraction_id=3
+    )
+    assert [event.start for event in events] == [
+        local(MONDAY, 6),
+        local(MONDAY + timedelta(weeks=4), 6),
+    ]
+    assert index.events_between(local(MONDAY, 0), local(MONDAY, 23), 99) == []
+
+
+def test_events_between_matches_linear_scan(make_index) -> None:
+    """De bisect-zoekfunctie geeft hetzelfde als een lineaire scan."""
+    rng = random.Random(7)
+    days = {
+        fraction_id: sorted(
+            {MONDAY + timedelta(days=rng.randrange(120)) for _ in range(30)}
+        )
+        for fraction_id in (1, 2, 3)
+    }
+    index = make_index(days)
+
+    for _ in range(200):
+        start = local(MONDAY, 0) + timedelta(minutes=rng.randrange(130 * 24 * 60))
+        end = start + timedelta(minutes=rng.randrange(10 * 24 * 60))
+        fraction_id = rng.choice((None, 1, 2, 3))
+        expected = [
+            event
+            for event, item in zip(index.events, index.items)
+            if event.end >= start
+            and event.start <= end
+            and fraction_id in (None, item.fraction_id)
+        ]
+        assert index.events_between(start, end, fraction_id) == expected
+
+
+def test_next_event(index: KlikomanagerEventIndex) -> None:
+    """Een lopend event gaat voor; na het laatste event is er niets."""
+    assert index.next_event(local(MONDAY, 7)).start == local(MONDAY, 6)
+    assert index.next_event(local(MONDAY, 10)).start == local(
+        MONDAY + timedelta(weeks=1, days=1), 6
+    )
+    assert index.next_event(local(MONDAY, 10), fraction_id=3).start == local(
+        MONDAY + timedelta(weeks=4), 6
+    )
+    assert index.next_event(local(MONDAY + timedelta(weeks=9), 0)) is None
+
+
+def test_next_transition(index: KlikomanagerEventIndex) -> None:
+    """Vóór een event is de start de overgang, tijdens een event het einde."""
+    assert index.next_transition(local(MONDAY, 0)) == local(MONDAY, 6)
+    assert index.next_transition(local(MONDAY, 6)) == local(MONDAY, 9)
+    assert index.next_transition(local(MONDAY, 9)) == local(
+        MONDAY + timedelta(weeks=1, days=1), 6
+    )
+    assert index.next_transition(local(MONDAY + timedelta(weeks=9), 0)) is None
+
+
+def test_next_pickup(index: KlikomanagerEventIndex) -> None:
+    """Het eerste ophaalmoment op of na vandaag, per fractie."""
+    assert index.next_pickup(1, MONDAY).day == MONDAY
+    assert index.next_pickup(1, MONDAY + timedelta(days=1)).day == MONDAY + timedelta(
+        weeks=2
+    )
+    assert index.next_pickup(3, MONDAY + timedelta(weeks=5)) is None
+    assert index.next_pickup(99, MONDAY) is None
+
+
+def test_pickups_between_days(index: KlikomanagerEventIndex) -> None:
+    """Een dagbereik is inclusief en kan op fracties gefilterd worden."""
+    first = MONDAY
+    last = MONDAY + timedelta(weeks=2)
+    assert [(p.day, p.fraction_id) for p in index.pickups_between_days(first, last)] == [
+        (MONDAY, 1),
+        (MONDAY, 3),
+        (MONDAY + timedelta(weeks=1, days=1), 2),
+        (MONDAY + timedelta(weeks=2), 1),
+    ]
+    assert [
+        p.fraction_id for p in index.pickups_between_days(first, last, [2, 3])
+    ] == [3, 2]
+    assert index.pickups_between_days(first, last, [99]) == []
+
+
+def test_has_start_between(index: KlikomanagerEventIndex) -> None:
+    """Het interval is links open en rechts gesloten."""
+    assert index.has_start_between(local(MONDAY, 0), local(MONDAY, 6))
+    assert not index.has_start_between(local(MONDAY, 6), local(MONDAY, 23))
+
+
+def test_fraction_digest(make_index, index: KlikomanagerEventIndex) -> None:
+    """De digest verandert alleen als de dagen van die fractie veranderen."""
+    moved = make_index(
+        {
+            1: [MONDAY + timedelta(weeks=w) for w in range(0, 8, 2)],
+            2: [MONDAY + timedelta(weeks=w, days=2) for w in range(1, 8, 2)],
+            3: [MONDAY + timedelta(weeks=w) for w in range(0, 8, 4)],
+        }
+    )
+    assert moved.fraction_digest(1) == index.fraction_digest(1)
+    assert moved.fraction_digest(2) != index.fraction_digest(2)
+    assert index.fraction_digest(99) is None
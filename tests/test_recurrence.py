@@ -0,0 +1,69 @@
+"""Tests voor het herkennen van vaste ophaalcycli."""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from custom_components.klikomanager.recurrence import compress, detect_series
+
+MONDAY = date(2026, 1, 5)
+
+
+def test_detect_biweekly_series(make_index) -> None:
+    """Een tweewekelijks ritme wordt één reeks zonder uitzonderingen."""
+    index = make_index({1: [MONDAY + timedelta(weeks=w) for w in range(0, 20, 2)]})
+
+    series = detect_series(index.fraction_pickups(1))
+
+    assert series is not None
+    assert (series.first, series.interval_weeks, series.count) == (MONDAY, 2, 10)
+    assert series.exdates == series.rdates == ()
+    assert series.rrule == "FREQ=WEEKLY;INTERVAL=2;COUNT=10"
+
+
+def test_detect_series_with_exceptions(make_index) -> None:
+    """Een verschoven ophaalmoment wordt een EXDATE plus een RDATE."""
+    days = [MONDAY + timedelta(weeks=w) for w in range(12)]
+    moved = days[5]
+    days[5] = moved + timedelta(days=2)
+    index = make_index({1: days})
+
+    series = detect_series(index.fraction_pickups(1))
+
+    assert series is not None
+    assert series.interval_weeks == 1
+    assert series.exdates == (moved,)
+    assert series.rdates == (moved + timedelta(days=2),)
+    assert series.runs(MONDAY, MONDAY + timedelta(weeks=20)) == [
+        (MONDAY, 5),
+        (MONDAY + timedelta(weeks=6), 6),
+    ]
+
+
+def test_no_series_without_rhythm(make_index) -> None:
+    """Te weinig of te onregelmatige ophaalmomenten geven geen reeks."""
+    few = make_index({1: [MONDAY + timedelta(weeks=w) for w in range(3)]})
+    irregular = make_index(
+        {1: [MONDAY + timedelta(days=d) for d in (0, 3, 11, 16, 30, 33, 47, 50)]}
+    )
+
+    assert detect_series(few.fraction_pickups(1)) is None
+    assert detect_series(irregular.fraction_pickups(1)) is None
+
+
+def test_compress_splits_series_and_singles(make_index) -> None:
+    """Fracties zonder ritme blijven losse ophaalmomenten."""
+    index = make_index(
+        {
+            1: [MONDAY + timedelta(weeks=w) for w in range(8)],
+            2: [MONDAY + timedelta(days=d) for d in (1, 9)],
+        }
+    )
+
+    series, singles = compress(index.items)
+
+    assert [found.fraction_id for found in series] == [1]
+    assert sorted(pickup.day for pickup in singles) == [
+        MONDAY + timedelta(days=1),
+        MONDAY + timedelta(days=9),
+    ]
@@ -0,0 +1,86 @@
+"""Tests voor de planning van de refreshes."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.klikomanager.const import (
+    REFRESH_BACKOFF_BASE,
+    REFRESH_BACKOFF_MAX,
+    REFRESH_MIN_INTERVAL,
+    REFRESH_NEAR_PICKUP_INTERVAL,
+)
+from custom_components.klikomanager.scheduler import KlikomanagerRefreshScheduler
+
+DAY = date(2026, 3, 10)
+
+
+def local(day: date, hour: int, minute: int = 0) -> datetime:
+    """Retourneer een lokaal tijdstip op `day`."""
+    return dt_util.start_of_local_day(day) + timedelta(hours=hour, minutes=minute)
+
+
+@pytest.mark.parametrize("entry_id", ["a", "b", "c", "d"])
+def test_next_refresh_in_window(entry_id: str) -> None:
+    """Zonder ophaalmoment in zicht valt de refresh in het nachtelijke venster."""
+    scheduler = KlikomanagerRefreshScheduler(entry_id)
+    now = local(DAY, 12)
+
+    refresh_at = now + scheduler.interval_after_success(None, 2, 5, now)
+
+    assert local(DAY + timedelta(days=1), 2) <= refresh_at < local(
+        DAY + timedelta(days=1), 5
+    )
+    # De offset is per entry vast.
+    assert refresh_at == now + scheduler.interval_after_success(None, 2, 5, now)
+
+
+def test_window_later_today() -> None:
+    """Vóór het venster valt de refresh dezelfde nacht nog."""
+    scheduler = KlikomanagerRefreshScheduler("a")
+    now = local(DAY, 0, 30)
+
+    refresh_at = now + scheduler.interval_after_success(None, 2, 5, now)
+
+    assert local(DAY, 2) <= refresh_at < local(DAY, 5)
+
+
+def test_window_across_midnight() -> None:
+    """Een venster van 23 tot 1 uur loopt over middernacht heen."""
+    scheduler = KlikomanagerRefreshScheduler("a")
+    now = local(DAY, 12)
+
+    refresh_at = now + scheduler.interval_after_success(None, 23, 1, now)
+
+    assert local(DAY, 23) <= refresh_at < local(DAY + timedelta(days=1), 1)
+
+
+def test_near_pickup_refreshes_sooner(make_index) -> None:
+    """Met een ophaalmoment binnen 48 uur wordt binnen enkele uren ververst."""
+    scheduler = KlikomanagerRefreshScheduler("a")
+    index = make_index({1: [DAY + timedelta(days=1)]})
+    now = local(DAY, 6)
+
+    interval = scheduler.interval_after_success(index, 2, 5, now)
+
+    assert REFRESH_MIN_INTERVAL <= interval <= REFRESH_NEAR_PICKUP_INTERVAL * 1.25
+    assert scheduler.interval_after_success(
+        index, 2, 5, local(DAY + timedelta(days=2), 12)
+    ) > REFRESH_NEAR_PICKUP_INTERVAL * 1.25
+
+
+def test_backoff_after_failures() -> None:
+    """Fouten geven exponentiële backoff tot het maximum; een succes reset die."""
+    scheduler = KlikomanagerRefreshScheduler("a")
+
+    intervals = [scheduler.interval_after_failure() for _ in range(12)]
+
+    assert REFRESH_BACKOFF_BASE * 0.8 <= intervals[0] <= REFRESH_BACKOFF_BASE * 1.2
+    assert intervals[-1] <= REFRESH_BACKOFF_MAX * 1.2
+    assert scheduler.failures == 12
+    scheduler.interval_after_success(None, 2, 5)
+    assert scheduler.failures == 0
@@ -0,0 +1,164 @@
+"""Tests voor de services van de integratie."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.exceptions import ServiceValidationError
+
+from custom_components.klikomanager import services
+from custom_components.klikomanager.const import (
+    DATA_HUBS,
+    DATA_PENDING_LOGINS,
+    DOMAIN,
+    REFRESH_SERVICE_MIN_INTERVAL,
+)
+from custom_components.klikomanager.stats import KlikomanagerRefreshStats
+
+MONDAY = date(2026, 1, 5)
+
+
+class FakeCoordinator:
+    """Coordinator die refreshes telt en elke keer nieuwe data oplevert."""
+
+    def __init__(self, entry_id: str, index: Any = None) -> None:
+        self.entry = SimpleNamespace(entry_id=entry_id, title=entry_id)
+        self.stats = KlikomanagerRefreshStats()
+        self.data = index
+        self.last_update_success = True
+        self.refreshes = 0
+
+    async def async_refresh(self) -> None:
+        self.refreshes += 1
+        await asyncio.sleep(0)
+        self.data = object()
+
+
+def make_hass(
+    coordinators: dict[str, FakeCoordinator],
+    states: dict[str, ConfigEntryState] | None = None,
+) -> SimpleNamespace:
+    """Bouw een hass met config entries en een gemengde hass.data[DOMAIN]."""
+    states = states or {}
+    entries = {
+        entry_id: SimpleNamespace(
+            entry_id=entry_id,
+            domain=DOMAIN,
+            state=states.get(entry_id, ConfigEntryState.LOADED),
+        )
+        for entry_id in coordinators
+    }
+    domain_data: dict[str, Any] = {
+        entry_id: {"coordinator": coordinator}
+        for entry_id, coordinator in coordinators.items()
+        if states.get(entry_id, ConfigEntryState.LOADED) is ConfigEntryState.LOADED
+    }
+    # Gedeelde state die niet bij een entry hoort.
+    domain_data[DATA_HUBS] = {"coordinator": "geen coordinator"}
+    domain_data[DATA_PENDING_LOGINS] = {}
+    return SimpleNamespace(
+        data={DOMAIN: domain_data},
+        config_entries=SimpleNamespace(
+            async_get_entry=entries.get,
+            async_entries=lambda domain: list(entries.values()),
+        ),
+        async_create_task=lambda target, name: asyncio.get_running_loop().create_task(
+            target
+        ),
+    )
+
+
+class FakeClock:
+    """Monotone klok die de test zelf vooruitzet."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    """Vervang de klok van de refresh-gate en verkort het debounce-venster."""
+    clock = FakeClock()
+    monkeypatch.setattr(
+        services,
+        "time",
+        SimpleNamespace(monotonic=clock.monotonic, perf_counter=time.perf_counter),
+    )
+    monkeypatch.setattr(services, "REFRESH_SERVICE_DEBOUNCE", 0.01)
+    return clock
+
+
+def test_get_pickups_uses_loaded_config_entries(make_index) -> None:
+    """Alleen geladen entries tellen mee, ongeacht andere sleutels in hass.data."""
+    index = make_index({1: [MONDAY]})
+    hass = make_hass(
+        {"a": FakeCoordinator("a", index), "b": FakeCoordinator("b", index)},
+        {"b": ConfigEntryState.SETUP_RETRY},
+    )
+
+    result = services.async_get_pickups(
+        hass, None, [{"name": "week", "start": MONDAY, "end": MONDAY}], None
+    )
+
+    assert list(result["entries"]) == ["a"]
+    assert [
+        pickup["date"] for pickup in result["entries"]["a"]["calendars"]["a"]["week"]
+    ] == [MONDAY.isoformat()]
+    for entry_id in ("b", DATA_HUBS, "onbekend"):
+        with pytest.raises(ServiceValidationError):
+            services.async_get_pickups(hass, [entry_id], None, None)
+
+
+def test_refresh_debounces_and_coalesces(clock) -> None:
+    """Aanroepen binnen het debounce-venster delen één refresh."""
+    coordinator = FakeCoordinator("a")
+    hass = make_hass({"a": coordinator})
+
+    async def _run() -> list[dict[str, Any]]:
+        first = asyncio.create_task(services.async_refresh(hass, None))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(services.async_refresh(hass, ["a"]))
+        return [await first, await second]
+
+    first, second = asyncio.run(_run())
+
+    assert coordinator.refreshes == 1
+    assert first["entries"]["a"]["refreshed"] is True
+    assert first["entries"]["a"]["changed"] is True
+    assert "coalesced" not in first["entries"]["a"]
+    assert second["entries"]["a"]["coalesced"] is True
+    assert second["entries"]["a"]["started"] == first["entries"]["a"]["started"]
+
+
+def test_refresh_minimum_interval(clock) -> None:
+    """Binnen het minimuminterval volgt geen nieuwe refresh maar de vorige uitkomst."""
+    coordinator = FakeCoordinator("a")
+    hass = make_hass({"a": coordinator})
+
+    async def _run() -> list[dict[str, Any]]:
+        results = [await services.async_refresh(hass, ["a"])]
+        clock.now += 60
+        results.append(await services.async_refresh(hass, ["a"]))
+        clock.now += REFRESH_SERVICE_MIN_INTERVAL.total_seconds()
+        results.append(await services.async_refresh(hass, ["a"]))
+        return [result["entries"]["a"] for result in results]
+
+    first, limited, again = asyncio.run(_run())
+
+    assert coordinator.refreshes == 2
+    assert limited["refreshed"] is False
+    assert limited["started"] == first["started"]
+    assert limited["retry_after_s"] == pytest.approx(
+        REFRESH_SERVICE_MIN_INTERVAL.total_seconds() - 60
+    )
+    assert again["refreshed"] is True
@@ -0,0 +1,181 @@
+"""Tests voor de compacte opslag van ophaalmomenten."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import date, timedelta
+from typing import Any
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.klikomanager import storage
+from custom_components.klikomanager.storage import (
+    KlikomanagerArchive,
+    KlikomanagerSyncedEvents,
+    compact_calendar,
+    expand_calendar,
+)
+
+from .conftest import FRACTIONS, make_dates
+
+MONDAY = date(2026, 1, 5)
+
+
+class FakeStore:
+    """Store in het geheugen; vertraagde saves worden direct uitgevoerd.
+
+    Directe saves worden daarnaast per key in `immediate` bijgehouden.
+    """
+
+    saved: dict[str, Any] = {}
+    immediate: list[str] = []
+    fail_save = False
+
+    def __init__(self, hass: Any, version: int, key: str) -> None:
+        self.key = key
+
+    async def async_load(self) -> Any:
+        return self.saved.get(self.key)
+
+    async def async_save(self, data: Any) -> None:
+        if self.fail_save:
+            raise OSError("schijf vol")
+        self.saved[self.key] = data
+        self.immediate.append(self.key)
+
+    def async_delay_save(self, data_func: Any, delay: float) -> None:
+        self.saved[self.key] = data_func()
+
+
+@pytest.fixture(autouse=True)
+def fake_store(monkeypatch: pytest.MonkeyPatch) -> dict[str, Any]:
+    """Vervang de Store door een in-memory variant."""
+    FakeStore.saved = {}
+    FakeStore.immediate = []
+    FakeStore.fail_save = False
+    monkeypatch.setattr(storage, "Store", FakeStore)
+    return FakeStore.saved
+
+
+def test_synced_events_migration_is_saved_immediately(fake_store) -> None:
+    """Gemigreerde keys staan op schijf voordat async_load terugkeert."""
+    today = dt_util.now().date()
+    future = today + timedelta(days=3)
+    past = today - timedelta(days=3)
+    synced = KlikomanagerSyncedEvents(None, "entry")
+
+    migrated = asyncio.run(
+        synced.async_load(
+            [f"{future.isoformat()}|1", f"{past.isoformat()}|2", "onzin", "x|1"]
+        )
+    )
+
+    assert migrated
+    assert FakeStore.immediate == [f"{storage.DOMAIN}.entry.synced_events"]
+    (stored,) = fake_store.values()
+    assert stored == {"fractions": {"1": [future.toordinal()]}}
+    assert (future.isoformat(), 1) in synced
+    assert (past.isoformat(), 2) not in synced
+
+    # Een tweede load leest de opslag en negeert de oude keys.
+    reloaded = KlikomanagerSyncedEvents(None, "entry")
+    assert not asyncio.run(reloaded.async_load([f"{today.isoformat()}|3"]))
+    assert len(reloaded) == 1
+
+
+def test_synced_events_migration_save_failure_propagates() -> None:
+    """Mislukt de save, dan faalt de load zodat de oude option blijft staan."""
+    FakeStore.fail_save = True
+    synced = KlikomanagerSyncedEvents(None, "entry")
+
+    with pytest.raises(OSError):
+        asyncio.run(synced.async_load([f"{dt_util.now().date().isoformat()}|1"]))
+
+
+def test_synced_events_prune(fake_store) -> None:
+    """Toegevoegde keys van vóór vandaag verdwijnen, ook uit de opslag."""
+    today = dt_util.now().date()
+    synced = KlikomanagerSyncedEvents(None, "entry")
+
+    synced.async_add(
+        [
+            ((today - timedelta(days=1)).isoformat(), 1),
+            (today.isoformat(), 1),
+            ((today - timedelta(days=7)).isoformat(), 2),
+        ]
+    )
+
+    assert len(synced) == 1
+    assert (today.isoformat(), 1) in synced
+    (stored,) = fake_store.values()
+    assert stored == {"fractions": {"1": [today.toordinal()]}}
+
+    synced.async_prune(today + timedelta(days=1))
+    assert len(synced) == 0
+    assert list(fake_store.values()) == [{"fractions": {}}]
+
+
+def test_archive_delta_roundtrip(make_index, fake_store) -> None:
+    """Het archief ontdubbelt, slaat verschillen op en leest die terug."""
+    days = [MONDAY + timedelta(weeks=w) for w in range(5)]
+    index = make_index({1: days, 2: [MONDAY + timedelta(days=1)]})
+    archive = KlikomanagerArchive(None, "entry")
+
+    archive.async_add(index.items)
+    archive.async_add(index.items[:3])
+
+    assert len(archive) == 6
+    (stored,) = fake_store.values()
+    assert stored["fractions"]["1"] == {
+        "name": "Restafval",
+        "days": [MONDAY.toordinal(), 7, 7, 7, 7],
+    }
+
+    loaded = KlikomanagerArchive(None, "entry")
+    asyncio.run(loaded.async_load())
+    first, last = MONDAY, MONDAY + timedelta(weeks=4)
+    assert loaded.pickups_between_days(first, last) == archive.pickups_between_days(
+        first, last
+    )
+    assert loaded.pickups_between_days(first, last) == list(index.items)
+    assert [
+        pickup.day
+        for pickup in loaded.pickups_between_days(
+            MONDAY + timedelta(days=1), MONDAY + timedelta(weeks=2), fraction_id=1
+        )
+    ] == days[1:3]
+    assert loaded.pickups_between_days(first, last, fraction_id=99) == []
+
+
+def test_archive_retention(make_index) -> None:
+    """Met een retentie verdwijnen oudere dagen, en lege fracties helemaal."""
+    today = dt_util.now().date()
+    index = make_index(
+        {
+            1: [today - timedelta(days=d) for d in (40, 20, 10)],
+            2: [today - timedelta(days=50)],
+        }
+    )
+    archive = KlikomanagerArchive(None, "entry")
+
+    archive.async_add(index.items, retention_days=30)
+
+    pickups = archive.pickups_between_days(date.min, today)
+    assert [(p.day, p.fraction_id) for p in pickups] == [
+        (today - timedelta(days=20), 1),
+        (today - timedelta(days=10), 1),
+    ]
+
+
+def test_compact_calendar_roundtrip() -> None:
+    """Een compacte kalender geeft dezelfde dagen en namen terug."""
+    dates = make_dates({1: [MONDAY, MONDAY + timedelta(weeks=2)], 3: [MONDAY]})
+
+    expanded_dates, fractions = expand_calendar(compact_calendar(dates, FRACTIONS))
+
+    assert {day: sorted(entries) for day, entries in expanded_dates.items()} == {
+        day: sorted(entries) for day, entries in dates.items()
+    }
+    assert fractions == FRACTIONS
@@ -0,0 +1,238 @@
+"""Tests voor het wegschrijven naar een target-kalender."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from homeassistant.components.calendar import CalendarEvent
+from homeassistant.util import dt as dt_util
+
+from custom_components.klikomanager.sync import (
+    KlikomanagerSyncPlan,
+    async_apply_plan,
+    plan_reconciliation,
+    plan_recurring,
+    sync_description,
+)
+
+MONDAY = date(2026, 1, 5)
+
+
+class FakeServices:
+    """Registreert create_event-calls en laat gekozen dagen falen."""
+
+    def __init__(self, failing: dict[str, Exception]) -> None:
+        self.failing = failing
+        self.created: list[str] = []
+
+    async def async_call(
+        self, domain: str, service: str, data: dict[str, Any], blocking: bool
+    ) -> None:
+        day = data["start_date_time"][:10]
+        if day in self.failing:
+            raise self.failing[day]
+        self.created.append(day)
+
+
+def test_apply_plan_contains_unexpected_errors(make_index) -> None:
+    """Een onverwachte fout van de target kost alleen die ene actie."""
+    index = make_index({1: [MONDAY + timedelta(weeks=w) for w in range(3)]})
+    services = FakeServices({(MONDAY + timedelta(weeks=1)).isoformat(): RuntimeError()})
+    hass = SimpleNamespace(services=services)
+
+    result = asyncio.run(
+        async_apply_plan(
+            hass,
+            "calendar.target",
+            KlikomanagerSyncPlan(create=list(index.items)),
+            entry_id="entry",
+        )
+    )
+
+    assert result.created == 2
+    assert result.failed == 1
+    assert result.created_keys == {
+        (MONDAY.isoformat(), 1),
+        ((MONDAY + timedelta(weeks=2)).isoformat(), 1),
+    }
+
+
+class FakeCalendar:
+    """Target-entity die terugkerende events wel of niet uitvoert."""
+
+    def __init__(self, expands_rrule: bool) -> None:
+        self.expands_rrule = expands_rrule
+        self.events: list[CalendarEvent] = []
+
+    async def async_create_event(self, **kwargs: Any) -> None:
+        count = int(kwargs["rrule"].rpartition("COUNT=")[2])
+        step = timedelta(weeks=int(kwargs["rrule"].split("INTERVAL=")[1][0]))
+        for number in range(count if self.expands_rrule else 1):
+            self.events.append(
+                CalendarEvent(
+                    start=kwargs["dtstart"] + number * step,
+                    end=kwargs["dtend"] + number * step,
+                    summary=kwargs["summary"],
+                    description=kwargs["description"],
+                    uid="series",
+                    recurrence_id=f"{number}",
+                )
+            )
+
+    async def async_get_events(
+        self, hass: Any, start: datetime, end: datetime
+    ) -> list[CalendarEvent]:
+        return [event for event in self.events if start <= event.start <= end]
+
+
+@pytest.mark.parametrize("expands_rrule", [True, False])
+def test_series_keys_confirmed_by_reading_back(make_index, expands_rrule) -> None:
+    """Alleen nagelezen exemplaren tellen; de rest wordt losse events."""
+    days = [MONDAY + timedelta(weeks=w) for w in range(6)]
+    index = make_index({1: days})
+    services = FakeServices({})
+    entity = FakeCalendar(expands_rrule)
+    plan = plan_recurring(list(index.items))
+    assert len(plan.create_series) == 1
+
+    result = asyncio.run(
+        async_apply_plan(
+            SimpleNamespace(services=services),
+            "calendar.target",
+            plan,
+            entry_id="entry",
+            entity=entity,
+        )
+    )
+
+    assert result.created == 6
+    assert result.created_keys == {(day.isoformat(), 1) for day in days}
+    assert len(services.created) == (0 if expands_rrule else 5)
+
+
+def test_reconcile_recognises_series_instances(make_index) -> None:
+    """Exemplaren van een reeks matchen per dag en worden los verwijderd."""
+    days = [MONDAY + timedelta(weeks=w) for w in range(6)]
+    index = make_index({1: days})
+    entity = FakeCalendar(expands_rrule=True)
+    asyncio.run(
+        async_apply_plan(
+            SimpleNamespace(services=FakeServices({})),
+            "calendar.target",
+            plan_recurring(list(index.items)),
+            entry_id="entry",
+            entity=entity,
+        )
+    )
+
+    plan = plan_reconciliation(
+        "entry",
+        index.items[:5],
+        entity.events,
+        can_update=True,
+        can_delete=True,
+    )
+
+    assert plan.unchanged == 5
+    assert plan.create == plan.update == []
+    assert plan.delete == [("series", "5")]
+
+
+def _target_event(entry_id: str, pickup, uid: str, **changes: Any) -> CalendarEvent:
+    """Bouw een target-event zoals de sync het heeft aangemaakt."""
+    data = {
+        "start": dt_util.as_local(pickup.start),
+        "end": dt_util.as_local(pickup.end),
+        "summary": pickup.summary,
+        "description": sync_description(entry_id, pickup),
+        "uid": uid,
+    }
+    data.update(changes)
+    return CalendarEvent(**data)
+
+
+def test_reconcile_plan(make_index) -> None:
+    """Ongewijzigd blijft staan, verplaatst wordt een update, de rest create/delete."""
+    old = make_index(
+        {
+            1: [MONDAY, MONDAY + timedelta(weeks=1)],
+            2: [MONDAY + timedelta(days=1)],
+            3: [MONDAY + timedelta(days=2)],
+        }
+    )
+    new = make_index(
+        {
+            1: [MONDAY, MONDAY + timedelta(weeks=1, days=2)],
+            2: [MONDAY + timedelta(weeks=4)],
+            3: [MONDAY + timedelta(days=2)],
+        }
+    )
+    existing = [
+        _target_event("entry", pickup, f"uid-{pos}")
+        for pos, pickup in enumerate(old.items)
+    ]
+    # Een dubbel event en een event van een andere entry.
+    existing.append(_target_event("entry", old.items[0], "dup"))
+    existing.append(_target_event("other", old.items[1], "foreign"))
+
+    plan = plan_reconciliation(
+        "entry", new.items, existing, can_update=True, can_delete=True
+    )
+
+    assert plan.unchanged == 2
+    moved = new.items[2]
+    assert moved.key == ((MONDAY + timedelta(weeks=1, days=2)).isoformat(), 1)
+    assert [(ref, pickup.key) for ref, pickup in plan.update] == [
+        (("uid-3", None), moved.key)
+    ]
+    assert [pickup.key for pickup in plan.create] == [
+        ((MONDAY + timedelta(weeks=4)).isoformat(), 2)
+    ]
+    assert sorted(plan.delete) == [("dup", None), ("uid-1", None)]
+
+
+def test_reconcile_plan_without_update_support(make_index) -> None:
+    """Zonder update wordt een verplaatsing een create plus een delete."""
+    old = make_index({1: [MONDAY]})
+    new = make_index({1: [MONDAY + timedelta(days=1)]})
+    existing = [_target_event("entry", old.items[0], "uid-0")]
+
+    plan = plan_reconciliation(
+        "entry", new.items, existing, can_update=False, can_delete=True
+    )
+
+    assert plan.update == []
+    assert [pickup.key for pickup in plan.create] == [new.items[0].key]
+    assert plan.delete == [("uid-0", None)]
+
+
+def test_reconcile_plan_legacy_and_changed_events(make_index) -> None:
+    """Events zonder tag worden herkend; afwijkende tijden worden bijgewerkt."""
+    index = make_index({1: [MONDAY], 2: [MONDAY + timedelta(days=1)]})
+    legacy, shifted = index.items
+    existing = [
+        _target_event(
+            "entry", legacy, "legacy", description=f"Klikomanager: {legacy.summary}"
+        ),
+        _target_event(
+            "entry",
+            shifted,
+            "shifted",
+            end=dt_util.as_local(shifted.end) + timedelta(hours=1),
+        ),
+    ]
+
+    plan = plan_reconciliation(
+        "entry", index.items, existing, can_update=True, can_delete=False
+    )
+
+    assert plan.unchanged == 1
+    assert [(ref, pickup) for ref, pickup in plan.update] == [
+        (("shifted", None), shifted)
+    ]
+    assert plan.create == plan.delete == []